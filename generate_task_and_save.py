@@ -11,12 +11,12 @@ def generate_grid(size):
     return nx.grid_2d_graph(size, size)
 
 
-def place_circles(G, num_circles, cycle):
+def place_circles(G, num_circles, cycle, rng=random):
     """Place circles along the cycle with alternating colors."""
     nodes = list(cycle)
     if num_circles > len(nodes):
         num_circles = len(nodes) // 2  # Ensure feasibility
-    circle_indices = random.sample(range(len(nodes)), num_circles)
+    circle_indices = rng.sample(range(len(nodes)), num_circles)
     circles = [nodes[i] for i in circle_indices]
     colors = {}
     for i, circle in enumerate(circles):
@@ -50,12 +50,13 @@ def check_alternating_colors(cycle, circles, colors):
     return True
 
 
-def generate_problem(size, num_circles):
-    """Generate a rook path problem."""
+def generate_problem(size, num_circles, seed=None):
+    """Generate a rook path problem; the same seed gives the same problem."""
+    rng = random.Random(seed)
     G = generate_grid(size)
     cycle = generate_hamiltonian_cycle(size)
     while True:
-        circles, colors = place_circles(G, num_circles, cycle)
+        circles, colors = place_circles(G, num_circles, cycle, rng)
         if check_alternating_colors(cycle, circles, colors):
             break
     return G, circles, colors, cycle
@@ -0,0 +1,160 @@
+"""Batch generation of tasks on several cores straight into chess_tasks.db.
+
+Usage (from new_structure/):
+    python batch_generate.py THEME COMPLEXITY COUNT [--workers N] [--seed S] [--db PATH] [--pool]
+                             [--stats FILE]
+
+With --pool the tasks go to the pool of ready tasks (task_pool.db) that
+"Сгенерировать заново" takes from, instead of the tasks table. With --stats
+solver statistics of every generation call are appended to FILE as JSON lines.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from chess_tasks.core import Task, TaskPool, collect_stats, generate_task, supported_complexities
+from chess_tasks.core.generators import new_seed
+from chess_tasks.core.settings import GRID_SIZE_SETTINGS, TASK_TYPES, VALIDATION_SETTINGS
+from config import DB_PATH, POOL_DB_PATH, migrate_db
+
+# Сколько задач генерирует один процесс за раз: мелкие порции выравнивают нагрузку
+CHUNK_SIZE = 8
+
+INSERT_SQL = """
+    INSERT INTO tasks (
+        task_type, task_theme, name, complexity, grid_size,
+        walls, figures, numbers, solution, has_unique_solution, validation_notes,
+        seed, generation_attempt, generator_version
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def theme_type(theme: str) -> str:
+    """Task type ("Замкнутые"/"Незамкнутые") the theme belongs to"""
+    for task_type, themes in TASK_TYPES.items():
+        if theme in themes:
+            return task_type
+    raise ValueError(f"Неизвестная тема: {theme}")
+
+
+def task_row(task: Task) -> Tuple:
+    """Row of the tasks table for a validated task"""
+    figures = {f"{x},{y}": fig_type for (x, y), fig_type in task.figures.items()}
+    numbers = {f"{x},{y}": number for (x, y), number in task.numbers.items()}
+    count = task.solution_count
+    return (
+        task.task_type,
+        task.task_theme,
+        f"{task.task_type} - {task.task_theme} ({task.complexity})",
+        task.complexity,
+        task.grid_size,
+        json.dumps(task.walls),
+        json.dumps(figures, ensure_ascii=False),
+        json.dumps(numbers) if numbers else None,
+        json.dumps(task.solution) if task.solution else None,
+        bool(count and count.is_unique),
+        f"solutions: {count.label}" if count else None,
+        task.seed,
+        task.attempt,
+        task.generator_version,
+    )
+
+
+def generate_chunk(theme: str, complexity: str, count: int, seed: int,
+                   with_stats: bool = False) -> Tuple[List[Task], int, List[str]]:
+    """Generate up to `count` validated tasks in a worker.
+
+    Each task gets its own seed; generate_task runs its attempts (at most
+    ``max_attempts``, as in the GUI) and a seed it gives up on yields no
+    task. Returns the tasks, the number of attempts and, with
+    ``with_stats``, one JSON line of solver statistics per seed.
+    """
+    rng = random.Random(seed)  # Даёт seed каждой задачи порции
+    task_type = theme_type(theme)
+    tasks = []
+    stats_lines = []
+    attempts = 0
+    for _ in range(count):
+        task_seed = new_seed(rng)
+        with collect_stats() as stats:
+            try:
+                task = generate_task(task_type, theme, complexity, seed=task_seed)
+            except ValueError:
+                task = None
+        attempts += task.attempt + 1 if task else VALIDATION_SETTINGS['max_attempts']
+        if with_stats:
+            stats_lines.append(stats.to_json(
+                theme=theme, complexity=complexity, seed=task_seed,
+                attempt=task.attempt if task else None, valid=task is not None
+            ))
+        if task:
+            tasks.append(task)
+    return tasks, attempts, stats_lines
+
+
+def insert_rows(db_path: str, rows: List[Tuple]):
+    """Insert all rows in one transaction"""
+    migrate_db(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            conn.executemany(INSERT_SQL, rows)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('theme', choices=[theme for themes in TASK_TYPES.values() for theme in themes])
+    parser.add_argument('complexity', choices=list(GRID_SIZE_SETTINGS))
+    parser.add_argument('count', type=int)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=None,
+                        help='base seed; порция i генерируется с seed + i')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--pool', action='store_true', help='заполнить пул готовых задач')
+    parser.add_argument('--stats', metavar='FILE', help='дописать статистику решателя (JSON lines)')
+    args = parser.parse_args()
+    if args.complexity not in supported_complexities(args.theme):
+        parser.error(f"theme {args.theme!r} supports complexities: {', '.join(supported_complexities(args.theme))}")
+
+    base_seed = args.seed if args.seed is not None else random.randrange(1 << 31)
+    chunks = [min(CHUNK_SIZE, args.count - start) for start in range(0, args.count, CHUNK_SIZE)]
+
+    started = time.perf_counter()
+    tasks, attempts = [], 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # map сохраняет порядок порций, поэтому один и тот же seed даёт ту же выборку
+        results = executor.map(
+            generate_chunk,
+            [args.theme] * len(chunks), [args.complexity] * len(chunks),
+            chunks, [base_seed + index for index in range(len(chunks))],
+            [bool(args.stats)] * len(chunks)
+        )
+        stats_lines = []
+        for chunk_tasks, chunk_attempts, chunk_stats in results:
+            tasks.extend(chunk_tasks)
+            attempts += chunk_attempts
+            stats_lines.extend(chunk_stats)
+    elapsed = time.perf_counter() - started
+
+    if args.stats:
+        with open(args.stats, 'a', encoding='utf-8') as stream:
+            stream.writelines(line + '\n' for line in stats_lines)
+    if args.pool:
+        pool = TaskPool(POOL_DB_PATH)
+        for task in tasks:
+            pool.push(task)
+    else:
+        insert_rows(args.db, [task_row(task) for task in tasks])
+    print(f"seed {base_seed}: {len(tasks)}/{args.count} tasks in {elapsed:.2f}s "
+          f"({len(tasks) / elapsed:.1f} tasks/s, {attempts} attempts, {args.workers} workers)")
+
+
+if __name__ == '__main__':
+    main()
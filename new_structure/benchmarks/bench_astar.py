@@ -0,0 +1,128 @@
+"""A* node throughput: the old path-copying search against the parent-pointer one.
+
+The new search reads its heuristic from the board's BFS distance oracle.
+"cold" times include filling that row, as for a board queried once;
+"warm" times fill it beforehand, as validation does when the
+shortest-route counter shares the row. Node counts are the A*
+expansions reported through ``record(astar_expanded=...)``, not the
+BFS visits of the oracle.
+
+Usage (from new_structure/):
+    python benchmarks/bench_astar.py [--searches N] [--seed S]
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_tasks.core.board import Board, ORIENTATIONS  # noqa: E402
+from chess_tasks.core.search import find_path  # noqa: E402
+from chess_tasks.core.stats import collect_stats  # noqa: E402
+
+BOARD_SIZES = (8, 10, 16)
+WALL_DENSITY = 0.3
+
+
+def legacy_find_path(board, start, end, counter):
+    """Copy of the original TaskGenerator.find_path_a_star core"""
+    def heuristic(a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def get_neighbors(pos):
+        x, y = pos
+        neighbors = []
+        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            nx, ny = x + dx, y + dy
+            if board.is_valid_move(x, y, nx, ny):
+                neighbors.append((nx, ny))
+        return neighbors
+
+    count = 0
+    queue = [(0, count, start, [start], {start})]
+    closed_set = set()
+    while queue:
+        _, _, pos, path, visited = heapq.heappop(queue)
+        if pos == end:
+            return path
+        if pos in closed_set:
+            continue
+        closed_set.add(pos)
+        counter[0] += 1
+        for next_pos in get_neighbors(pos):
+            if next_pos in closed_set:
+                continue
+            new_path = path + [next_pos]
+            new_visited = visited | {next_pos}
+            count += 1
+            heapq.heappush(queue, (len(new_path) + heuristic(next_pos, end),
+                                   count, next_pos, new_path, new_visited))
+    return None
+
+
+def random_board(rng, size):
+    walls = []
+    for _ in range(int(size * size * WALL_DENSITY)):
+        walls.append((rng.randrange(size), rng.randrange(size), rng.choice(ORIENTATIONS)))
+    return walls
+
+
+def run(size, searches, seed):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(searches):
+        walls = random_board(rng, size)
+        start = (rng.randrange(size), rng.randrange(size))
+        end = (rng.randrange(size), rng.randrange(size))
+        cases.append((walls, start, end))
+
+    counter = [0]
+    legacy_time = 0.0
+    for walls, start, end in cases:
+        board = Board(size, walls)
+        t0 = time.perf_counter()
+        legacy_find_path(board, start, end, counter)
+        legacy_time += time.perf_counter() - t0
+    legacy_nodes = counter[0]
+
+    cold_time = warm_time = 0.0
+    with collect_stats() as stats:
+        for walls, start, end in cases:
+            board = Board(size, walls)
+            board.neighbors(0)  # Строим список смежности вне замера
+            t0 = time.perf_counter()
+            find_path(board, board.cell(*start), board.cell(*end))
+            cold_time += time.perf_counter() - t0
+    new_nodes = stats.counters.get('astar_expanded', 0)
+
+    for walls, start, end in cases:
+        board = Board(size, walls)
+        board.distances_from(board.cell(*start))  # Строка оракула вне замера
+        t0 = time.perf_counter()
+        find_path(board, board.cell(*start), board.cell(*end))
+        warm_time += time.perf_counter() - t0
+
+    return legacy_nodes, legacy_time, new_nodes, cold_time, warm_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--searches', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'board':>6} {'old nodes':>10} {'new nodes':>10} {'old ms/search':>14} {'cold ms':>8} "
+          f"{'warm ms':>8} {'cold':>6} {'warm':>6}")
+    for size in BOARD_SIZES:
+        legacy_nodes, legacy_time, new_nodes, cold_time, warm_time = run(size, args.searches, args.seed)
+        print(f"{size:>3}x{size:<2} {legacy_nodes:>10} {new_nodes:>10} "
+              f"{legacy_time * 1000 / args.searches:>14.3f} {cold_time * 1000 / args.searches:>8.3f} "
+              f"{warm_time * 1000 / args.searches:>8.3f} {legacy_time / cold_time:>5.1f}x "
+              f"{legacy_time / warm_time:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""Generator and solver benchmark over every theme and complexity level.
+
+Usage (from new_structure/):
+    python benchmarks/bench_generators.py [--tasks N] [--seed S] [--workers W]
+        [--themes T ...] [--complexities C ...] [--attempts A] [--nodes N]
+        [--output results.json] [--compare baseline.json] [--threshold 0.2]
+
+Every (theme, complexity) cell generates and validates --tasks tasks with
+the fixed seeds S, S+1, ... in its own fresh process (so peak memory is
+per cell) and reports success rate, median/p95 latency, solver nodes per
+second and peak RSS. With --compare the run is checked against a stored
+result file and the exit code is 1 if any cell regressed. Generation is
+limited only by the per-attempt node budget (--nodes, max_search_nodes),
+so the total node count of a cell is deterministic for fixed seeds and
+catches algorithmic regressions without timing noise.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chess_tasks.core import collect_stats, generate_task  # noqa: E402
+from chess_tasks.core.settings import (  # noqa: E402
+    GRID_SIZE_SETTINGS, TASK_THEME_FIGURES, TASK_TYPES, VALIDATION_SETTINGS
+)
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Счётчики SolverStats, которые считаются раскрытыми узлами поиска
+NODE_COUNTERS = ('astar_expanded', 'walk_expanded', 'tour_nodes', 'uniqueness_nodes')
+# Ниже этих значений задержки и скорость слишком шумят, чтобы их сравнивать
+MIN_LATENCY_DELTA_MS = 10.0
+MIN_NODES_FOR_RATE = 100000
+WARMUP_SEED = -1
+
+
+def theme_type(theme):
+    return next(task_type for task_type, themes in TASK_TYPES.items() if theme in themes)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def run_cell(theme, complexity, seeds, attempts, max_nodes):
+    """Generate and validate one task per seed; runs in a fresh worker process"""
+    VALIDATION_SETTINGS['max_attempts'] = attempts
+    VALIDATION_SETTINGS['max_search_nodes'] = max_nodes
+    task_type = theme_type(theme)
+    latencies = []
+    successes = 0
+    nodes = 0
+    try:
+        # Прогрев: импорты и кэши нового процесса не попадают в замер
+        generate_task(task_type, theme, complexity, seed=WARMUP_SEED)
+    except ValueError:
+        pass
+    for seed in seeds:
+        with collect_stats() as stats:
+            started = time.perf_counter()
+            try:
+                generate_task(task_type, theme, complexity, seed=seed)
+                valid = True
+            except ValueError:
+                valid = False
+            latencies.append(time.perf_counter() - started)
+        successes += valid
+        nodes += sum(stats.counters.get(name, 0) for name in NODE_COUNTERS)
+
+    total = sum(latencies)
+    return {
+        'theme': theme,
+        'complexity': complexity,
+        'runs': len(seeds),
+        'success_rate': round(successes / len(seeds), 3),
+        'median_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'nodes': nodes,
+        'nodes_per_sec': round(nodes / total) if total > 0 else 0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Regressions of ``results`` against ``baseline`` as human-readable lines"""
+    previous = {(cell['theme'], cell['complexity']): cell for cell in baseline['cells']}
+    # Число узлов сравнимо, только если совпадают seed и бюджет попытки
+    same_seeds = results['meta']['seeds'] == baseline['meta']['seeds'] and \
+        results['meta']['max_search_nodes'] == baseline['meta'].get('max_search_nodes')
+    regressions = []
+    for cell in results['cells']:
+        old = previous.get((cell['theme'], cell['complexity']))
+        if old is None:
+            continue
+        name = f"{cell['theme']} / {cell['complexity']}"
+        if cell['success_rate'] < old['success_rate'] - 0.1:
+            regressions.append(f"{name}: success {old['success_rate']:.0%} -> {cell['success_rate']:.0%}")
+        for key in ('median_ms', 'p95_ms'):
+            if cell[key] > old[key] * (1 + threshold) and cell[key] - old[key] > MIN_LATENCY_DELTA_MS:
+                regressions.append(f"{name}: {key} {old[key]} -> {cell[key]}")
+        if same_seeds and cell['nodes'] > old['nodes'] * (1 + threshold):
+            regressions.append(f"{name}: nodes {old['nodes']} -> {cell['nodes']}")
+        if old['nodes'] >= MIN_NODES_FOR_RATE and \
+                cell['nodes_per_sec'] < old['nodes_per_sec'] * (1 - threshold):
+            regressions.append(f"{name}: nodes/s {old['nodes_per_sec']} -> {cell['nodes_per_sec']}")
+        if old.get('peak_rss_mb') and cell.get('peak_rss_mb') and \
+                cell['peak_rss_mb'] > old['peak_rss_mb'] * (1 + threshold):
+            regressions.append(f"{name}: peak RSS {old['peak_rss_mb']} -> {cell['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tasks', type=int, default=5, help='задач (seed) на клетку')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='клеток параллельно; больше 1 искажает задержки')
+    parser.add_argument('--themes', nargs='+', default=list(TASK_THEME_FIGURES))
+    parser.add_argument('--complexities', nargs='+', default=list(GRID_SIZE_SETTINGS),
+                        choices=list(GRID_SIZE_SETTINGS))
+    parser.add_argument('--attempts', type=int, default=VALIDATION_SETTINGS['max_attempts'])
+    parser.add_argument('--nodes', type=int, default=VALIDATION_SETTINGS['max_search_nodes'],
+                        help='бюджет поиска на попытку (max_search_nodes)')
+    parser.add_argument('--output', help='записать результаты в JSON')
+    parser.add_argument('--compare', metavar='BASELINE', help='сравнить с сохранёнными результатами')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='допустимое относительное ухудшение (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    seeds = list(range(args.seed, args.seed + args.tasks))
+    cells = [(theme, complexity) for theme in args.themes for complexity in args.complexities]
+    # spawn и один процесс на клетку: пиковая память не наследуется от других клеток
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                             max_tasks_per_child=1) as executor:
+        futures = [executor.submit(run_cell, theme, complexity, seeds, args.attempts, args.nodes)
+                   for theme, complexity in cells]
+        print(f"{'theme':<40} {'level':<10} {'ok':>5} {'median ms':>10} {'p95 ms':>10} "
+              f"{'nodes/s':>10} {'RSS MB':>7}")
+        rows = []
+        for future in futures:
+            row = future.result()
+            rows.append(row)
+            print(f"{row['theme'][:40]:<40} {row['complexity']:<10} {row['success_rate']:>5.0%} "
+                  f"{row['median_ms']:>10.1f} {row['p95_ms']:>10.1f} {row['nodes_per_sec']:>10} "
+                  f"{row['peak_rss_mb'] if row['peak_rss_mb'] is not None else '-':>7}")
+
+    results = {
+        'meta': {
+            'seeds': seeds,
+            'attempts': args.attempts,
+            'max_search_nodes': args.nodes,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'cells': rows,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as stream:
+            json.dump(results, stream, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+        if baseline['meta']['seeds'] != seeds:
+            print("Внимание: seed в базовых результатах другие, сравнение неточное")
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Chess rook-route task generator"""
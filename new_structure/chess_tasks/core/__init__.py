@@ -0,0 +1,22 @@
+"""Headless task model, generators and solvers (no PyQt5 imports)"""
+from .board import Board
+from .budget import BudgetExceeded, SearchBudget
+from .corridors import CorridorGraph
+from .exact_cover import ExactCover
+from .generators import GenerationCancelled, generate_task, supported_complexities
+from .held_karp import find_waypoint_route
+from .longest_cycle import find_longest_loop
+from .ordered import OrderedRoute
+from .pool import TaskPool
+from .sum_route import SumRoute
+from .search import find_path, find_rook_path, find_waypoint_tour
+from .stats import SolverStats, collect_stats
+from .task import Task
+from .uniqueness import SolutionCount, count_solutions
+from .validation import find_solution, validate_task
+
+__all__ = [
+    'Board', 'Task', 'TaskPool', 'SolutionCount', 'SearchBudget', 'BudgetExceeded', 'GenerationCancelled',
+    'ExactCover', 'OrderedRoute', 'CorridorGraph', 'SumRoute', 'generate_task', 'supported_complexities', 'validate_task', 'find_solution',
+    'find_path', 'find_rook_path', 'find_waypoint_tour', 'find_waypoint_route', 'find_longest_loop', 'count_solutions', 'SolverStats', 'collect_stats',
+]
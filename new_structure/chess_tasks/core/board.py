@@ -0,0 +1,319 @@
+from array import array
+from typing import Iterable, List, Optional, Tuple, Union
+
+# Направления в порядке: вверх, вправо, вниз, влево
+DIRECTIONS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+ORIENTATIONS = ('top', 'right', 'bottom', 'left')
+
+Wall = Tuple[int, int, str]
+
+# Строк leg_distances в кэше доски, после чего он очищается
+LEG_CACHE_SIZE = 4096
+
+
+def parse_wall(wall: Union[Wall, List, str]) -> Wall:
+    """Convert a wall from tuple, JSON list or "x,y,orientation" string form"""
+    if isinstance(wall, str):
+        parts = wall.split(',')
+        if len(parts) != 3:
+            raise ValueError(f"Неверный формат стены: {wall!r}")
+        x, y, orientation = parts
+    else:
+        x, y, orientation = wall
+    orientation = str(orientation).strip()
+    if orientation not in ORIENTATIONS:
+        raise ValueError(f"Неизвестная ориентация стены: {orientation!r}")
+    return int(x), int(y), orientation
+
+
+class Board:
+    """Compact grid model with walls stored as edge planes indexed by cell number.
+
+    Cell (x, y) has index y * size + x. ``v_walls[i]`` blocks the edge between
+    cell i and its right neighbour, ``h_walls[i]`` the edge between cell i and
+    the cell below it. Planes hold counters so that overlapping walls
+    (e.g. (x, y, 'right') and (x + 1, y, 'left')) can be removed independently.
+
+    ``distances_from`` is a per-board distance oracle: the all-pairs BFS
+    table lives in one flat array (cell_count x cell_count, 128 KB for
+    16x16), its rows are filled on first use and the whole table is dropped
+    whenever a wall changes.
+
+    ``leg_distances`` caches BFS rows towards a cell around a set of
+    forbidden cells (the legs of an ordered route); they are dropped with
+    the distance table.
+
+    ``slide`` and ``rook_moves`` give sliding rook moves from four flat
+    planes of stopping cells, one per entry of DIRECTIONS. The planes are
+    built on first use and then kept up to date: opening or closing an
+    edge only rewrites the stops of the open segment on either side of it.
+    """
+
+    def __init__(self, size: int, walls: Optional[Iterable] = None):
+        self.size = size
+        self.cell_count = size * size
+        self.h_walls = bytearray(self.cell_count)
+        self.v_walls = bytearray(self.cell_count)
+        self.version = 0  # Увеличивается при каждом изменении стен
+        self._adjacency = None
+        self._distances = None  # Плоская таблица расстояний, строка на клетку
+        self._distance_rows = None  # 1 — строка уже посчитана
+        self._stops = None  # Клетка остановки скольжения: плоскость на направление
+        self._legs = {}  # (цель, запрещённые клетки) -> (расстояния, число кратчайших путей)
+        for wall in walls or ():
+            self.add_wall(*parse_wall(wall))
+
+    def copy(self) -> 'Board':
+        board = Board(self.size)
+        board.h_walls[:] = self.h_walls
+        board.v_walls[:] = self.v_walls
+        return board
+
+    def cell(self, x: int, y: int) -> int:
+        return y * self.size + x
+
+    def coords(self, cell: int) -> Tuple[int, int]:
+        return cell % self.size, cell // self.size
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def _edge(self, x: int, y: int, orientation: str) -> Optional[Tuple[bytearray, int]]:
+        """Return (plane, index) for a wall side, None for the outer border"""
+        if not self.in_bounds(x, y):
+            raise ValueError(f"Стена вне поля: {(x, y, orientation)}")
+        if orientation == 'right':
+            return (self.v_walls, self.cell(x, y)) if x < self.size - 1 else None
+        if orientation == 'left':
+            return (self.v_walls, self.cell(x - 1, y)) if x > 0 else None
+        if orientation == 'bottom':
+            return (self.h_walls, self.cell(x, y)) if y < self.size - 1 else None
+        if orientation == 'top':
+            return (self.h_walls, self.cell(x, y - 1)) if y > 0 else None
+        raise ValueError(f"Неизвестная ориентация стены: {orientation!r}")
+
+    def add_wall(self, x: int, y: int, orientation: str) -> bool:
+        """Add a wall; returns True if the edge was open before"""
+        edge = self._edge(x, y, orientation)
+        if edge is None:
+            return False
+        plane, index = edge
+        plane[index] += 1
+        self._touch()
+        if plane[index] == 1:
+            self._update_stops(plane, index)
+        return plane[index] == 1
+
+    def remove_wall(self, x: int, y: int, orientation: str) -> bool:
+        """Remove a wall; returns True if the edge became open"""
+        edge = self._edge(x, y, orientation)
+        if edge is None:
+            return False
+        plane, index = edge
+        if not plane[index]:
+            return False
+        plane[index] -= 1
+        self._touch()
+        if plane[index] == 0:
+            self._update_stops(plane, index)
+        return plane[index] == 0
+
+    def wall_between(self, a: int, b: int) -> Wall:
+        """Wall tuple that blocks the edge between two adjacent cells"""
+        if b < a:
+            a, b = b, a
+        x, y = self.coords(a)
+        if b == a + 1 and x < self.size - 1:
+            return x, y, 'right'
+        if b == a + self.size:
+            return x, y, 'bottom'
+        raise ValueError(f"Клетки {a} и {b} не соседние")
+
+    def _touch(self):
+        self.version += 1
+        self._adjacency = None
+        self._distances = None
+        self._distance_rows = None
+        self._legs = {}
+
+    def can_move(self, a: int, b: int) -> bool:
+        """O(1) check that a rook can step between adjacent cells a and b"""
+        if b < a:
+            a, b = b, a
+        diff = b - a
+        if diff == 1:
+            return a % self.size != self.size - 1 and not self.v_walls[a]
+        if diff == self.size:
+            return not self.h_walls[a]
+        return False
+
+    def is_valid_move(self, x1: int, y1: int, x2: int, y2: int) -> bool:
+        if not (self.in_bounds(x1, y1) and self.in_bounds(x2, y2)):
+            return False
+        return self.can_move(self.cell(x1, y1), self.cell(x2, y2))
+
+    def neighbors(self, cell: int) -> Tuple[int, ...]:
+        """Cells reachable from ``cell`` in one step"""
+        if self._adjacency is None:
+            self._adjacency = self._build_adjacency()
+        return self._adjacency[cell]
+
+    def _build_adjacency(self) -> List[Tuple[int, ...]]:
+        size = self.size
+        adjacency = []
+        for cell in range(self.cell_count):
+            x = cell % size
+            result = []
+            if cell >= size and not self.h_walls[cell - size]:
+                result.append(cell - size)
+            if x < size - 1 and not self.v_walls[cell]:
+                result.append(cell + 1)
+            if cell < self.cell_count - size and not self.h_walls[cell]:
+                result.append(cell + size)
+            if x > 0 and not self.v_walls[cell - 1]:
+                result.append(cell - 1)
+            adjacency.append(tuple(result))
+        return adjacency
+
+    def slide(self, cell: int, direction: int) -> int:
+        """Cell where a rook sliding from ``cell`` along DIRECTIONS[direction] stops at a wall"""
+        if self._stops is None:
+            self._stops = self._build_stops()
+        return self._stops[direction * self.cell_count + cell]
+
+    def rook_moves(self, cell: int, occupied: Iterable[int] = ()) -> Tuple[int, ...]:
+        """Cells a rook reaches from ``cell`` in one sliding move.
+
+        The rook slides until a wall or the cell before a piece on an
+        ``occupied`` cell; a direction blocked at once gives no move.
+        """
+        if self._stops is None:
+            self._stops = self._build_stops()
+        stops, cell_count, size = self._stops, self.cell_count, self.size
+        result = []
+        for direction, step in enumerate((-size, 1, size, -1)):
+            stop = stops[direction * cell_count + cell]
+            for piece in occupied:
+                # Фигура на луче между клеткой и остановкой обрывает ход перед собой
+                in_line = piece % size == cell % size if step in (size, -size) else piece // size == cell // size
+                if in_line and (piece - cell) * step > 0 and (piece - stop) * step <= 0:
+                    stop = piece - step
+            if stop != cell:
+                result.append(stop)
+        return tuple(result)
+
+    def _build_stops(self) -> array:
+        size, cell_count = self.size, self.cell_count
+        h_walls, v_walls = self.h_walls, self.v_walls
+        stops = array('h', range(cell_count)) * 4
+        up, right, down, left = (direction * cell_count for direction in range(4))
+        # Вверх и влево — по возрастанию клеток, вправо и вниз — по убыванию
+        for cell in range(cell_count):
+            if cell >= size and not h_walls[cell - size]:
+                stops[up + cell] = stops[up + cell - size]
+            if cell % size and not v_walls[cell - 1]:
+                stops[left + cell] = stops[left + cell - 1]
+        for cell in range(cell_count - 1, -1, -1):
+            if cell % size != size - 1 and not v_walls[cell]:
+                stops[right + cell] = stops[right + cell + 1]
+            if cell < cell_count - size and not h_walls[cell]:
+                stops[down + cell] = stops[down + cell + size]
+        return stops
+
+    def _update_stops(self, plane: bytearray, index: int):
+        """Rewrite the stops around the edge after ``index`` in ``plane`` that has just closed or opened"""
+        stops = self._stops
+        if stops is None:
+            return
+        cell_count = self.cell_count
+        if plane is self.v_walls:
+            step, forward, backward = 1, 1, 3
+        else:
+            step, forward, backward = self.size, 2, 0
+        a, b = index, index + step
+        forward *= cell_count
+        backward *= cell_count
+        if plane[index]:
+            # Ребро закрылось: скольжение с обеих сторон обрывается на нём
+            ahead, behind = a, b
+        else:
+            ahead, behind = stops[forward + b], stops[backward + a]
+        for cell in range(stops[backward + a], a + 1, step):
+            stops[forward + cell] = ahead
+        for cell in range(b, stops[forward + b] + 1, step):
+            stops[backward + cell] = behind
+
+    def distances_from(self, source: int) -> memoryview:
+        """Wall-aware step distances from ``source`` to every cell (-1 if unreachable).
+
+        Moves are symmetric, so this is also the distance from every cell to
+        ``source``. The row is a view into the cached table: do not modify it.
+        """
+        cell_count = self.cell_count
+        if self._distances is None:
+            self._distances = array('h', [-1]) * (cell_count * cell_count)
+            self._distance_rows = bytearray(cell_count)
+        offset = source * cell_count
+        row = memoryview(self._distances)[offset:offset + cell_count]
+        if not self._distance_rows[source]:
+            self._fill_distances(source, row)
+            self._distance_rows[source] = 1
+        return row
+
+    def leg_distances(self, target: int, forbidden: int) -> Tuple[List[int], List[int]]:
+        """Distances to ``target`` and shortest-path counts avoiding the cells of bitset ``forbidden``.
+
+        Returns two lists indexed by cell: the step distance to ``target``
+        (-1 if cut off or forbidden) and the number of shortest paths from
+        the cell to ``target``. Rows are cached per (target, forbidden)
+        until a wall changes; the cache is cleared when it reaches
+        LEG_CACHE_SIZE rows. Do not modify the lists.
+        """
+        key = (target, forbidden)
+        leg = self._legs.get(key)
+        if leg is not None:
+            return leg
+        neighbors = self.neighbors
+        row = [-1] * self.cell_count
+        ways = [0] * self.cell_count
+        row[target] = 0
+        ways[target] = 1
+        frontier = [target]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for cell in frontier:
+                for next_cell in neighbors(cell):
+                    if row[next_cell] == -1 and not forbidden >> next_cell & 1:
+                        row[next_cell] = depth
+                        next_frontier.append(next_cell)
+                    if row[next_cell] == depth:
+                        ways[next_cell] += ways[cell]
+            frontier = next_frontier
+        if len(self._legs) >= LEG_CACHE_SIZE:
+            self._legs.clear()
+        self._legs[key] = leg = (row, ways)
+        return leg
+
+    def distance(self, a: int, b: int) -> int:
+        """Wall-aware step distance between two cells, -1 if b is unreachable from a"""
+        if self._distance_rows is not None and self._distance_rows[b] and not self._distance_rows[a]:
+            a, b = b, a
+        return self.distances_from(a)[b]
+
+    def _fill_distances(self, source: int, row: memoryview):
+        """BFS from ``source`` into a row of -1 values"""
+        neighbors = self.neighbors
+        row[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for cell in frontier:
+                for next_cell in neighbors(cell):
+                    if row[next_cell] == -1:
+                        row[next_cell] = depth
+                        next_frontier.append(next_cell)
+            frontier = next_frontier
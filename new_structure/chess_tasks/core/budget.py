@@ -0,0 +1,120 @@
+import sys
+import time
+from typing import Callable, Optional
+
+from .settings import VALIDATION_SETTINGS
+
+try:
+    import resource  # Нет на Windows: там ограничение памяти не проверяется
+except ImportError:
+    resource = None
+
+
+# Цена узла каждого решателя для SearchBudget.charge: примерно микросекунды на узел,
+# измеренные на поле 10x10, так что max_search_nodes задаёт объём работы, а не число узлов
+PROPAGATION_NODE_COST = 100       # LoopPropagator: узел или проба
+EXACT_COVER_NODE_COST = 75        # ExactCover
+ORDERED_NODE_COST = 80            # OrderedRoute
+HELD_KARP_NODE_COST = 30          # WaypointRouter: состояние
+WAYPOINT_NODE_COST = 40           # find_waypoint_walk / find_waypoint_tour
+TWO_ROOK_SHORTEST_NODE_COST = 15  # TwoRookSearch.shortest
+TWO_ROOK_WALK_NODE_COST = 120     # TwoRookSearch: перебор маршрутов
+LONGEST_LOOP_NODE_COST = 10       # LongestLoop
+SUM_ROUTE_NODE_COST = 5           # SumRoute: состояние
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a search when its budget is used up"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SearchBudget:
+    """Cooperative limits for the searches of one generation attempt.
+
+    Searches call ``charge(cost)`` once per expanded node with their
+    ``*_NODE_COST`` above, the rough cost of the node in microseconds, so
+    ``max_nodes`` measures work the same way for every solver. Every
+    ``CHECK_EVERY`` units the budget compares wall-clock time, the node
+    count, the growth of the peak RSS and the optional ``cancelled``
+    callback against its limits and raises BudgetExceeded. An exhausted
+    budget stays exhausted, so later searches sharing it stop at their
+    first node.
+    """
+
+    CHECK_EVERY = 1024
+
+    def __init__(self, time_limit: Optional[float] = None, max_nodes: Optional[int] = None,
+                 max_memory_mb: Optional[float] = None,
+                 cancelled: Optional[Callable[[], bool]] = None):
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.max_memory_mb = max_memory_mb if resource is not None else None
+        self.cancelled = cancelled
+        self.started = time.perf_counter()
+        self.nodes = 0
+        self.exhausted: Optional[str] = None  # Причина остановки: time, nodes, memory, cancelled
+        self._next_check = self.CHECK_EVERY
+        self._base_rss = _peak_rss_mb() if self.max_memory_mb is not None else 0.0
+
+    @classmethod
+    def from_settings(cls, cancelled: Optional[Callable[[], bool]] = None,
+                      deterministic: bool = False, max_nodes: Optional[int] = None) -> 'SearchBudget':
+        """Budget of one attempt as configured in VALIDATION_SETTINGS.
+
+        ``max_nodes`` replaces ``max_search_nodes`` for searches that get a
+        smaller share of the work, such as clue minimisation.
+
+        Generation uses a ``deterministic`` budget, which drops the
+        wall-clock limit: the node limit runs out at the same node on any
+        machine and under any load, so a seeded generation replays the same
+        attempts and ``solution_timeout`` applies only to validation outside
+        generation. The memory cap applies everywhere; an attempt never comes
+        near it, so it only stops a runaway search, and only such an attempt
+        ends differently from machine to machine.
+        """
+        return cls(
+            time_limit=None if deterministic else VALIDATION_SETTINGS['solution_timeout'],
+            max_nodes=max_nodes if max_nodes is not None else VALIDATION_SETTINGS['max_search_nodes'],
+            max_memory_mb=VALIDATION_SETTINGS['max_search_memory_mb'],
+            cancelled=cancelled,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def charge(self, nodes: int = 1):
+        """Account for expanded nodes; raises BudgetExceeded when a limit is hit"""
+        self.nodes += nodes
+        if self.nodes >= self._next_check:
+            self.check()
+            self._next_check = self.nodes + self.CHECK_EVERY
+
+    def check(self):
+        """Compare all limits now; raises BudgetExceeded when one is hit"""
+        if self.exhausted is None:
+            if self.cancelled is not None and self.cancelled():
+                self.exhausted = 'cancelled'
+            elif self.time_limit is not None and self.elapsed > self.time_limit:
+                self.exhausted = 'time'
+            elif self.max_nodes is not None and self.nodes > self.max_nodes:
+                self.exhausted = 'nodes'
+            elif self.max_memory_mb is not None and _peak_rss_mb() - self._base_rss > self.max_memory_mb:
+                self.exhausted = 'memory'
+        if self.exhausted is not None:
+            self._next_check = 0  # Следующий charge() сразу остановит поиск
+            raise BudgetExceeded(self.exhausted)
+
+    def __repr__(self):
+        return f"SearchBudget(nodes={self.nodes}, elapsed={self.elapsed:.2f}s, exhausted={self.exhausted})"
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the process in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak /= 1024  # macOS отдаёт байты, Linux — килобайты
+    return peak / 1024
@@ -0,0 +1,196 @@
+"""Corridor contraction: dead ends dropped, chains of two-way cells merged into weighted edges"""
+import heapq
+from typing import Dict, Iterable, List, Tuple
+
+from .board import Board
+from .stats import record
+
+
+class CorridorGraph:
+    """The board reduced to junctions joined by corridors.
+
+    A route between terminals (start, end, clue cells) never enters a
+    dead end without a terminal: it could not come out again. Such cells
+    are dropped one by one, peeling whole blind corridors off the board.
+    Of the cells left, every non-terminal with exactly two open neighbours
+    is a corridor cell: a route that enters it goes straight through. The
+    other cells (junctions and terminals) become the nodes, and every
+    corridor between two nodes becomes one edge weighted by its number of
+    moves, keeping its cells for ``expand``. Corridors that come back to
+    the node they left never lie on a simple route and are dropped.
+
+    ``forced_edges`` lists the edges that every route from the first
+    terminal to the second has to take: the bridges of the reduced graph
+    that separate them (Tarjan's lowlink over the multigraph, so parallel
+    corridors are not bridges). A simple route crosses each of them once,
+    so ``stages`` splits the nodes into the stretches between them, which
+    the route walks through in order.
+    """
+
+    def __init__(self, board: Board, terminals: Iterable[int]):
+        self.board = board
+        self.terminals = list(dict.fromkeys(terminals))
+        neighbors = [board.neighbors(cell) for cell in range(board.cell_count)]
+        keep = set(self.terminals)
+        alive = bytearray(b'\x01') * board.cell_count
+        degree = list(map(len, neighbors))
+        # Снимаем тупики слоями: после каждого тупиком может стать сосед
+        stack = [cell for cell in range(board.cell_count) if degree[cell] < 2 and cell not in keep]
+        dead_ends = 0
+        while stack:
+            cell = stack.pop()
+            if not alive[cell]:
+                continue
+            alive[cell] = 0
+            dead_ends += 1
+            for next_cell in neighbors[cell]:
+                if alive[next_cell]:
+                    degree[next_cell] -= 1
+                    if degree[next_cell] < 2 and next_cell not in keep:
+                        stack.append(next_cell)
+        self.alive = alive
+        self.dead_ends = dead_ends
+
+        self.nodes = [cell for cell in range(board.cell_count)
+                      if alive[cell] and (cell in keep or degree[cell] != 2)]
+        self.index = {cell: i for i, cell in enumerate(self.nodes)}
+        index = self.index
+        self.edges: List[Tuple[int, int, List[int]]] = []  # (узел, узел, клетки коридора между ними)
+        # links[узел] — (соседний узел, число ходов, номер ребра)
+        self.links: List[List[Tuple[int, int, int]]] = [[] for _ in self.nodes]
+        for u, cell in enumerate(self.nodes):
+            for next_cell in neighbors[cell]:
+                if not alive[next_cell]:
+                    continue
+                prev, corridor = cell, []
+                while next_cell not in index:
+                    corridor.append(next_cell)
+                    a, b = [c for c in neighbors[next_cell] if alive[c]]
+                    prev, next_cell = next_cell, b if a == prev else a
+                v = index[next_cell]
+                # Коридор виден с обоих концов: берём его с меньшего узла.
+                # Петли на один узел простому маршруту не нужны
+                if u < v:
+                    edge = len(self.edges)
+                    self.links[u].append((v, len(corridor) + 1, edge))
+                    self.links[v].append((u, len(corridor) + 1, edge))
+                    self.edges.append((u, v, corridor))
+        record(corridor_cells=sum(alive), corridor_nodes=len(self.nodes), corridor_edges=len(self.edges),
+               corridor_dead_ends=dead_ends)
+
+    def forced_edges(self) -> List[int]:
+        """Bridges between the first two terminals, in route order from the first"""
+        if len(self.terminals) < 2:
+            return []
+        source, target = self.index[self.terminals[0]], self.index[self.terminals[1]]
+        order = [-1] * len(self.nodes)
+        low = [0] * len(self.nodes)
+        last = [0] * len(self.nodes)  # Наибольший номер обхода в поддереве
+        via = [-1] * len(self.nodes)  # Ребро дерева, по которому пришли
+        order[source] = low[source] = 0
+        counter = 1
+        stack = [(source, iter(self.links[source]))]
+        bridges = []
+        while stack:
+            node, links = stack[-1]
+            for next_node, _, edge in links:
+                if edge == via[node]:
+                    continue
+                if order[next_node] < 0:
+                    order[next_node] = low[next_node] = counter
+                    counter += 1
+                    via[next_node] = edge
+                    stack.append((next_node, iter(self.links[next_node])))
+                    break
+                low[node] = min(low[node], order[next_node])
+            else:
+                stack.pop()
+                last[node] = counter - 1
+                if stack:
+                    parent = stack[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                    if low[node] > order[parent] and order[target] >= 0 and \
+                            order[node] <= order[target] <= last[node]:
+                        bridges.append(via[node])
+        bridges.reverse()
+        record(corridor_forced=len(bridges))
+        return bridges
+
+    def stages(self) -> Dict[int, int]:
+        """Node cell -> number of forced edges between it and the first terminal; cut-off nodes are left out"""
+        if len(self.terminals) < 2:
+            return {}
+        forced = self.forced_edges()
+        cut = set(forced)
+        stage = [-1] * len(self.nodes)
+
+        def fill(node: int, number: int):
+            stage[node] = number
+            stack = [node]
+            while stack:
+                for next_node, _, edge in self.links[stack.pop()]:
+                    if stage[next_node] < 0 and edge not in cut:
+                        stage[next_node] = number
+                        stack.append(next_node)
+
+        fill(self.index[self.terminals[0]], 0)
+        # Дальний конец очередного моста ещё не размечен: всё размеченное — по эту сторону
+        for number, edge in enumerate(forced, 1):
+            u, v, _ = self.edges[edge]
+            fill(v if stage[u] >= 0 else u, number)
+        return {self.nodes[node]: number for node, number in enumerate(stage) if number >= 0}
+
+    def expand(self, start: int, edges: List[int]) -> List[int]:
+        """Cells of the route that leaves node cell ``start`` along ``edges``"""
+        route = [start]
+        node = self.index[start]
+        for edge in edges:
+            u, v, corridor = self.edges[edge]
+            route.extend(corridor if u == node else reversed(corridor))
+            node = v if u == node else u
+            route.append(self.nodes[node])
+        return route
+
+    def count_shortest(self, start: int, end: int, limit: int, stats: Dict,
+                       solutions: List[List[int]]) -> int:
+        """Number of shortest routes from ``start`` to ``end`` (capped at ``limit``) by Dijkstra.
+
+        Every shortest route goes through whole corridors, so it is one
+        shortest path of the reduced graph and the counts match the
+        cell-level BFS. One route, expanded back to cells, is appended to
+        ``solutions``.
+        """
+        source, target = self.index[start], self.index[end]
+        links = self.links
+        distance = [-1] * len(self.nodes)
+        ways = [0] * len(self.nodes)
+        done = bytearray(len(self.nodes))
+        distance[source], ways[source] = 0, 1
+        queue = [(0, source)]
+        while queue:
+            d, node = heapq.heappop(queue)
+            if done[node]:
+                continue
+            done[node] = 1
+            stats['nodes'] += 1
+            if node == target:
+                break
+            for next_node, weight, _ in links[node]:
+                next_d = d + weight
+                if distance[next_node] < 0 or next_d < distance[next_node]:
+                    distance[next_node], ways[next_node] = next_d, ways[node]
+                    heapq.heappush(queue, (next_d, next_node))
+                elif next_d == distance[next_node] and not done[next_node]:
+                    ways[next_node] = min(ways[next_node] + ways[node], limit)
+        if not done[target]:
+            return 0
+
+        edges, node = [], target
+        while node != source:
+            node, _, edge = next(link for link in links[node]
+                                 if done[link[0]] and distance[link[0]] + link[1] == distance[node])
+            edges.append(edge)
+        edges.reverse()
+        solutions.append(self.expand(start, edges))
+        return ways[target]
+
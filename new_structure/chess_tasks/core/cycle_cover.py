@@ -0,0 +1,40 @@
+"""Covers of the board by disjoint loops, written as one route"""
+from typing import List
+
+
+def split_loops(route: List[int]) -> List[List[int]]:
+    """Split loops written one after another ([a0, ..., a0, b0, ..., b0]) into single loops"""
+    loops = []
+    start = None
+    for cell in route:
+        if start is None:
+            start = cell
+            loops.append([cell])
+            continue
+        loops[-1].append(cell)
+        if cell == start:
+            start = None
+    return loops
+
+
+def join_loops(loops: List[List[int]]) -> List[int]:
+    """Several loops [c0, ..., c0] as one route in the split_loops format"""
+    return [cell for loop in loops for cell in loop]
+
+
+def loops_route(links: List[List[int]]) -> List[int]:
+    """Loops of a cover given as the two neighbours of every cell, smallest cell first"""
+    seen = bytearray(len(links))
+    loops = []
+    for start in range(len(links)):
+        if seen[start]:
+            continue
+        loop = [start, min(links[start])]
+        seen[start] = 1
+        while loop[-1] != start:
+            prev, cell = loop[-2], loop[-1]
+            seen[cell] = 1
+            first, second = links[cell]
+            loop.append(second if first == prev else first)
+        loops.append(loop)
+    return join_loops(loops)
@@ -0,0 +1,270 @@
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+from .board import Board
+from .budget import SearchBudget
+from .cycle_cover import join_loops, split_loops
+from .stats import timed_stage
+from .uniqueness import CIRCLE_FIGURES, SolutionCount, count_solutions
+
+Edge = Tuple[int, int]
+
+
+def edge_key(a: int, b: int) -> Edge:
+    return (a, b) if a < b else (b, a)
+
+
+def cycle_edges(cycle: List[int]) -> Set[Edge]:
+    """Undirected edges of a loop given as [c0, c1, ..., c0] or without the repeat.
+
+    Several loops one after another (see split_loops) give the edges of all of them.
+    """
+    edges = set()
+    for loop in split_loops(cycle):
+        edges.update(edge_key(a, b) for a, b in zip(loop, loop[1:]))
+        if loop[0] != loop[-1]:
+            edges.add(edge_key(loop[-1], loop[0]))
+    return edges
+
+
+def spanning_tree_cycle(size: int, rng=random) -> List[int]:
+    """Random Hamiltonian cycle of an even-sized empty grid.
+
+    Every 2x2 block is a small loop; merging the blocks along a random
+    spanning tree of the (size/2)x(size/2) block grid joins them into one
+    loop through every cell.
+    """
+    edges = _block_loops(size)
+    for block, other in _block_tree(size, rng):
+        _merge_blocks(edges, size, block, other)
+    return order_cycle(edges)
+
+
+def spanning_tree_cover(size: int, rng=random) -> List[List[int]]:
+    """Two random disjoint loops that together pass through every cell of an even-sized empty grid.
+
+    Like spanning_tree_cycle, but one edge of the block spanning tree is
+    left out, so the blocks merge into two loops. The edge is picked among
+    those that leave at least a quarter of the blocks on either side.
+    """
+    tree = _block_tree(size, rng)
+    # Размер поддерева каждого блока: дерево перечислено от корня, родитель раньше потомка
+    subtree = {}
+    for block, other in reversed(tree):
+        subtree[block] = subtree.get(block, 1) + subtree.setdefault(other, 1)
+    total = (size // 2) ** 2
+    balance = [min(subtree[other], total - subtree[other]) for _, other in tree]
+    cuts = [i for i, side in enumerate(balance) if side >= total // 4] or [balance.index(max(balance))]
+    cut = rng.choice(cuts)
+    edges = _block_loops(size)
+    for i, (block, other) in enumerate(tree):
+        if i != cut:
+            _merge_blocks(edges, size, block, other)
+    return order_cycles(edges)
+
+
+def _block_loops(size: int) -> Set[Edge]:
+    """Edges of the small loops around every 2x2 block"""
+    if size % 2:
+        raise ValueError("Гамильтонов цикл существует только на поле чётного размера")
+    half = size // 2
+    edges = set()
+    for by in range(half):
+        for bx in range(half):
+            a, b = 2 * by * size + 2 * bx, 2 * by * size + 2 * bx + 1
+            c, d = a + size, b + size
+            edges.update({edge_key(a, b), edge_key(b, d), edge_key(c, d), edge_key(a, c)})
+    return edges
+
+
+def _block_tree(size: int, rng=random) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """Random spanning tree of the block grid (randomised depth-first search) as (parent, child) pairs"""
+    half = size // 2
+    seen = {(0, 0)}
+    stack = [(0, 0)]
+    tree = []
+    while stack:
+        bx, by = stack[-1]
+        options = [(bx + dx, by + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                   if 0 <= bx + dx < half and 0 <= by + dy < half and (bx + dx, by + dy) not in seen]
+        if not options:
+            stack.pop()
+            continue
+        nbx, nby = rng.choice(options)
+        seen.add((nbx, nby))
+        stack.append((nbx, nby))
+        tree.append(((bx, by), (nbx, nby)))
+    return tree
+
+
+def _merge_blocks(edges: Set[Edge], size: int, block: Tuple[int, int], other: Tuple[int, int]):
+    """Join the loops of two neighbouring blocks: the edges facing each other are swapped"""
+    (bx, by), (nbx, nby) = block, other
+    lx, ly = min(bx, nbx), min(by, nby)
+    if nby == by:
+        top_left = 2 * ly * size + 2 * lx + 1
+        bottom_left = top_left + size
+        edges -= {edge_key(top_left, bottom_left), edge_key(top_left + 1, bottom_left + 1)}
+        edges |= {edge_key(top_left, top_left + 1), edge_key(bottom_left, bottom_left + 1)}
+    else:
+        top_left = (2 * ly + 1) * size + 2 * lx
+        top_right = top_left + 1
+        edges -= {edge_key(top_left, top_right), edge_key(top_left + size, top_right + size)}
+        edges |= {edge_key(top_left, top_left + size), edge_key(top_right, top_right + size)}
+
+
+def order_cycle(edges: Set[Edge]) -> List[int]:
+    """Turn the edge set of a single loop into the cell order [c0, ..., c0]"""
+    return order_cycles(edges)[0]
+
+
+def order_cycles(edges: Set[Edge]) -> List[List[int]]:
+    """Turn the edge set of disjoint loops into their cell orders, smallest start cell first"""
+    adjacency: Dict[int, List[int]] = {}
+    for a, b in edges:
+        adjacency.setdefault(a, []).append(b)
+        adjacency.setdefault(b, []).append(a)
+    cycles = []
+    seen = set()
+    for start in sorted(adjacency):
+        if start in seen:
+            continue
+        cycle = [start, adjacency[start][0]]
+        while cycle[-1] != start:
+            a, b = adjacency[cycle[-1]]
+            cycle.append(a if a != cycle[-2] else b)
+        seen.update(cycle)
+        cycles.append(cycle)
+    return cycles
+
+
+def backbite_mix(board: Board, cycle: List[int], steps: int, rng=random) -> List[int]:
+    """Randomise a Hamiltonian cycle with backbite moves.
+
+    The loop is opened into a Hamiltonian path, ``steps`` backbite moves are
+    applied, and the walk continues until the ends are adjacent again. If the
+    path does not close within a few more rounds the original loop is kept.
+    """
+    path = cycle[:-1] if cycle[0] == cycle[-1] else list(cycle)
+    cut = rng.randrange(len(path))
+    path = path[cut:] + path[:cut]
+    max_steps = steps * 4
+    for step in range(max_steps):
+        # Откусываем с случайного конца: сосед конца становится точкой разворота
+        if rng.random() < 0.5:
+            path.reverse()
+        end = path[-1]
+        pivot = rng.choice(board.neighbors(end))
+        if pivot != path[-2]:
+            i = path.index(pivot)
+            path[i + 1:] = path[:i:-1]
+        if step >= steps and board.can_move(path[0], path[-1]):
+            return path + [path[0]]
+    return cycle
+
+
+def mixed_loop_cover(size: int, rng=random) -> List[int]:
+    """Two random loops through every cell, returned one after another (see split_loops).
+
+    Each loop of spanning_tree_cover is mixed with backbite moves inside its
+    own cells: the edges between the two loops are walled off for the mix.
+    """
+    empty = Board(size)
+    loops = spanning_tree_cover(size, rng)
+    owner = {cell: i for i, loop in enumerate(loops) for cell in loop}
+    border = [empty.wall_between(a, b) for a in range(size * size) for b in empty.neighbors(a)
+              if a < b and owner[a] != owner[b]]
+    board = Board(size, border)
+    return join_loops([backbite_mix(board, loop, len(loop), rng) for loop in loops])
+
+
+def derive_figures(theme_rules: Dict, cycle: List[int], count: int, rng=random) -> Dict[int, int]:
+    """Clue figures read off a known loop, so the loop satisfies them by construction"""
+    if theme_rules.get('multi_loop'):
+        # Кружки одного цвета на каждом цикле, хотя бы по одному
+        figures = {}
+        loops = split_loops(cycle)
+        for colour, loop in zip(CIRCLE_FIGURES, loops):
+            cells = rng.sample(loop[:-1], max(1, count // len(loops)))
+            figures.update((cell, colour) for cell in cells)
+        return figures
+    order = cycle[:-1] if cycle[0] == cycle[-1] else cycle
+    if theme_rules.get('straight_through'):
+        candidates = [cell for i, cell in enumerate(order)
+                      if cell - order[i - 1] == order[(i + 1) % len(order)] - cell]
+        return {cell: 1 for cell in rng.sample(candidates, min(count, len(candidates)))}
+    if theme_rules.get('alternate_colors'):
+        count -= count % 2  # Чередование по кругу возможно только при чётном числе кружков
+        positions = sorted(rng.sample(range(len(order)), max(count, 2)))
+        return {order[i]: 1 if k % 2 == 0 else 2 for k, i in enumerate(positions)}
+    return {cell: 1 for cell in rng.sample(order, min(count, len(order)))}
+
+
+def loop_colours(route: List[int], figures: Dict[int, int]) -> Dict[int, int]:
+    """Circle colour of the loop through every cell, for loops one after another"""
+    colours = {}
+    for loop in split_loops(route):
+        colour = next((figures[cell] for cell in loop if figures.get(cell) in CIRCLE_FIGURES), 0)
+        colours.update((cell, colour) for cell in loop)
+    return colours
+
+
+@timed_stage('build_closed_task')
+def build_closed_task(size: int, theme_rules: Dict, num_figures: int,
+                      min_walls: int, max_walls: int, rng=random, max_rounds: int = 50,
+                      budget: Optional[SearchBudget] = None) -> Optional[Tuple[List, Dict[int, int], SolutionCount]]:
+    """Construct-then-clue generator for loop themes.
+
+    Builds a random Hamiltonian loop (two loops for multi-loop themes)
+    first, then derives walls (on edges the loop does not use) and figures
+    from it, so every candidate is solvable. Starts with ``min_walls``
+    random walls (multi-loop themes: halfway to ``max_walls``); while a
+    second solution exists, a wall is placed on an edge that only the
+    rival solution uses (in multi-loop themes a circle goes first on a
+    cell that the rival puts on the other loop). Returns (walls, figures
+    by cell, SolutionCount) or None if the wall budget or the search
+    ``budget`` runs out before the solution is unique.
+    """
+    empty = Board(size)
+    if theme_rules.get('multi_loop'):
+        cycle = mixed_loop_cover(size, rng)
+    else:
+        cycle = backbite_mix(empty, spanning_tree_cycle(size, rng), size * size, rng)
+    used = cycle_edges(cycle)
+    unused = [edge_key(a, b) for a in range(size * size) for b in empty.neighbors(a)
+              if a < b and edge_key(a, b) not in used]
+    rng.shuffle(unused)
+
+    figures = derive_figures(theme_rules, cycle, num_figures, rng)
+    planted = loop_colours(cycle, figures) if theme_rules.get('multi_loop') else None
+    # Стены по ребрам соперников отсекают больше случайных: начинаем с минимума.
+    # Нескольким циклам сначала помогают кружки, им — половина запаса стен сразу
+    first_walls = (min_walls + max_walls) // 2 if theme_rules.get('multi_loop') else min_walls
+    walls = [empty.wall_between(a, b) for a, b in unused[:first_walls]]
+    board = Board(size, walls)
+
+    for _ in range(max_rounds):
+        result = count_solutions(board, figures, theme_rules, budget=budget)
+        if result.is_unknown:
+            return None
+        if result.count == 1:
+            return walls, figures, result
+        if result.count == 0:
+            return None
+        rival = result.solutions[1] if cycle_edges(result.solutions[1]) != used else result.solutions[0]
+        if theme_rules.get('multi_loop'):
+            # Кружок на клетке, которую соперник отнёс к другому циклу, отсекает его без стены
+            moved = sorted(cell for cell, colour in loop_colours(rival, figures).items()
+                           if colour != planted[cell])
+            if moved:
+                cell = rng.choice(moved)
+                figures[cell] = planted[cell]
+                continue
+        if len(walls) >= max_walls:
+            return None
+        # Ставим стену на ребро, которое использует только альтернативное решение
+        rival = sorted(cycle_edges(rival) - used)
+        wall = empty.wall_between(*rng.choice(rival))
+        walls.append(wall)
+        board.add_wall(*wall)
+    return None
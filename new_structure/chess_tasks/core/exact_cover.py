@@ -0,0 +1,283 @@
+"""Exact cover with colours solved by dancing links (Knuth's Algorithm C)"""
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from .budget import EXACT_COVER_NODE_COST, SearchBudget
+
+# accept(option, exclude) после выбора варианта: False отбрасывает ветку, exclude(other)
+# убирает вариант до возврата из ветки; retract(option) вызывается после каждого accept
+Accept = Optional[Callable[[int, Callable[[int], bool]], bool]]
+Retract = Optional[Callable[[int], None]]
+
+
+class ExactCover:
+    """Exact cover problem with primary and coloured secondary items.
+
+    Every primary item must be covered by exactly one chosen option.
+    Secondary items may be left uncovered; an option lists them as
+    ``(item, colour)`` and all chosen options that share a secondary item
+    must give it the same colour (a plain secondary item, without colour,
+    is covered at most once). Cycle covers, for instance, use cells as
+    primary items and grid edges as secondary items coloured "used" or
+    "unused" by the cell on either side.
+
+    The matrix is kept in flat lists (TOP, ULINK, DLINK, COLOR and item
+    lengths) laid out as in Algorithm C: item headers first, then the
+    options separated by spacer nodes. The search always branches on the
+    primary item with the fewest remaining options. Constraints that are
+    not local to one item (e.g. "the chosen edges form no small loop")
+    are checked by the ``accept`` hook as options are chosen; the hook can
+    also exclude options that the choice has made illegal, so they stop
+    counting towards the item lengths that steer the branching.
+    """
+
+    def __init__(self, primary: Iterable[Hashable], secondary: Iterable[Hashable] = ()):
+        primary = list(primary)
+        secondary = list(secondary)
+        self.primary_count = len(primary)
+        self.item_count = len(primary) + len(secondary)
+        self.index: Dict[Hashable, int] = {name: i for i, name in enumerate(primary + secondary, 1)}
+        n = self.item_count
+        # Заголовки: 0 — корень списка основных предметов, n + 1 — вспомогательных
+        self.llink = [0] * (n + 2)
+        self.rlink = [0] * (n + 2)
+        for root, items in ((0, range(1, self.primary_count + 1)), (n + 1, range(self.primary_count + 1, n + 1))):
+            prev = root
+            for i in items:
+                self.llink[i] = prev
+                self.rlink[prev] = i
+                prev = i
+            self.rlink[prev] = root
+            self.llink[root] = prev
+        self.length = [0] * (n + 1)
+        # Узлы 1..n — заголовки столбцов, n + 1 — первый разделитель
+        self.top = [0] * (n + 2)
+        self.ulink = list(range(n + 1)) + [0]
+        self.dlink = list(range(n + 1)) + [0]
+        self.colour = [0] * (n + 2)
+        self.option_of = [-1] * (n + 2)  # Номер варианта для каждого узла
+        self.option_start: List[int] = []  # Первый узел варианта (основной предмет)
+        self.colour_ids: Dict[Hashable, int] = {}
+        self.option_count = 0
+
+    def add_option(self, primary: Iterable[Hashable], secondary: Iterable = ()) -> int:
+        """Add an option covering ``primary`` items and ``secondary`` (item, colour) pairs.
+
+        A colour of None covers the secondary item instead of colouring it.
+        Returns the option number reported in solutions.
+        """
+        top, ulink, dlink = self.top, self.ulink, self.dlink
+        spacer = len(top) - 1
+        option = self.option_count
+        items = [(name, None) for name in primary] + list(secondary)
+        if not primary:
+            raise ValueError("Вариант без основного предмета")
+        self.option_start.append(spacer + 1)
+        for name, colour in items:
+            i = self.index[name]
+            if colour is not None:
+                if i <= self.primary_count:
+                    raise ValueError(f"Цвет у основного предмета {name!r}")
+                colour = self.colour_ids.setdefault(colour, len(self.colour_ids) + 1)
+            node = len(top)
+            top.append(i)
+            ulink.append(ulink[i])
+            dlink.append(i)
+            dlink[ulink[i]] = node
+            ulink[i] = node
+            self.colour.append(colour or 0)
+            self.option_of.append(option)
+            self.length[i] += 1
+        last = len(top) - 1
+        # Новый разделитель: ULINK — первый узел варианта, DLINK разделителя перед ним — последний
+        dlink[spacer] = last
+        top.append(-(option + 1))
+        ulink.append(spacer + 1)
+        dlink.append(0)
+        self.colour.append(0)
+        self.option_of.append(-1)
+        self.option_count += 1
+        return option
+
+    def solve(self, limit: int, accept: Accept = None, retract: Retract = None,
+              stats: Optional[Dict] = None, budget: Optional[SearchBudget] = None) -> List[List[int]]:
+        """Up to ``limit`` solutions as lists of option numbers.
+
+        ``stats`` gets 'nodes' and 'pruned' counters added. Raises
+        BudgetExceeded when ``budget`` runs out.
+        """
+        top, ulink, dlink, colour = self.top, self.ulink, self.dlink, self.colour
+        llink, rlink, length = self.llink, self.rlink, self.length
+        option_of, option_start = self.option_of, self.option_start
+        charge = budget.charge if budget is not None else None
+        solutions: List[List[int]] = []
+        chosen: List[int] = []
+        excluded: List[int] = []
+        counters = {'nodes': 0, 'pruned': 0}
+
+        def hide(p: int):
+            q = p + 1
+            while q != p:
+                x = top[q]
+                if x <= 0:
+                    q = ulink[q]
+                elif colour[q] < 0:
+                    q += 1
+                else:
+                    u, d = ulink[q], dlink[q]
+                    dlink[u] = d
+                    ulink[d] = u
+                    length[x] -= 1
+                    q += 1
+
+        def unhide(p: int):
+            q = p - 1
+            while q != p:
+                x = top[q]
+                if x <= 0:
+                    q = dlink[q]
+                elif colour[q] < 0:
+                    q -= 1
+                else:
+                    u, d = ulink[q], dlink[q]
+                    dlink[u] = q
+                    ulink[d] = q
+                    length[x] += 1
+                    q -= 1
+
+        def cover(i: int):
+            p = dlink[i]
+            while p != i:
+                hide(p)
+                p = dlink[p]
+            left, right = llink[i], rlink[i]
+            rlink[left] = right
+            llink[right] = left
+
+        def uncover(i: int):
+            left, right = llink[i], rlink[i]
+            rlink[left] = i
+            llink[right] = i
+            p = ulink[i]
+            while p != i:
+                unhide(p)
+                p = ulink[p]
+
+        def purify(p: int):
+            c, i = colour[p], top[p]
+            q = dlink[i]
+            while q != i:
+                if colour[q] == c:
+                    colour[q] = -1
+                else:
+                    hide(q)
+                q = dlink[q]
+
+        def unpurify(p: int):
+            c, i = colour[p], top[p]
+            q = ulink[i]
+            while q != i:
+                if colour[q] < 0:
+                    colour[q] = c
+                else:
+                    unhide(q)
+                q = ulink[q]
+
+        def commit(p: int):
+            j = top[p]
+            if colour[p] == 0:
+                cover(j)
+            elif colour[p] > 0:
+                purify(p)
+
+        def uncommit(p: int):
+            j = top[p]
+            if colour[p] == 0:
+                uncover(j)
+            elif colour[p] > 0:
+                unpurify(p)
+
+        def exclude(option: int) -> bool:
+            """Remove a still available option from all its items; False if it was not available"""
+            p = option_start[option]
+            i = top[p]
+            if rlink[llink[i]] != i:
+                return False  # Предмет уже покрыт
+            q = dlink[i]
+            while q != i and q != p:
+                q = dlink[q]
+            if q != p:
+                return False  # Вариант уже скрыт
+            hide(p)
+            u, d = ulink[p], dlink[p]
+            dlink[u] = d
+            ulink[d] = u
+            length[i] -= 1
+            excluded.append(p)
+            return True
+
+        def restore(mark: int):
+            while len(excluded) > mark:
+                p = excluded.pop()
+                dlink[ulink[p]] = p
+                ulink[dlink[p]] = p
+                length[top[p]] += 1
+                unhide(p)
+
+        def search() -> bool:
+            """True once ``limit`` solutions are found"""
+            counters['nodes'] += 1
+            if charge is not None:
+                charge(EXACT_COVER_NODE_COST)
+            i = rlink[0]
+            if i == 0:
+                solutions.append(chosen[:])
+                return len(solutions) >= limit
+            # Предмет с наименьшим числом вариантов
+            best, best_length = i, length[i]
+            while i != 0 and best_length > 1:
+                if length[i] < best_length:
+                    best, best_length = i, length[i]
+                i = rlink[i]
+            if best_length == 0:
+                counters['pruned'] += 1
+                return False
+            cover(best)
+            row = dlink[best]
+            done = False
+            while row != best and not done:
+                p = row + 1
+                while p != row:
+                    if top[p] <= 0:
+                        p = ulink[p]
+                    else:
+                        commit(p)
+                        p += 1
+                option = option_of[row]
+                chosen.append(option)
+                mark = len(excluded)
+                if accept is None or accept(option, exclude):
+                    done = search()
+                else:
+                    counters['pruned'] += 1
+                restore(mark)
+                if retract is not None:
+                    retract(option)
+                chosen.pop()
+                p = row - 1
+                while p != row:
+                    if top[p] <= 0:
+                        p = dlink[p]
+                    else:
+                        uncommit(p)
+                        p -= 1
+                row = dlink[row]
+            uncover(best)
+            return done
+
+        try:
+            search()
+        finally:
+            if stats is not None:
+                for name, value in counters.items():
+                    stats[name] = stats.get(name, 0) + value
+        return solutions
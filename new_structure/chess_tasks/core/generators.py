@@ -0,0 +1,559 @@
+"""Task generators for closed and open themes"""
+import random
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .board import Board
+from .budget import SearchBudget
+from .cycles import build_closed_task
+from .longest_cycle import LongestLoop, blocks_through
+from .minimize import minimize_clues
+from .multi_agent import BASE_FIGURE, ROOK_FIGURE, split_routes
+from .ordered import CROSS_FIGURE, NUMBER_FIGURE
+from .settings import (FIGURE_COUNTS, GENERATION_MAX_GRID_SIZE, GENERATION_SETTINGS, GRID_SIZE_SETTINGS,
+                       TASK_THEME_FIGURES, VALIDATION_SETTINGS)
+from .stats import timed_stage
+from .task import Task
+from .uniqueness import WAYPOINT_FIGURE, SolutionCount, count_solutions
+from .validation import validate_task
+
+# progress(attempt) вызывается перед каждой попыткой; чтобы прервать генерацию,
+# обработчик выбрасывает GenerationCancelled
+Progress = Optional[Callable[[int], None]]
+# cancelled() опрашивается и внутри поиска: попытка тогда обрывается по бюджету
+Cancelled = Optional[Callable[[], bool]]
+
+# Увеличивается, когда при том же seed генератор начинает выдавать другие задачи
+GENERATOR_VERSION = 14
+# Самая короткая нога маршрута с номерами: соседние номера задачу не усложняют
+MIN_LEG = 2
+# Доля клеток поля, короче которой самое длинное кольцо через старт не в счёт
+MIN_LONGEST_SHARE = 0.5
+# Соперников самого длинного кольца за раунд: стена ставится туда, где их больше всего
+RIVAL_LOOPS = 8
+
+
+class GenerationCancelled(Exception):
+    """Raised by a progress callback to stop the generation"""
+
+
+def new_seed(rng=random) -> int:
+    """Fresh generation seed"""
+    return rng.getrandbits(63)
+
+
+def attempt_rng(seed: int, attempt: int) -> random.Random:
+    """RNG of one attempt, so an attempt replays without the ones before it"""
+    return random.Random(f"{seed}:{attempt}")
+
+
+def attempt_budget(cancelled: Cancelled = None, max_nodes: Optional[int] = None) -> SearchBudget:
+    """Search budget of one attempt: node cost and memory, no wall clock, so the attempt replays on any machine"""
+    return SearchBudget.from_settings(cancelled, deterministic=True, max_nodes=max_nodes)
+
+
+def supported_complexities(task_theme: str) -> List[str]:
+    """Complexities whose board size the generator supports for the theme"""
+    limit = GENERATION_MAX_GRID_SIZE.get(task_theme)
+    return [complexity for complexity, size in GRID_SIZE_SETTINGS.items() if limit is None or size <= limit]
+
+
+@timed_stage('generate_task')
+def generate_task(task_type: str, task_theme: str, complexity: str,
+                  seed: Optional[int] = None, attempt: Optional[int] = None,
+                  progress: Progress = None, cancelled: Cancelled = None) -> Task:
+    """Generate a new task of the given type, theme and complexity.
+
+    Attempt ``i`` draws all its random choices from ``attempt_rng(seed, i)``;
+    the task records ``seed``, the successful ``attempt`` and
+    GENERATOR_VERSION. Passing ``attempt`` runs only that attempt, which
+    replays a recorded task. This is the only retry loop: every attempt
+    gets its own attempt_budget (limited by node cost, not time, so a
+    seed gives the same task on any machine and under any load), and a
+    candidate is returned only once validate_task accepts it. An attempt
+    that fails or runs out of budget is dropped and the next one is
+    tried, up to ``max_attempts``; after that ValueError is raised.
+    """
+    if complexity not in supported_complexities(task_theme):
+        raise ValueError(f"Тема {task_theme} генерируется на полях не больше "
+                         f"{GENERATION_MAX_GRID_SIZE[task_theme]}x{GENERATION_MAX_GRID_SIZE[task_theme]}")
+    task = Task(task_type, task_theme, complexity)
+    task.seed = seed if seed is not None else new_seed()
+    task.generator_version = GENERATOR_VERSION
+    attempts = range(VALIDATION_SETTINGS['max_attempts']) if attempt is None else (attempt,)
+    if task.rules.get('ordered'):
+        generate_ordered_task(task, attempts, progress, cancelled)
+    elif task_type == "Замкнутые":
+        generate_closed_task(task, attempts, progress, cancelled)
+    elif task.rules.get('two_rooks'):
+        generate_two_rook_task(task, attempts, progress, cancelled)
+    elif task.rules.get('longest'):
+        generate_longest_loop_task(task, attempts, progress, cancelled)
+    elif task.rules.get('sum'):
+        generate_sum_task(task, attempts, progress, cancelled)
+    elif task.rules.get('waypoints'):
+        generate_waypoint_task(task, attempts, progress, cancelled)
+    else:
+        generate_open_task(task, attempts, progress, cancelled)
+    return task
+
+
+@timed_stage('generate_closed_task')
+def generate_closed_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                         cancelled: Cancelled = None):
+    """Generate a closed path task"""
+    # Получаем допустимые фигуры для темы
+    allowed_figures = TASK_THEME_FIGURES.get(task.task_theme, [])
+    if not allowed_figures:
+        raise ValueError(f"Нет допустимых фигур для темы {task.task_theme}")
+
+    # Определяем количество фигур в зависимости от сложности
+    num_figures = FIGURE_COUNTS[task.complexity]
+
+    # Темы с кружками и перегородками строятся от готового цикла
+    generate_constructed_closed_task(task, num_figures, attempts, progress, cancelled)
+
+
+@timed_stage('generate_constructed_closed_task')
+def generate_constructed_closed_task(task: Task, num_figures: int, attempts: Iterable[int],
+                                     progress: Progress = None, cancelled: Cancelled = None):
+    """Build a random Hamiltonian loop first and derive the clues from it"""
+    rules = task.rules
+    min_walls, max_walls = wall_range(task.grid_size)
+
+    def build(rng: random.Random, budget: SearchBudget) -> bool:
+        built = build_closed_task(task.grid_size, rules, num_figures, min_walls, max_walls, rng=rng,
+                                  budget=budget)
+        if built is not None and GENERATION_SETTINGS['minimize_clues']:
+            walls, figures, solution_count = built
+            # Убираем лишние подсказки: задача становится разреженнее и сложнее.
+            # По исчерпании бюджета остаётся уже проверенный набор подсказок
+            walls, figures, _ = minimize_clues(
+                Board(task.grid_size, walls), walls, figures, rules,
+                solution_count.solutions[0], min_walls=min_walls,
+                min_figures=2 if rules.get('alternate_colors') or rules.get('multi_loop') else 1,
+                rng=rng, budget=attempt_budget(cancelled, GENERATION_SETTINGS['minimize_search_nodes'])
+            )
+            built = walls, figures, solution_count
+        return store_built(task, built)
+
+    generate_with_attempts(task, attempts, build, progress, cancelled)
+
+
+def generate_with_attempts(task: Task, attempts: Iterable[int],
+                           build: Callable[[random.Random, SearchBudget], bool],
+                           progress: Progress = None, cancelled: Cancelled = None):
+    """Keep the first attempt whose candidate passes validate_task.
+
+    ``build(rng, budget)`` gets the attempt's RNG and a fresh SearchBudget
+    and fills ``task`` with a candidate, returning False if the attempt
+    gives none. The candidate is validated with another fresh budget.
+    """
+    for attempt in attempts:
+        if progress:
+            progress(attempt)
+        if build(attempt_rng(task.seed, attempt), attempt_budget(cancelled)) and \
+                validate_task(task, attempt_budget(cancelled)):
+            task.attempt = attempt
+            return
+    raise ValueError(f"Не удалось сгенерировать задачу, прошедшую валидацию, для темы {task.task_theme}")
+
+
+def store_built(task: Task, built: Optional[Tuple]) -> bool:
+    """Fill the task from a builder's (walls, figures by cell, SolutionCount[, numbers by cell]).
+
+    False if the builder returned None.
+    """
+    if built is None:
+        return False
+    walls, figures, solution_count = built[:3]
+    numbers = built[3] if len(built) > 3 else {}
+    task.walls = list(walls)
+    task.figures = {task.board.coords(cell): fig_type for cell, fig_type in figures.items()}
+    task.numbers = {task.board.coords(cell): number for cell, number in numbers.items()}
+    task.solution_count = solution_count
+    task.solution = [task.board.coords(cell) for cell in solution_count.solutions[0]]
+    return True
+
+
+def wall_range(size: int) -> Tuple[int, int]:
+    """Fewest and most walls the VALIDATION_SETTINGS densities allow on a board"""
+    total_cells = size * size
+    return (int(total_cells * VALIDATION_SETTINGS['min_wall_density']) + 1,
+            int(total_cells * VALIDATION_SETTINGS['max_wall_density']))
+
+
+def sample_walls(board: Board, count: int, rng=random, keep: Iterable[int] = ()) -> List:
+    """Walls on ``count`` distinct random edges of the board, none next to a cell of ``keep``"""
+    keep = set(keep)
+    edges = [(a, b) for a in range(board.cell_count) for b in board.neighbors(a)
+             if a < b and a not in keep and b not in keep]
+    rng.shuffle(edges)
+    return [board.wall_between(a, b) for a, b in edges[:count]]
+
+
+def wall_off_rivals(size: int, theme_rules: Dict, figures: Dict[int, int], walls: List, max_walls: int,
+                    route_edges: Callable[[List[int]], set], rng=random, max_rounds: int = 50,
+                    budget: Optional[SearchBudget] = None, numbers: Optional[Dict[int, int]] = None,
+                    limit: int = 2) -> Optional[Tuple[List, Dict[int, int], SolutionCount]]:
+    """Walls on edges that only rival solutions use, until the first solution found is unique.
+
+    Walls only take solutions away, so the kept one stays valid (and, for
+    shortest or longest routes, optimal). Each round counts up to
+    ``limit`` solutions and walls an edge that the most rivals among them
+    use. ``numbers`` (cell -> number) is passed on to count_solutions.
+    Returns (walls, figures by cell,
+    SolutionCount) or None if there is no solution, the wall budget or the
+    search ``budget`` runs out, or a rival uses only edges of the kept
+    solution.
+    """
+    empty = Board(size)
+    board = Board(size, walls)
+    planted = None
+    for _ in range(max_rounds):
+        result = count_solutions(board, figures, theme_rules, limit, budget=budget, numbers=numbers)
+        if result.is_unknown or result.count == 0:
+            return None
+        if planted is None:
+            planted = route_edges(result.solutions[0])
+        if result.count == 1:
+            return walls, figures, result
+        if len(walls) >= max_walls:
+            return None
+        # Ставим стену на ребро, которое использует больше всего соперников и не использует решение
+        rivals = Counter()
+        for route in result.solutions:
+            edges = route_edges(route)
+            if edges != planted:
+                rivals.update(edges - planted)
+        if not rivals:
+            return None  # Соперники идут только по рёбрам найденного решения
+        most = max(rivals.values())
+        wall = empty.wall_between(*rng.choice(sorted(edge for edge, uses in rivals.items() if uses == most)))
+        walls.append(wall)
+        board.add_wall(*wall)
+    return None
+
+
+def plant_route(board: Board, legs: int, rng=random, closed: bool = False
+                ) -> Optional[Tuple[List[int], List[int]]]:
+    """A random route of ``legs`` legs: (its stops, its cells).
+
+    Each stop is a random cell at least MIN_LEG steps away around the legs
+    so far, and the leg to it a random shortest path around them. A
+    ``closed`` route returns to the first stop on its last leg. None if
+    the route gets stuck.
+    """
+    size = board.size
+    stops = [rng.randrange(size * size)]
+    route = stops[:]
+    used = 1 << stops[0]
+    for leg in range(legs):
+        head = route[-1]
+        if closed and leg == legs - 1:
+            target = stops[0]
+        else:
+            row, _ = board.leg_distances(head, used & ~(1 << head))
+            far = [cell for cell, d in enumerate(row) if d >= MIN_LEG]
+            if not far:
+                return None
+            target = rng.choice(far)
+            stops.append(target)
+        row, _ = board.leg_distances(target, used & ~(1 << head | 1 << target))
+        if row[head] < 0:
+            return None  # Замкнуть маршрут в обход прежних ног нельзя
+        while route[-1] != target:
+            route.append(rng.choice([cell for cell in board.neighbors(route[-1])
+                                     if row[cell] == row[route[-1]] - 1]))
+            used |= 1 << route[-1]
+    return stops, route
+
+
+@timed_stage('generate_ordered_task')
+def generate_ordered_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                          cancelled: Cancelled = None):
+    """Plant a route leg by leg with its numbers, then wall off rival legs until the route is unique"""
+    min_walls, max_walls = wall_range(task.grid_size)
+
+    def build(rng: random.Random, budget: SearchBudget) -> bool:
+        return store_built(task, build_ordered_task(task.grid_size, task.rules, FIGURE_COUNTS[task.complexity],
+                                                    min_walls, max_walls, rng=rng, budget=budget))
+
+    generate_with_attempts(task, attempts, build, progress, cancelled)
+
+
+def build_ordered_task(size: int, theme_rules: Dict, num_numbers: int, min_walls: int, max_walls: int,
+                       rng=random, max_rounds: int = 50, budget: Optional[SearchBudget] = None
+                       ) -> Optional[Tuple[List, Dict[int, int], SolutionCount, Dict[int, int]]]:
+    """Random walls, a route planted leg by leg through its stops, then walls on edges of rival routes.
+
+    Starts halfway between ``min_walls`` and ``max_walls``. The route is
+    planted with plant_route, so every leg is shortest as the rule
+    requires; stops and crosses placed later only take paths away. Open
+    themes get a start (4), ``num_numbers`` numbered
+    cells (6) and an end (5); closed themes number every stop and return
+    to the first one, with crosses (7) on free cells next to the numbers.
+    Rival routes are then walled off (see wall_off_rivals). Returns
+    (walls, figures by cell, SolutionCount, numbers by cell) or None if
+    the route gets stuck, or the wall or search budget runs out.
+    """
+    closed = theme_rules.get('closed', False)
+    walls = sample_walls(Board(size), (min_walls + max_walls) // 2, rng)
+    board = Board(size, walls)
+    planted = plant_route(board, num_numbers if closed else num_numbers + 1, rng, closed)
+    if planted is None:
+        return None
+    stops, route = planted
+
+    if closed:
+        numbered = stops
+        figures = {cell: NUMBER_FIGURE for cell in numbered}
+        free = sorted({cell for stop in numbered for cell in board.neighbors(stop)} - set(route))
+        for cell in rng.sample(free, min(len(free), num_numbers - 1)):
+            figures[cell] = CROSS_FIGURE
+    else:
+        numbered = stops[1:-1]
+        figures = {cell: NUMBER_FIGURE for cell in numbered}
+        figures[stops[0]], figures[stops[-1]] = 4, 5
+    numbers = {cell: number for number, cell in enumerate(numbered, 1)}
+
+    def route_edges(route: List[int]) -> set:
+        return {(a, b) if a < b else (b, a) for a, b in zip(route, route[1:])}
+
+    built = wall_off_rivals(size, theme_rules, figures, walls, max_walls, route_edges, rng, max_rounds,
+                            budget, numbers)
+    return built + (numbers,) if built is not None else None
+
+
+@timed_stage('generate_waypoint_task')
+def generate_waypoint_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                           cancelled: Cancelled = None):
+    """Plant a route through the cells to pass, then wall off rival routes until the shortest one is unique"""
+    min_walls, max_walls = wall_range(task.grid_size)
+
+    def build(rng: random.Random, budget: SearchBudget) -> bool:
+        return store_built(task, build_waypoint_task(task.grid_size, task.rules, FIGURE_COUNTS[task.complexity],
+                                                     min_walls, max_walls, rng=rng, budget=budget))
+
+    generate_with_attempts(task, attempts, build, progress, cancelled)
+
+
+def build_waypoint_task(size: int, theme_rules: Dict, num_waypoints: int, min_walls: int, max_walls: int,
+                        rng=random, max_rounds: int = 50, budget: Optional[SearchBudget] = None
+                        ) -> Optional[Tuple[List, Dict[int, int], SolutionCount]]:
+    """Random walls, a route planted through the cells to pass, then walls on edges of rival routes.
+
+    Starts halfway between ``min_walls`` and ``max_walls``. The start (4),
+    the ``num_waypoints`` cells to pass (6) and the end (5) are the stops
+    of a route from plant_route, so a simple route through all of them
+    exists. The shortest such route need not be the planted one; the
+    first one found is kept and rivals of the same length are walled off
+    (see wall_off_rivals). Returns (walls, figures by cell, SolutionCount)
+    or None if the route gets stuck, or the wall or search budget runs
+    out.
+    """
+    walls = sample_walls(Board(size), (min_walls + max_walls) // 2, rng)
+    planted = plant_route(Board(size, walls), num_waypoints + 1, rng)
+    if planted is None:
+        return None
+    stops, _ = planted
+    figures = {cell: WAYPOINT_FIGURE for cell in stops[1:-1]}
+    figures[stops[0]], figures[stops[-1]] = 4, 5
+
+    def route_edges(route: List[int]) -> set:
+        return {(a, b) if a < b else (b, a) for a, b in zip(route, route[1:])}
+
+    return wall_off_rivals(size, theme_rules, figures, walls, max_walls, route_edges, rng, max_rounds, budget)
+
+
+@timed_stage('generate_two_rook_task')
+def generate_two_rook_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                           cancelled: Cancelled = None):
+    """Place two rooks and two bases, then wall off rival routes until the joint solution is unique"""
+    min_walls, max_walls = wall_range(task.grid_size)
+
+    def build(rng: random.Random, budget: SearchBudget) -> bool:
+        return store_built(task, build_two_rook_task(task.grid_size, task.rules, min_walls, max_walls,
+                                                     rng=rng, budget=budget))
+
+    generate_with_attempts(task, attempts, build, progress, cancelled)
+
+
+def build_two_rook_task(size: int, theme_rules: Dict, min_walls: int, max_walls: int, rng=random,
+                        max_rounds: int = 50, budget: Optional[SearchBudget] = None
+                        ) -> Optional[Tuple[List, Dict[int, int], SolutionCount]]:
+    """Random rooks, bases and walls, then walls on edges of rival solutions.
+
+    Starts halfway between ``min_walls`` and ``max_walls``. The first
+    solution found is kept; while a second one exists, a wall goes on an
+    edge that only the rival routes use, which keeps the kept solution and
+    its length (see wall_off_rivals).
+    """
+    cells = rng.sample(range(size * size), 4)
+    figures = {cell: ROOK_FIGURE if i < 2 else BASE_FIGURE for i, cell in enumerate(cells)}
+    rooks, bases = sorted(cells[:2]), cells[2:]
+    walls = sample_walls(Board(size), (min_walls + max_walls) // 2, rng)
+
+    def route_edges(route: List[int]) -> set:
+        return {(a, b) if a < b else (b, a)
+                for part in split_routes(route, rooks, bases) for a, b in zip(part, part[1:])}
+
+    return wall_off_rivals(size, theme_rules, figures, walls, max_walls, route_edges, rng, max_rounds, budget)
+
+
+@timed_stage('generate_longest_loop_task')
+def generate_longest_loop_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                               cancelled: Cancelled = None):
+    """Place the start of the ring, then wall off rival loops until the longest loop is unique"""
+    min_walls, max_walls = wall_range(task.grid_size)
+
+    def build(rng: random.Random, budget: SearchBudget) -> bool:
+        return store_built(task, build_longest_loop_task(task.grid_size, task.rules, min_walls, max_walls,
+                                                         rng=rng, budget=budget))
+
+    generate_with_attempts(task, attempts, build, progress, cancelled)
+
+
+def build_longest_loop_task(size: int, theme_rules: Dict, min_walls: int, max_walls: int, rng=random,
+                            max_rounds: int = 50, budget: Optional[SearchBudget] = None
+                            ) -> Optional[Tuple[List, Dict[int, int], SolutionCount]]:
+    """Random start and walls, then walls on edges of rival longest loops.
+
+    Starts with ``min_walls`` walls, none next to the start: long loops
+    have many rivals, so the rest of the wall budget is left for walling
+    them off. Boards whose longest loop through the start is shorter than
+    MIN_LONGEST_SHARE of the cells are dropped; the parity bound of the
+    start's blocks rules most of them out before any search. The first
+    longest loop found is kept; while others of the same length exist, a
+    wall goes on an edge that the most of RIVAL_LOOPS rivals use and the
+    kept loop does not. Walls only take loops away, so the kept loop stays
+    the longest (see wall_off_rivals).
+    """
+    start = rng.randrange(size * size)
+    walls = sample_walls(Board(size), min_walls, rng, keep=(start,))
+    shortest = int(size * size * MIN_LONGEST_SHARE)
+    looper = LongestLoop(Board(size, walls), start)
+    if max((looper.block_bound(block) for block in blocks_through(looper.board, start)), default=0) < shortest:
+        return None
+
+    def loop_edges(route: List[int]) -> set:
+        return {(a, b) if a < b else (b, a) for a, b in zip(route, route[1:])}
+
+    built = wall_off_rivals(size, theme_rules, {start: 4}, walls, max_walls, loop_edges, rng, max_rounds, budget,
+                            limit=RIVAL_LOOPS)
+    if built is None or built[2].stats['longest'] < shortest:
+        return None
+    return built
+
+
+@timed_stage('generate_sum_task')
+def generate_sum_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                      cancelled: Cancelled = None):
+    """Plant a route with its sum, then change numbers off it until the route is the only answer"""
+    min_walls, max_walls = wall_range(task.grid_size)
+
+    def build(rng: random.Random, budget: SearchBudget) -> bool:
+        return store_built(task, build_sum_task(task.grid_size, task.rules, min_walls, max_walls,
+                                                rng=rng, budget=budget))
+
+    generate_with_attempts(task, attempts, build, progress, cancelled)
+
+
+def build_sum_task(size: int, theme_rules: Dict, min_walls: int, max_walls: int, rng=random,
+                   max_rounds: int = 50, budget: Optional[SearchBudget] = None
+                   ) -> Optional[Tuple[List, Dict[int, int], SolutionCount, Dict[int, int]]]:
+    """Random start, walls and far end, a planted shortest route, then new numbers on rival routes.
+
+    Every open cell but the start and the end gets a number (6) from 1 to
+    9; the end gets the sum of the numbers on a random shortest route.
+    While another route reaches the same sum, a number on a cell only the
+    rival passes is changed, which keeps the planted sum. Returns (walls,
+    figures by cell, SolutionCount, numbers by cell) or None if no cell
+    lies ``size`` moves from the start, or ``max_rounds`` or the search
+    ``budget`` runs out first.
+    """
+    start = rng.randrange(size * size)
+    walls = sample_walls(Board(size), (min_walls + max_walls) // 2, rng)
+    board = Board(size, walls)
+    # Конец не ближе size ходов: иначе кратчайших маршрутов слишком мало для задачи
+    far = [cell for cell, d in enumerate(board.distances_from(start)) if d >= size]
+    if not far:
+        return None
+    end = rng.choice(far)
+    to_end = board.distances_from(end)
+
+    route = [start]
+    while route[-1] != end:
+        route.append(rng.choice([cell for cell in board.neighbors(route[-1])
+                                 if to_end[cell] == to_end[route[-1]] - 1]))
+    figures = {start: 4, end: 5}
+    numbers = {}
+    for cell in range(size * size):
+        if cell not in figures:
+            figures[cell] = NUMBER_FIGURE
+            numbers[cell] = rng.randint(1, 9)
+    numbers[end] = sum(numbers[cell] for cell in route[1:-1])
+    planted = set(route)
+
+    for _ in range(max_rounds):
+        result = count_solutions(board, figures, theme_rules, budget=budget, numbers=numbers)
+        if result.is_unknown or result.count == 0:
+            return None
+        if result.count == 1:
+            return walls, figures, result, numbers
+        # Меняем число на клетке, через которую идёт только соперник
+        rival = next(rival for rival in result.solutions if rival != route)
+        cell = rng.choice(sorted(set(rival) - planted))
+        numbers[cell] = rng.choice([number for number in range(1, 10) if number != numbers[cell]])
+    return None
+
+
+@timed_stage('generate_open_task')
+def generate_open_task(task: Task, attempts: Iterable[int], progress: Progress = None,
+                       cancelled: Cancelled = None):
+    """Generate an open path task"""
+    def place(rng: random.Random, budget: SearchBudget) -> bool:
+        place_open_figures(task, rng)
+        return True
+
+    generate_with_attempts(task, attempts, place, progress, cancelled)
+
+
+def place_open_figures(task: Task, rng: random.Random):
+    """Randomly place the start, the end, theme figures and walls"""
+    task.walls = []
+    task.figures = {}
+    task.numbers = {}
+    task.solution_count = None
+
+    # Place start point
+    x1 = rng.randint(0, task.grid_size - 1)
+    y1 = rng.randint(0, task.grid_size - 1)
+    task.figures[(x1, y1)] = 4  # Start
+
+    # Place end point
+    while True:
+        x2 = rng.randint(0, task.grid_size - 1)
+        y2 = rng.randint(0, task.grid_size - 1)
+        if (x2, y2) != (x1, y1):
+            task.figures[(x2, y2)] = 5  # End
+            break
+
+    # Add walls
+    wall_count = int(task.grid_size * task.grid_size * rng.uniform(
+        VALIDATION_SETTINGS['min_wall_density'],
+        VALIDATION_SETTINGS['max_wall_density']
+    ))
+
+    walls_placed = 0
+    attempts = 0
+    while walls_placed < wall_count and attempts < 100:
+        x = rng.randint(0, task.grid_size - 1)
+        y = rng.randint(0, task.grid_size - 1)
+        orientation = rng.choice(['left', 'top', 'right', 'bottom'])
+        wall = (x, y, orientation)
+
+        if wall not in task.walls:
+            task.walls.append(wall)
+            walls_placed += 1
+        attempts += 1
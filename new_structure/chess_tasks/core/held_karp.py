@@ -0,0 +1,221 @@
+"""Routes through waypoints: Held-Karp ordering over BFS distances, legs expanded into simple paths"""
+from operator import add, itemgetter
+from typing import Dict, List, Optional
+
+from .board import Board
+from .budget import HELD_KARP_NODE_COST, BudgetExceeded, SearchBudget
+from .corridors import CorridorGraph
+from .pruning import MIN_REGION_CELLS, RouteRegion
+from .stats import record
+
+UNREACHABLE = 1 << 30
+
+
+class WaypointRouter:
+    """Simple routes from ``start`` through every waypoint to ``end``, shortest first.
+
+    The distances between start, waypoints and end are read from the
+    board's BFS oracle. A Held-Karp DP over waypoint bitmasks fills
+    ``completion[mask * k + j]``: the least distance still to go from
+    waypoint j once the waypoints in ``mask`` are visited. Its value at the
+    start is the walk bound W, the route length if legs could cross.
+
+    Routes are searched for bounds L = W, W + 2, ... (routes between two
+    fixed cells have fixed parity). From each waypoint the next one is
+    chosen while the length so far plus the DP completion stays within L,
+    and the leg towards it is expanded cell by cell over unused cells,
+    pruned by the distance to the leg's target. A leg may not step on an
+    unvisited waypoint or the end, so every route is found once, under
+    the order it visits the waypoints in. At L = W only shortest legs of
+    optimal orders survive the pruning; on boards of MIN_REGION_CELLS
+    cells and more RouteRegion also drops partial routes that can no
+    longer reach every remaining waypoint and the end.
+
+    Before any of this the board goes through CorridorGraph: dead ends
+    without a waypoint are closed off, and the corridors every route from
+    start to end must cross split the waypoints into stages. A simple
+    route crosses each such corridor once, so it visits the stages in
+    order; both the DP and the search only pick the next waypoint from
+    the lowest stage still open.
+    """
+
+    def __init__(self, board: Board, start: int, waypoints: List[int], end: int):
+        self.board = board
+        self.start = start
+        self.end = end
+        self.waypoints = [cell for cell in dict.fromkeys(waypoints) if cell != start and cell != end]
+        self.to_waypoint = [board.distances_from(cell) for cell in self.waypoints]
+        self.to_end = board.distances_from(end)
+        corridors = CorridorGraph(board, [start, end] + self.waypoints)
+        self.open_cells = corridors.alive
+        stages = corridors.stages()
+        # Недостижимые точки отсекает walk_bound; стадия для них не важна
+        self.stage = [stages.get(cell, 0) for cell in self.waypoints]
+        self.completion = self._held_karp()
+
+    def _distance(self, row, cell: int) -> int:
+        d = row[cell]
+        return d if d >= 0 else UNREACHABLE
+
+    def _next_choices(self, rest: List[int]) -> List[int]:
+        """The waypoints of ``rest`` in the lowest stage: a route has to visit these first"""
+        stage = self.stage
+        low = min(stage[j] for j in rest)
+        return [j for j in rest if stage[j] == low]
+
+    def _held_karp(self) -> List[int]:
+        """Least distance from waypoint j through the waypoints outside ``mask`` to the end"""
+        k = len(self.waypoints)
+        full = (1 << k) - 1
+        legs = [[self._distance(row, cell) for cell in self.waypoints] for row in self.to_waypoint]
+        completion = [UNREACHABLE] * ((full + 1) * k)
+        for j, cell in enumerate(self.waypoints):
+            completion[full * k + j] = self._distance(self.to_end, cell)
+        # Маски по убыванию: дополнение каждой уже посчитано. Внутренний цикл
+        # (минимум по следующей точке) идёт в map/itemgetter, а не в байткоде
+        for mask in range(full - 1, 0, -1):
+            rest = self._next_choices([nxt for nxt in range(k) if not mask >> nxt & 1])
+            ahead = [completion[(mask | 1 << nxt) * k + nxt] for nxt in rest]
+            pick = itemgetter(*rest) if len(rest) > 1 else lambda row, nxt=rest[0]: (row[nxt],)
+            base = mask * k
+            for j in range(k):
+                if mask >> j & 1:
+                    completion[base + j] = min(map(add, pick(legs[j]), ahead))
+        return completion
+
+    def _open_distances(self, target: int, visited: bytearray, head: int, max_depth: int) -> List[int]:
+        """BFS distances to ``target`` over unvisited cells and ``head``, -1 where cut off or beyond ``max_depth``"""
+        neighbors = self.board.neighbors
+        row = [-1] * self.board.cell_count
+        row[target] = 0
+        frontier = [target]
+        depth = 0
+        while frontier and depth < max_depth:
+            depth += 1
+            next_frontier = []
+            for cell in frontier:
+                for next_cell in neighbors(cell):
+                    if row[next_cell] == -1 and (not visited[next_cell] or next_cell == head):
+                        row[next_cell] = depth
+                        next_frontier.append(next_cell)
+            frontier = next_frontier
+        return row
+
+    def walk_bound(self) -> int:
+        """Shortest length with crossing legs allowed; UNREACHABLE if some waypoint is cut off"""
+        k = len(self.waypoints)
+        if not k:
+            return self._distance(self.to_end, self.start)
+        return min(self._distance(self.to_waypoint[j], self.start) + self.completion[(1 << j) * k + j]
+                   for j in self._next_choices(list(range(k))))
+
+    def count(self, limit: int, solutions: List[List[int]], stats: Dict,
+              budget: Optional[SearchBudget] = None):
+        """Append up to ``limit`` shortest simple routes to ``solutions``.
+
+        Raises BudgetExceeded when ``budget`` runs out.
+        """
+        bound = self.walk_bound()
+        if bound >= UNREACHABLE:
+            stats['pruned'] += 1
+            return
+        board = self.board
+        neighbors = board.neighbors
+        waypoints, to_waypoint, to_end, completion = self.waypoints, self.to_waypoint, self.to_end, self.completion
+        k = len(waypoints)
+        full = (1 << k) - 1
+        bit_of = {cell: 1 << i for i, cell in enumerate(waypoints)}
+        end = self.end
+        charge = budget.charge if budget is not None else None
+        visited = bytearray(board.cell_count)
+        visited[self.start] = 1
+        region = RouteRegion(board, waypoints) if board.cell_count >= MIN_REGION_CELLS else None
+        if region is not None:
+            region.visit(self.start)
+        # Тупики без точек маршрута закрыты заранее: войти в них можно, выйти — нет
+        for cell, open_cell in enumerate(self.open_cells):
+            if not open_cell:
+                visited[cell] = 1
+                if region is not None:
+                    region.visit(cell)
+        path = [self.start]
+        nodes = 0
+        pruned = 0
+
+        def next_leg(g: int, mask: int, limit_length: int) -> bool:
+            """Choose the next target from the end of ``path``; True once ``limit`` routes are found"""
+            head = path[-1]
+            if mask == full:
+                row = self._open_distances(end, visited, head, limit_length - g)
+                return row[head] >= 0 and g + row[head] <= limit_length and \
+                    leg(head, g, mask, end, row, 0, limit_length)
+            for j in self._next_choices([j for j in range(k) if not mask >> j & 1]):
+                next_mask = mask | 1 << j
+                rest = completion[next_mask * k + j]
+                if g + self._distance(to_waypoint[j], head) + rest > limit_length:
+                    continue
+                # Расстояния ноги — в обход уже пройденных клеток: оценка точнее, чем по всему полю
+                row = self._open_distances(waypoints[j], visited, head, limit_length - g - rest)
+                if row[head] < 0 or g + row[head] + rest > limit_length:
+                    continue
+                if leg(head, g, next_mask, waypoints[j], row, rest, limit_length):
+                    return True
+            return False
+
+        def leg(cell: int, g: int, mask: int, target: int, row, rest: int, limit_length: int) -> bool:
+            nonlocal nodes, pruned
+            nodes += 1
+            if charge is not None:
+                charge(HELD_KARP_NODE_COST)
+            for next_cell in neighbors(cell):
+                if visited[next_cell]:
+                    continue
+                d = row[next_cell]
+                if d < 0 or g + 1 + d + rest > limit_length:
+                    continue
+                if next_cell != target and (next_cell in bit_of or next_cell == end):
+                    continue  # Чужая точка маршрута: этот порядок перебирается отдельно
+                visited[next_cell] = 1
+                path.append(next_cell)
+                if region is not None:
+                    region.visit(next_cell)
+                if next_cell != end and region is not None and region.blocked(next_cell, end, cell if g else None):
+                    pruned += 1
+                    done = False
+                elif next_cell == target:
+                    if target == end:
+                        solutions.append(path[:])
+                        done = len(solutions) >= limit
+                    else:
+                        done = next_leg(g + 1, mask, limit_length)
+                else:
+                    done = leg(next_cell, g + 1, mask, target, row, rest, limit_length)
+                path.pop()
+                if region is not None:
+                    region.leave(next_cell)
+                visited[next_cell] = 0
+                if done:
+                    return True
+            return False
+
+        try:
+            # Простой маршрут проходит не больше cell_count - 1 ходов
+            while bound < board.cell_count:
+                if next_leg(0, 0, bound) or solutions:
+                    break
+                bound += 2
+        finally:
+            stats['nodes'] += nodes
+            stats['pruned'] += pruned
+            record(waypoint_route_nodes=nodes, waypoint_route_pruned=pruned)
+
+
+def find_waypoint_route(board: Board, start: int, waypoints: List[int], end: int,
+                        budget: Optional[SearchBudget] = None) -> Optional[List[int]]:
+    """Shortest simple route from start through all waypoints to end, None if none or out of budget"""
+    solutions = []
+    try:
+        WaypointRouter(board, start, waypoints, end).count(1, solutions, {'nodes': 0, 'pruned': 0}, budget)
+    except BudgetExceeded:
+        return None
+    return solutions[0] if solutions else None
@@ -0,0 +1,525 @@
+"""Longest simple loops through a cell: branch and bound over the blocks of the board"""
+from typing import Dict, List, Optional, Tuple
+
+from .board import Board
+from .budget import LONGEST_LOOP_NODE_COST, BudgetExceeded, SearchBudget
+from .stats import record
+
+MIN_LOOP = 4  # Самый короткий цикл — четыре клетки вокруг узла сетки
+FRONTIER_MAX_WIDTH = 10  # Шире состояний рамки становится слишком много для точного DP
+OPEN, CLOSE = 1, 2  # Концы фрагмента цикла на рамке, как скобки
+AHEAD_CACHE_SIZE = 1 << 20  # Оценок продолжения в памяти, после чего они сбрасываются
+
+
+def blocks_through(board: Board, start: int) -> List[int]:
+    """Biconnected blocks of the open-edge graph that hold ``start``, as bitsets of cells.
+
+    A simple loop through ``start`` stays inside one of them. Tarjan's
+    DFS is rooted at ``start``, so its blocks are the ones split off
+    directly below the root.
+    """
+    neighbors = board.neighbors
+    disc = [-1] * board.cell_count
+    low = [0] * board.cell_count
+    disc[start] = 0
+    order = 1
+    stack = [(start, -1, iter(neighbors(start)))]
+    edges = []
+    blocks = []
+    while stack:
+        cell, parent, rest = stack[-1]
+        for other in rest:
+            if disc[other] == -1:
+                disc[other] = low[other] = order
+                order += 1
+                edges.append((cell, other))
+                stack.append((other, cell, iter(neighbors(other))))
+                break
+            if other != parent and disc[other] < disc[cell]:
+                edges.append((cell, other))  # Обратное ребро
+                low[cell] = min(low[cell], disc[other])
+        else:
+            stack.pop()
+            if not stack:
+                break
+            up = stack[-1][0]
+            low[up] = min(low[up], low[cell])
+            if low[cell] >= disc[up]:
+                block = 0
+                while True:
+                    a, b = edges.pop()
+                    block |= 1 << a | 1 << b
+                    if a == up and b == cell:
+                        break
+                if up == start:
+                    blocks.append(block)
+    return blocks
+
+
+def route_blocks(neighbors, head: int, target: int, free) -> List[Tuple[int, int, List[int]]]:
+    """Blocks a simple path from ``head`` to ``target`` over ``free`` cells passes, as (entry, exit, cells).
+
+    These are the biconnected blocks met on the way from ``head`` to
+    ``target`` in the block-cut tree, from the target's block up; the path
+    enters each at one cut cell and leaves at the next. Blocks hanging off
+    that way can only be entered and left through one cell, so no simple
+    path uses them. Empty if ``target`` cannot be reached. Tarjan's DFS
+    keeps a stack of cells; a block is popped when a child's low point
+    does not climb above its parent, and ``owner`` records the block each
+    cell is popped with.
+    """
+    disc = {head: 0}
+    low = {head: 0}
+    owner = {}
+    tops = []  # Блок -> клетка, через которую он висит на родительском блоке
+    members = []
+    cells = [head]
+    stack = [(head, -1, iter(neighbors(head)))]
+    while stack:
+        cell, parent, rest = stack[-1]
+        for other in rest:
+            if other not in disc:
+                if not free[other] and other != target:
+                    continue
+                disc[other] = low[other] = len(disc)
+                cells.append(other)
+                stack.append((other, cell, iter(neighbors(other))))
+                break
+            elif other != parent and disc[other] < low[cell]:
+                low[cell] = disc[other]
+        else:
+            stack.pop()
+            if not stack:
+                break
+            up = stack[-1][0]
+            if low[cell] < low[up]:
+                low[up] = low[cell]
+            if low[cell] >= disc[up]:
+                block = []
+                while True:
+                    other = cells.pop()
+                    block.append(other)
+                    owner[other] = len(tops)
+                    if other == cell:
+                        break
+                tops.append(up)
+                members.append(block)
+    if target not in owner:
+        return []
+    found = []
+    index = owner[target]
+    exit_cell = target
+    while True:
+        found.append((tops[index], exit_cell, members[index] + [tops[index]]))
+        if tops[index] == head:
+            return found
+        exit_cell = tops[index]
+        index = owner[exit_cell]
+
+
+class LongestLoop:
+    """Longest simple loops from ``start`` back to it.
+
+    Boards up to FRONTIER_MAX_WIDTH columns are solved exactly by a
+    frontier DP (see _count_frontier), which proves the greatest length
+    and counts its loops in about a second on 10x10. Wider boards use
+    branch and bound, which finds long loops early and keeps the best one
+    when the budget runs out, but rarely proves optimality on open boards.
+
+    Branch and bound runs separately in every biconnected block through the
+    start (see blocks_through), largest bound first. In each block a loop
+    is first built greedily: the shortest loop through the start, widened
+    by square detours (an edge a-b becomes a-c-d-b) while free cells
+    allow. Its length is the incumbent that the exact search has to match.
+
+    The exact search extends a path from the start depth-first,
+    neighbours with the fewest free onward cells first (Warnsdorff's
+    rule), which walks along walls. Each node is bounded from above:
+
+    * only the blocks on the way from the head back to the start can
+      still be used (route_blocks: blocks hanging off the way are dead
+      ends for the loop);
+    * parity per block: the loop crosses each of them from its entry to
+      its exit cell alternating the chessboard colours, so the cells of
+      the entry's colour outnumber the others by one when both ends have
+      the same colour and match them otherwise.
+
+    Branches whose bound falls below the best length are cut; once
+    ``limit`` loops of the best length are known, only strictly longer
+    ones are searched. A subtree searched without reaching the length
+    sought leaves an upper bound on what the head can still add, keyed by
+    the head and the cells of the blocks on its way back (``ahead``):
+    other paths that leave the same cells are bounded by it.
+    """
+
+    def __init__(self, board: Board, start: int):
+        self.board = board
+        self.start = start
+        self.colour = bytearray(sum(board.coords(cell)) & 1 for cell in range(board.cell_count))
+
+    def _parity_bound(self, black: int, white: int, cells: int) -> int:
+        return min(cells, 2 * min(black, white)) & ~1
+
+    def _crossing_bound(self, entry: int, exit_cell: int, cells: List[int]) -> int:
+        """Most cells a simple path from ``entry`` to ``exit_cell`` can visit among ``cells``"""
+        colour = self.colour
+        same = sum(1 for cell in cells if colour[cell] == colour[entry])
+        other = len(cells) - same
+        if colour[entry] == colour[exit_cell]:
+            return 2 * min(same, other + 1) - 1
+        return 2 * min(same, other)
+
+    def block_bound(self, block: int) -> int:
+        """Upper bound of a loop inside ``block`` by its size and colours"""
+        colour = self.colour
+        black = white = 0
+        for cell in range(self.board.cell_count):
+            if block >> cell & 1:
+                if colour[cell]:
+                    white += 1
+                else:
+                    black += 1
+        return self._parity_bound(black, white, black + white)
+
+    def greedy_loop(self, free) -> Optional[List[int]]:
+        """A long loop through the start over ``free`` cells: the shortest one, widened by detours"""
+        board = self.board
+        neighbors = board.neighbors
+        start = self.start
+        loop = None
+        around = [cell for cell in neighbors(start) if free[cell]]
+        for i, first in enumerate(around):
+            for last in around[i + 1:]:
+                path = _bfs_path(neighbors, first, last, free)
+                if path is not None and (loop is None or len(path) + 2 < len(loop)):
+                    loop = [start] + path + [start]
+        if loop is None:
+            return None
+        spare = bytearray(free)
+        for cell in loop:
+            spare[cell] = 0
+        grown = True
+        while grown:
+            grown = False
+            i = 0
+            while i < len(loop) - 1:
+                # Ребро a-b заменяем кратчайшим обходом по свободным клеткам
+                detour = _detour(neighbors, loop[i], loop[i + 1], spare)
+                if detour:
+                    loop[i + 1:i + 1] = detour
+                    for cell in detour:
+                        spare[cell] = 0
+                    grown = True
+                i += 1
+        return loop if loop[1] < loop[-2] else loop[::-1]
+
+    def count(self, limit: int, solutions: List[List[int]], stats: Dict,
+              budget: Optional[SearchBudget] = None):
+        """Append up to ``limit`` longest loops (start ... start) to ``solutions``.
+
+        A loop and its reverse are one solution; ``stats['longest']`` is
+        the loop length in cells. Raises BudgetExceeded when ``budget`` runs
+        out; after branch and bound ``solutions`` then holds the longest
+        loop found so far.
+        """
+        if self.board.size <= FRONTIER_MAX_WIDTH:
+            self._count_frontier(limit, solutions, stats, budget)
+        else:
+            self._branch_and_bound(limit, solutions, stats, budget)
+
+    def _count_frontier(self, limit: int, solutions: List[List[int]], stats: Dict,
+                        budget: Optional[SearchBudget] = None):
+        """Exact longest loops by a DP over the frontier between processed and unprocessed cells.
+
+        Cells are taken row by row. The frontier holds size + 1 plugs: the
+        down edges of the cells already processed in this row, the edge
+        into the current cell from the left, and the down edges of the
+        previous row still ahead. Plugs are 0 (unused), OPEN or CLOSE: the
+        loop fragments cut by the frontier never cross, so their ends pair
+        up like brackets. A state is (plugs, loop closed); it keeps the most
+        cells used to reach it, the number of ways (capped at ``limit``)
+        and up to ``limit`` predecessors, from which the loops are read
+        back. A fragment may only close into a loop when no other plug is
+        open and the start has been used; after that every cell stays empty.
+        """
+        board = self.board
+        size = board.size
+        start = self.start
+        can_move = board.can_move
+        charge = budget.charge if budget is not None else None
+        empty = (0,) * (size + 1)
+        layers = []  # Состояния после каждой клетки: ключ -> [клеток, способов, предшественники]
+        current = {(empty, False): [0, 1, []]}
+        nodes = widest = 0
+
+        for y in range(size):
+            for x in range(size):
+                cell = y * size + x
+                down = y + 1 < size and can_move(cell, cell + size)
+                right = x + 1 < size and can_move(cell, cell + 1)
+                following = {}
+
+                def put(key, used, ways, previous):
+                    entry = following.get(key)
+                    if entry is None or used > entry[0]:
+                        following[key] = [used, ways, [previous]]
+                    elif used == entry[0]:
+                        entry[1] = min(entry[1] + ways, limit)
+                        if len(entry[2]) < limit:
+                            entry[2].append(previous)
+
+                for key, (used, ways, _) in current.items():
+                    nodes += 1
+                    if charge is not None:
+                        charge(LONGEST_LOOP_NODE_COST)
+                    plugs, closed = key
+                    left, up = plugs[x], plugs[x + 1]
+                    if not left and not up:
+                        if cell != start:
+                            put(key, used, ways, key)  # Клетка пуста
+                        if down and right and not closed:
+                            following_plugs = list(plugs)
+                            following_plugs[x], following_plugs[x + 1] = OPEN, CLOSE
+                            put((tuple(following_plugs), False), used + 1, ways, key)
+                    elif not left or not up:
+                        plug = left or up  # Фрагмент продолжается вниз или вправо
+                        if down:
+                            following_plugs = list(plugs)
+                            following_plugs[x], following_plugs[x + 1] = plug, 0
+                            put((tuple(following_plugs), False), used + 1, ways, key)
+                        if right:
+                            following_plugs = list(plugs)
+                            following_plugs[x], following_plugs[x + 1] = 0, plug
+                            put((tuple(following_plugs), False), used + 1, ways, key)
+                    else:
+                        following_plugs = list(plugs)
+                        following_plugs[x] = following_plugs[x + 1] = 0
+                        if left == OPEN and up == CLOSE:
+                            # Концы одного фрагмента: цикл замыкается
+                            if cell >= start and not any(following_plugs):
+                                put((empty, True), used + 1, ways, key)
+                            continue
+                        if left == OPEN and up == OPEN:
+                            following_plugs[_partner(plugs, x + 1)] = OPEN
+                        elif left == CLOSE and up == CLOSE:
+                            following_plugs[_partner(plugs, x)] = CLOSE
+                        put((tuple(following_plugs), False), used + 1, ways, key)
+                layers.append(following)
+                widest = max(widest, len(following))
+                current = following
+            # Конец строки: правого ребра у последней клетки нет, сдвигаем рамку
+            current = {((0,) + plugs[:size], closed): entry
+                       for (plugs, closed), entry in current.items() if not plugs[size]}
+
+        stats['nodes'] += nodes
+        record(longest_loop_states=widest)
+        final = current.get((empty, True))
+        stats['longest'] = final[0] if final else 0
+        if final is None:
+            return
+        # Каждый путь по предшественникам от конца к началу — отдельный цикл
+        keys = []
+
+        def read_back(index: int, key) -> bool:
+            keys.append(key)
+            for previous in layers[index][key][2]:
+                if not index:
+                    solutions.append(self._frontier_loop(keys[::-1]))
+                    done = len(solutions) >= limit
+                else:
+                    if not index % size:
+                        previous = (previous[0][1:] + (0,), previous[1])  # Ключ до сдвига рамки
+                    done = read_back(index - 1, previous)
+                if done:
+                    return True
+            keys.pop()
+            return False
+
+        read_back(len(layers) - 1, (empty, True))
+
+    def _frontier_loop(self, keys) -> List[int]:
+        """The loop whose frontier states after every cell are ``keys``, from the start, smaller neighbour first"""
+        size = self.board.size
+        links = {}
+        for cell, (plugs, _) in enumerate(keys):
+            x = cell % size
+            for other, plug in ((cell + size, plugs[x]), (cell + 1, plugs[x + 1])):
+                if plug:
+                    links.setdefault(cell, []).append(other)
+                    links.setdefault(other, []).append(cell)
+        start = self.start
+        loop = [start, min(links[start])]
+        while loop[-1] != start:
+            first, second = links[loop[-1]]
+            loop.append(second if first == loop[-2] else first)
+        return loop
+
+    def _branch_and_bound(self, limit: int, solutions: List[List[int]], stats: Dict,
+                          budget: Optional[SearchBudget] = None):
+        """Longest loops by depth-first search with the bounds above, seeded by greedy_loop"""
+        board = self.board
+        start = self.start
+        neighbors = board.neighbors
+        colour = self.colour
+        charge = budget.charge if budget is not None else None
+        blocks = [(self.block_bound(block), block) for block in blocks_through(board, start)]
+        blocks = sorted((item for item in blocks if item[0] >= MIN_LOOP), reverse=True)
+        free = bytearray(board.cell_count)
+        incumbent = None
+        for _, block in blocks:
+            for cell in range(board.cell_count):
+                free[cell] = block >> cell & 1
+            free[start] = 0
+            loop = self.greedy_loop(free)
+            if loop is not None and (incumbent is None or len(loop) > len(incumbent)):
+                incumbent = loop
+        best = len(incumbent) - 1 if incumbent else 0
+        nodes = pruned = hits = closings = 0
+        path = [start]
+        # (голова, клетки блоков до старта) -> сколько клеток ещё можно добавить к пути, не больше
+        ahead: Dict[Tuple[int, int], int] = {}
+
+        def needed() -> int:
+            """Least loop length still worth finding"""
+            return max(best, MIN_LOOP) if len(solutions) < limit else best + 2
+
+        def bound(head: int) -> Tuple[int, Optional[Tuple[int, int]]]:
+            """Upper bound of a loop that continues the path from ``head`` and its key in ``ahead``"""
+            nonlocal hits
+            way = route_blocks(neighbors, head, start, free)
+            if not way:
+                return 0, None  # Вернуться к старту уже нельзя
+            # Голова и старт уже в пути, клетки-стыки блоков учтены дважды
+            crossing = self._crossing_bound
+            total = len(path) - len(way) - 1
+            cells_key = 0
+            for entry, exit_cell, cells in way:
+                total += crossing(entry, exit_cell, cells)
+                for cell in cells:
+                    cells_key |= 1 << cell
+            key = (head, cells_key)
+            known = ahead.get(key)
+            if known is not None and len(path) + known < total:
+                hits += 1
+                total = len(path) + known
+            return total, key
+
+        def onward(cell: int) -> int:
+            return sum(1 for other in neighbors(cell) if free[other])
+
+        def extend(head: int):
+            nonlocal best, nodes, pruned, closings
+            nodes += 1
+            if charge is not None:
+                charge(LONGEST_LOOP_NODE_COST)
+            length = len(path)
+            if length >= MIN_LOOP and start in neighbors(head) and length >= needed():
+                closings += 1  # Для ahead: замкнуть можно, в какую бы сторону ни шёл путь
+                if path[1] < head:
+                    # Цикл и его обход в обратную сторону — одно решение
+                    if length > best:
+                        best = length
+                        del solutions[:]
+                    if len(solutions) < limit:
+                        solutions.append(path + [start])
+            for cell in sorted((other for other in neighbors(head) if free[other]), key=onward):
+                free[cell] = 0
+                path.append(cell)
+                upper, key = bound(cell) if len(path) >= 3 else (needed(), None)
+                if upper >= needed():
+                    before = closings
+                    extend(cell)
+                    if key is not None and closings == before:
+                        # Поддерево просмотрено без циклов длиной needed() и больше
+                        if len(ahead) >= AHEAD_CACHE_SIZE:
+                            ahead.clear()
+                        ahead[key] = needed() - 2 - len(path)
+                else:
+                    pruned += 1
+                path.pop()
+                free[cell] = 1
+
+        try:
+            for block_bound, block in blocks:
+                if block_bound < needed():
+                    pruned += 1
+                    continue
+                for cell in range(board.cell_count):
+                    free[cell] = block >> cell & 1
+                free[start] = 0
+                extend(start)
+        except BudgetExceeded:
+            if incumbent is not None and (not solutions or len(solutions[0]) < len(incumbent)):
+                solutions[:] = [incumbent]
+            raise
+        finally:
+            stats['nodes'] += nodes
+            stats['pruned'] += pruned
+            stats['longest'] = best
+            record(longest_loop_nodes=nodes, longest_loop_pruned=pruned, longest_loop_memo_hits=hits)
+
+
+def _partner(plugs, index: int) -> int:
+    """Position of the plug paired with the one at ``index``"""
+    depth = 0
+    step = 1 if plugs[index] == OPEN else -1
+    while True:
+        if plugs[index] == OPEN:
+            depth += step
+        elif plugs[index] == CLOSE:
+            depth -= step
+        if not depth:
+            return index
+        index += step
+
+
+def _detour(neighbors, a: int, b: int, spare) -> List[int]:
+    """Shortest path between a neighbour of ``a`` and a neighbour of ``b`` over ``spare`` cells (empty if none)"""
+    parent = {cell: None for cell in neighbors(a) if spare[cell]}
+    frontier = list(parent)
+    ends = set(cell for cell in neighbors(b) if spare[cell])
+    while frontier:
+        reached = next((cell for cell in frontier if cell in ends), None)
+        if reached is not None:
+            path = [reached]
+            while parent[path[-1]] is not None:
+                path.append(parent[path[-1]])
+            return path[::-1]
+        next_frontier = []
+        for cell in frontier:
+            for other in neighbors(cell):
+                if spare[other] and other not in parent:
+                    parent[other] = cell
+                    next_frontier.append(other)
+        frontier = next_frontier
+    return []
+
+
+def _bfs_path(neighbors, source: int, target: int, free) -> Optional[List[int]]:
+    """Shortest path from ``source`` to ``target`` over ``free`` cells, None if there is none"""
+    parent = {source: None}
+    frontier = [source]
+    while frontier and target not in parent:
+        next_frontier = []
+        for cell in frontier:
+            for other in neighbors(cell):
+                if free[other] and other not in parent:
+                    parent[other] = cell
+                    next_frontier.append(other)
+        frontier = next_frontier
+    if target not in parent:
+        return None
+    path = [target]
+    while parent[path[-1]] is not None:
+        path.append(parent[path[-1]])
+    return path[::-1]
+
+
+def find_longest_loop(board: Board, start: int, budget: Optional[SearchBudget] = None) -> Optional[List[int]]:
+    """Longest loop through ``start``; when ``budget`` runs out, the longest found so far (or None)"""
+    solutions = []
+    try:
+        LongestLoop(board, start).count(1, solutions, {'nodes': 0, 'pruned': 0}, budget)
+    except BudgetExceeded:
+        pass
+    return solutions[0] if solutions else None
@@ -0,0 +1,63 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+from .board import Board
+from .budget import SearchBudget
+from .stats import timed_stage
+from .uniqueness import CIRCLE_FIGURES, IncrementalSolver
+
+
+def clue_units(figures: Dict[int, int], rules: Dict, solution: List[int]) -> List[List[int]]:
+    """Groups of figure cells that can be removed together without breaking the solution.
+
+    With alternating colours a single circle cannot go: two neighbouring
+    circles along the solution are removed as a pair so the rest still
+    alternate. In multi-loop themes the first circle of each colour stays:
+    without it the task would lose a loop rather than get easier.
+    """
+    if rules.get('multi_loop'):
+        kept = {}
+        for cell in solution:
+            if figures.get(cell) in CIRCLE_FIGURES:
+                kept.setdefault(figures[cell], cell)
+        return [[cell] for cell in figures if cell not in kept.values()]
+    if not rules.get('alternate_colors'):
+        return [[cell] for cell in figures]
+    order = [cell for cell in solution[:-1] if figures.get(cell) in CIRCLE_FIGURES]
+    units = [[order[i], order[i + 1]] for i in range(0, len(order) - 1, 2)]
+    units += [[cell] for cell in figures if figures[cell] not in CIRCLE_FIGURES]
+    return units
+
+
+@timed_stage('minimize_clues')
+def minimize_clues(board: Board, walls: List, figures: Dict[int, int], rules: Dict,
+                   solution: List[int], min_walls: int = 0, min_figures: int = 1,
+                   rng=random, budget: Optional[SearchBudget] = None) -> Tuple[List, Dict[int, int], Dict]:
+    """Greedy clue minimisation: drop every wall or figure the unique solution does not need.
+
+    Clues are tried in random order and a removal is kept only if the
+    solution stays unique. The IncrementalSolver reuses rival solutions and
+    restricts searches to the removed clue between attempts. Returns the
+    remaining walls, figures and solver statistics. This is an anytime
+    procedure: once ``budget`` is exhausted the clues kept so far are
+    returned, and the solution is still unique for them.
+    """
+    solver = IncrementalSolver(board.copy(), figures, rules, solution, budget)
+    walls = list(walls)
+    candidates = [('wall', wall) for wall in walls]
+    candidates += [('figures', unit) for unit in clue_units(figures, rules, solution)]
+    rng.shuffle(candidates)
+
+    for kind, clue in candidates:
+        if budget is not None and budget.exhausted:
+            break
+        if kind == 'wall':
+            if len(walls) <= min_walls:
+                continue
+            if solver.try_remove_wall(clue):
+                walls.remove(clue)
+        else:
+            if len(solver.figures) - len(clue) < min_figures:
+                continue
+            solver.try_remove_figures(clue)
+    return walls, solver.figures, solver.stats
@@ -0,0 +1,194 @@
+"""Joint search for two rooks that walk to two bases without meeting"""
+import heapq
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .board import Board
+from .budget import TWO_ROOK_SHORTEST_NODE_COST, TWO_ROOK_WALK_NODE_COST, SearchBudget
+from .stats import record
+
+ROOK_FIGURE, BASE_FIGURE = 6, 7
+UNREACHABLE = 1 << 20
+
+
+class TwoRookSearch:
+    """Two rooks (6) walk to the two bases (7) one step at a time.
+
+    The rooks take turns as in chess: each move shifts one rook to a
+    neighbouring cell that is open and not taken by the other rook. Either
+    rook may end on either base; the least total number of moves wins.
+
+    ``shortest`` runs a joint A* over pairs of rook cells. The rooks are
+    identical, so a state is the unordered pair (smaller cell first): that
+    halves the squared state space, and the g-scores and parents live in
+    flat arrays of cell_count ** 2 entries. The heuristic is the cheaper
+    assignment of rooks to bases by the wall-aware distances of the
+    board's BFS oracle; one move changes one distance by at most one, so
+    it is consistent and a state is final when first expanded.
+
+    A solution is the pair of rook routes, as drawn on the board: move
+    orders of the same routes are one solution. ``count`` enumerates route
+    pairs of the least total length (see _schedulable for the collision
+    check).
+    """
+
+    def __init__(self, board: Board, rooks: List[int], bases: List[int]):
+        self.board = board
+        self.rooks = sorted(rooks)
+        self.bases = sorted(bases)
+        self.to_base = [[d if d >= 0 else UNREACHABLE for d in board.distances_from(base)]
+                        for base in self.bases]
+
+    def lower_bound(self, a: int, b: int) -> int:
+        """Moves needed at least from rook cells a and b, ignoring the other rook"""
+        first, second = self.to_base
+        return min(first[a] + second[b], second[a] + first[b])
+
+    def shortest(self, budget: Optional[SearchBudget] = None) -> Optional[Tuple[int, List[int], List[int]]]:
+        """(least total moves, route of the first rook, route of the second) or None"""
+        if len(self.rooks) != 2 or len(self.bases) != 2:
+            return None
+        board = self.board
+        cell_count = board.cell_count
+        neighbors = board.neighbors
+        charge = budget.charge if budget is not None else None
+        a, b = self.rooks
+        start = a * cell_count + b
+        goal = self.bases[0] * cell_count + self.bases[1]
+        if self.lower_bound(a, b) >= UNREACHABLE:
+            record(joint_expanded=0, joint_pushes=0)
+            return None
+
+        g_score = array('i', [-1]) * (cell_count * cell_count)
+        parent = array('i', [-1]) * (cell_count * cell_count)
+        g_score[start] = 0
+        count = 0
+        expanded = 0
+        queue = [(self.lower_bound(a, b), 0, count, start)]
+        while queue:
+            _, g, _, state = heapq.heappop(queue)
+            if g != g_score[state]:
+                continue  # Устаревшая запись кучи
+            if state == goal:
+                record(joint_expanded=expanded, joint_pushes=count)
+                return g, *self._routes(parent, goal)
+            expanded += 1
+            if charge is not None:
+                charge(TWO_ROOK_SHORTEST_NODE_COST)
+            a, b = divmod(state, cell_count)
+            for mover, other in ((a, b), (b, a)):
+                for cell in neighbors(mover):
+                    if cell == other:
+                        continue  # Клетка занята второй ладьёй
+                    next_state = cell * cell_count + other if cell < other else other * cell_count + cell
+                    old_g = g_score[next_state]
+                    if old_g != -1 and old_g <= g + 1:
+                        continue
+                    g_score[next_state] = g + 1
+                    parent[next_state] = state
+                    count += 1
+                    h_score = self.lower_bound(cell, other)
+                    heapq.heappush(queue, (g + 1 + h_score, g + 1, count, next_state))
+        record(joint_expanded=expanded, joint_pushes=count)
+        return None
+
+    def _routes(self, parent: array, goal: int) -> Tuple[List[int], List[int]]:
+        """Routes of both rooks from the chain of unordered states ending in ``goal``"""
+        cell_count = self.board.cell_count
+        states = [goal]
+        while parent[states[-1]] != -1:
+            states.append(parent[states[-1]])
+        states.reverse()
+        routes = [[rook] for rook in self.rooks]
+        for state in states[1:]:
+            cells = divmod(state, cell_count)
+            # Сдвинулась та ладья, чьей клетки больше нет в паре
+            mover = 0 if routes[0][-1] not in cells else 1
+            routes[mover].append(cells[0] if cells[1] == routes[1 - mover][-1] else cells[1])
+        return routes[0], routes[1]
+
+    def count(self, limit: int, solutions: List[List[int]], stats: Dict,
+              budget: Optional[SearchBudget] = None):
+        """Append up to ``limit`` solutions (both routes one after another) to ``solutions``.
+
+        Every split of the least total C into route lengths L0 + L1 is
+        tried for both assignments of rooks to bases. The routes of each
+        rook are enumerated depth-first, pruned by the distance to its
+        base, and a pair counts once some move order keeps the rooks apart.
+        Raises BudgetExceeded when ``budget`` runs out.
+        """
+        best = self.shortest(budget)
+        if best is None:
+            stats['pruned'] += 1
+            return
+        total = best[0]
+        charge = budget.charge if budget is not None else None
+        first, second = self.rooks
+        for targets in ((0, 1), (1, 0)):
+            to_first, to_second = self.to_base[targets[0]], self.to_base[targets[1]]
+            shortest_first = to_first[first]
+            # Длина маршрута на клетчатом поле — той же чётности, что и расстояние
+            for length in range(shortest_first, total - to_second[second] + 1, 2):
+                for route in self._walks(first, to_first, length, stats, charge):
+                    for other in self._walks(second, to_second, total - length, stats, charge):
+                        if _schedulable(route, other):
+                            solutions.append(route + other)
+                            if len(solutions) >= limit:
+                                return
+                        else:
+                            stats['pruned'] += 1
+
+    def _walks(self, start: int, to_goal: List[int], length: int, stats: Dict,
+               charge) -> Iterator[List[int]]:
+        """Routes of exactly ``length`` moves from ``start`` to the cell at distance 0"""
+        neighbors = self.board.neighbors
+        walk = [start]
+
+        def extend(remaining: int) -> Iterator[List[int]]:
+            stats['nodes'] += 1
+            if charge is not None:
+                charge(TWO_ROOK_WALK_NODE_COST)
+            if not remaining:
+                yield list(walk)
+                return
+            for cell in neighbors(walk[-1]):
+                if to_goal[cell] < remaining:
+                    walk.append(cell)
+                    yield from extend(remaining - 1)
+                    walk.pop()
+
+        if to_goal[start] <= length:
+            yield from extend(length)
+
+
+def split_routes(route: List[int], rooks: List[int], bases: List[int]) -> Tuple[List[int], List[int]]:
+    """Split both routes written one after another back into the route of each rook.
+
+    The second route starts at the other rook right after the first one
+    reaches a base; if that happens more than once, the earliest split
+    whose two routes end on different bases is taken.
+    """
+    second = max(rooks) if route[0] == min(rooks) else min(rooks)
+    for i in range(1, len(route)):
+        if route[i] == second and route[i - 1] in bases and route[-1] in bases and route[i - 1] != route[-1]:
+            return route[:i], route[i:]
+    return route, []
+
+
+def _schedulable(first: List[int], second: List[int]) -> bool:
+    """True if the rooks can take turns along the routes without meeting.
+
+    Cell (i, j) of the progress grid stands for the first rook after i
+    moves and the second after j; it is blocked when both are on the same
+    cell. A move order is a monotone path from (0, 0) to the far corner.
+    """
+    reach = [False] * len(second)
+    for i, cell in enumerate(first):
+        for j, other in enumerate(second):
+            if cell == other:
+                reach[j] = False
+            elif i == 0 and j == 0:
+                reach[j] = True
+            else:
+                reach[j] = reach[j] or (j > 0 and reach[j - 1])
+    return reach[-1]
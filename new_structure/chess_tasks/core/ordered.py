@@ -0,0 +1,140 @@
+"""Routes through numbered cells in order, solved leg by leg"""
+from typing import Dict, Iterable, List, Optional
+
+from .board import Board
+from .budget import ORDERED_NODE_COST, SearchBudget
+from .stats import record
+
+NUMBER_FIGURE, CROSS_FIGURE = 6, 7
+
+
+def ordered_stops(numbers: Dict[int, int], start: Optional[int] = None, end: Optional[int] = None,
+                  closed: bool = False) -> List[int]:
+    """Cells the route visits in order: start, numbered cells by number, end (or back to the first)"""
+    stops = [cell for cell, _ in sorted(numbers.items(), key=lambda item: item[1])]
+    if start is not None:
+        stops.insert(0, start)
+    if end is not None:
+        stops.append(end)
+    if closed and stops:
+        stops.append(stops[0])
+    return stops
+
+
+class OrderedRoute:
+    """Routes that visit ``stops`` in order, every leg a shortest path around the earlier legs.
+
+    Leg i runs from stops[i] to stops[i + 1] over cells that no earlier
+    leg has used, that hold no cross (7) and no later stop, and is a
+    shortest path among those cells. A route closed back to its first stop
+    may end its last leg on it. Crosses and earlier legs are a bitset
+    (``forbidden``), so each leg reads one row of Board.leg_distances: the
+    distances and the number of shortest paths to the leg's end. Rows are
+    cached on the board, so after a number changes only the legs from the
+    changed stop on are searched again.
+
+    Solutions are counted leg by leg: a leg with one shortest path is
+    taken as it is; with several, each is tried and the later legs are
+    counted around it. Before a leg is searched, the stops still ahead
+    have to be reachable from its start around the cells used so far,
+    which cuts a branch as soon as an earlier leg walls a stop off. Leg
+    starts that cannot be completed are memoised per (leg, forbidden
+    cells).
+    """
+
+    def __init__(self, board: Board, stops: List[int], blocked: Iterable[int] = ()):
+        self.board = board
+        self.stops = list(stops)
+        self.blocked = 0
+        for cell in blocked:
+            self.blocked |= 1 << cell
+
+    def _leg_forbidden(self, index: int, forbidden: int) -> int:
+        """Cells leg ``index`` may not enter: ``forbidden`` and the later stops, but not its own ends"""
+        for cell in self.stops[index + 2:]:
+            forbidden |= 1 << cell
+        return forbidden & ~(1 << self.stops[index] | 1 << self.stops[index + 1])
+
+    def _reachable(self, index: int, forbidden: int) -> bool:
+        """True if every stop from ``index`` on is still reachable from it around ``forbidden``"""
+        head = self.stops[index]
+        row, _ = self.board.leg_distances(head, forbidden & ~(1 << head | 1 << self.stops[-1]))
+        return all(row[cell] >= 0 for cell in self.stops[index + 1:])
+
+    def count(self, limit: int, solutions: List[List[int]], stats: Dict,
+              budget: Optional[SearchBudget] = None):
+        """Append up to ``limit`` routes to ``solutions``; raises BudgetExceeded when ``budget`` runs out"""
+        stops = self.stops
+        closed = len(stops) > 2 and stops[0] == stops[-1]
+        distinct = stops[:-1] if closed else stops
+        if len(stops) < 2 or len(set(distinct)) != len(distinct) or \
+                any(self.blocked >> cell & 1 for cell in distinct):
+            stats['pruned'] += 1
+            return
+        neighbors = self.board.neighbors
+        leg_distances = self.board.leg_distances
+        charge = budget.charge if budget is not None else None
+        legs = len(stops) - 1
+        dead = set()  # (нога, запрещённые клетки), откуда маршрут не достроить
+        route = [stops[0]]
+        counters = {'legs': 0, 'memo_hits': 0, 'cut': 0}
+
+        def complete(index: int, forbidden: int) -> int:
+            """Number of routes found that finish legs ``index``.. around ``forbidden``"""
+            if index == legs:
+                if closed and len(route) < 5:
+                    return 0  # Туда и обратно по одному ребру — не цикл
+                solutions.append(route[:])
+                return 1
+            key = (index, forbidden)
+            if key in dead:
+                counters['memo_hits'] += 1
+                return 0
+            counters['legs'] += 1
+            if charge is not None:
+                charge(ORDERED_NODE_COST)
+            a, b = stops[index], stops[index + 1]
+            if index and not self._reachable(index, forbidden):
+                counters['cut'] += 1
+                dead.add(key)
+                return 0
+            row, _ = leg_distances(b, self._leg_forbidden(index, forbidden))
+            if row[a] < 0:
+                dead.add(key)
+                return 0
+            found = 0
+            # Все кратчайшие пути ноги по убыванию расстояния до её конца
+            path = [a]
+
+            def walk(cell: int) -> bool:
+                nonlocal found
+                if cell == b:
+                    mark = len(route)
+                    route.extend(path[1:])
+                    used = forbidden
+                    for step in path:
+                        used |= 1 << step
+                    found += complete(index + 1, used)
+                    del route[mark:]
+                    return len(solutions) >= limit
+                for next_cell in neighbors(cell):
+                    if row[next_cell] == row[cell] - 1:
+                        path.append(next_cell)
+                        done = walk(next_cell)
+                        path.pop()
+                        if done:
+                            return True
+                return False
+
+            walk(a)
+            if not found:
+                dead.add(key)
+            return found
+
+        try:
+            complete(0, self.blocked | 1 << stops[0])
+        finally:
+            stats['nodes'] += counters['legs']
+            stats['pruned'] += counters['cut']
+            record(ordered_legs=counters['legs'], ordered_memo_hits=counters['memo_hits'],
+                   ordered_cut=counters['cut'])
@@ -0,0 +1,141 @@
+"""Persistent pool of validated, unsaved tasks for instant regeneration"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple
+
+from .generators import GENERATOR_VERSION, GenerationCancelled, generate_task
+from .settings import POOL_SETTINGS
+from .task import Task
+
+PoolKey = Tuple[str, str, str]  # (task_type, task_theme, complexity)
+
+
+class TaskPool:
+    """Buckets of ready tasks keyed by (task_type, task_theme, complexity).
+
+    Tasks live in the ``task_pool`` table of a separate database, so the
+    pool survives restarts and can be filled by another process (see
+    batch_generate.py --pool). The pool is only a cache: its database runs in
+    WAL mode without fsync, which keeps ``pop`` (one indexed select and
+    delete) well under a millisecond. Every thread keeps its own connection,
+    so a refill thread and the GUI thread can share one pool object.
+
+    Only tasks of the current GENERATOR_VERSION are served: rows of other
+    versions (built under older theme rules) are purged when the pool is
+    opened.
+    """
+
+    def __init__(self, db_path: str, depth: Optional[int] = None,
+                 max_size: Optional[int] = None, max_age_days: Optional[float] = None):
+        self.db_path = db_path
+        self.depth = depth if depth is not None else POOL_SETTINGS['depth']
+        self.max_size = max_size if max_size is not None else POOL_SETTINGS['max_size']
+        self.max_age_days = max_age_days if max_age_days is not None else POOL_SETTINGS['max_age_days']
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS task_pool (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_type TEXT NOT NULL,
+                    task_theme TEXT NOT NULL,
+                    complexity TEXT NOT NULL,
+                    created_at REAL NOT NULL,  -- time.time() при генерации
+                    task TEXT NOT NULL,        -- JSON из Task.to_dict()
+                    generator_version INTEGER  -- GENERATOR_VERSION при генерации
+                )
+            ''')
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(task_pool)")}
+            if 'generator_version' not in existing:
+                conn.execute("ALTER TABLE task_pool ADD COLUMN generator_version INTEGER")
+            # Задачи прежних версий генератора собраны по старым правилам тем
+            conn.execute('DELETE FROM task_pool WHERE generator_version IS NOT ?', (GENERATOR_VERSION,))
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_task_pool_key
+                ON task_pool(task_type, task_theme, complexity, id)
+            ''')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection of the current thread inside a transaction"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+        with conn:
+            yield conn
+
+    def pop(self, task_type: str, task_theme: str, complexity: str) -> Optional[Task]:
+        """Take the oldest fresh task of the bucket, or None if it is empty"""
+        with self._connect() as conn:
+            row = conn.execute('''
+                SELECT id, task FROM task_pool
+                WHERE task_type = ? AND task_theme = ? AND complexity = ? AND created_at >= ?
+                  AND generator_version = ?
+                ORDER BY id LIMIT 1
+            ''', (task_type, task_theme, complexity, self._oldest_allowed(), GENERATOR_VERSION)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM task_pool WHERE id = ?', (row[0],))
+        return Task.from_dict(json.loads(row[1]))
+
+    def push(self, task: Task):
+        """Add a validated task and evict tasks over the limits"""
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO task_pool (task_type, task_theme, complexity, created_at, task, generator_version)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (task.task_type, task.task_theme, task.complexity, time.time(),
+                  json.dumps(task.to_dict(), ensure_ascii=False), task.generator_version))
+            self._evict(conn)
+
+    def size(self, task_type: str, task_theme: str, complexity: str) -> int:
+        """Number of fresh tasks in the bucket"""
+        with self._connect() as conn:
+            return conn.execute('''
+                SELECT COUNT(*) FROM task_pool
+                WHERE task_type = ? AND task_theme = ? AND complexity = ? AND created_at >= ?
+                  AND generator_version = ?
+            ''', (task_type, task_theme, complexity, self._oldest_allowed(), GENERATOR_VERSION)).fetchone()[0]
+
+    def refill(self, task_type: str, task_theme: str, complexity: str,
+               cancelled: Optional[Callable[[], bool]] = None) -> int:
+        """Generate tasks until the bucket holds ``depth`` of them; returns how many were added.
+
+        Stops early when ``cancelled()`` becomes true or generate_task gives
+        up on a task (after its ``max_attempts`` attempts).
+        """
+        added = 0
+
+        def check_cancelled(_attempt: int = 0):
+            if cancelled is not None and cancelled():
+                raise GenerationCancelled()
+
+        try:
+            while self.size(task_type, task_theme, complexity) < self.depth:
+                check_cancelled()
+                try:
+                    task = generate_task(task_type, task_theme, complexity,
+                                         progress=check_cancelled, cancelled=cancelled)
+                except ValueError:
+                    break
+                self.push(task)
+                added += 1
+        except GenerationCancelled:
+            pass
+        return added
+
+    def _oldest_allowed(self) -> float:
+        return time.time() - self.max_age_days * 86400
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop expired tasks, then the oldest ones above ``max_size``"""
+        conn.execute('DELETE FROM task_pool WHERE created_at < ?', (self._oldest_allowed(),))
+        conn.execute('''
+            DELETE FROM task_pool WHERE id NOT IN (
+                SELECT id FROM task_pool ORDER BY id DESC LIMIT ?
+            )
+        ''', (self.max_size,))
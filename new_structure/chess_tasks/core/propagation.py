@@ -0,0 +1,315 @@
+"""Edge-selection solver with constraint propagation for loops through every cell"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .board import Board
+from .budget import PROPAGATION_NODE_COST, SearchBudget
+from .cycle_cover import loops_route
+from .pruning import parity_balanced
+
+UNKNOWN, ON, OFF = 0, 1, 2
+
+
+class _State:
+    """Edge assignment plus the chains (loop fragments) formed by the ON edges.
+
+    ``partner``, ``near`` and ``circles`` are only meaningful for chain
+    ends (cells of degree 0 or 1): the other end of the chain, the colour
+    of the first circle met walking into the chain from this end (0 if
+    none) and the number of circles on the chain.
+    """
+    __slots__ = ('edges', 'degree', 'partner', 'near', 'circles', 'on_edges', 'closed')
+
+    def copy(self) -> '_State':
+        state = _State()
+        state.edges = self.edges[:]
+        state.degree = self.degree[:]
+        state.partner = self.partner[:]
+        state.near = self.near[:]
+        state.circles = self.circles[:]
+        state.on_edges = self.on_edges
+        state.closed = self.closed
+        return state
+
+
+class LoopPropagator:
+    """Counts loops through every cell, optionally with theme rules on the circles.
+
+    With ``multi_loop`` it counts covers of every cell by disjoint loops
+    instead, one loop per circle colour holding all circles of that colour.
+
+    The loop is a choice of grid edges. Propagation applies the local rules
+    until nothing changes:
+
+    * every cell has exactly two ON edges (two ON edges switch the rest
+      OFF, two remaining candidates are both ON);
+    * an edge joining the two ends of one chain is OFF unless it closes
+      the loop through all cells (no premature subloops); with
+      ``multi_loop`` it may close any chain that holds every circle of one
+      colour, and an edge joining chains with different circles is OFF;
+    * with ``alternate``, an edge joining two chain ends whose nearest
+      circles have the same colour is OFF (and so is a closing edge whose
+      loop would put two equal circles next to each other);
+    * in a ``straight`` cell an edge and the edge opposite it are equal,
+      and an edge without an opposite one (at the border) is OFF.
+
+    ``colours`` also fixes where a found loop starts: at the circle (or,
+    without circles, the cell) with the fewest neighbours. A cover is
+    written as its loops one after another (see split_loops), each from
+    its smallest cell.
+
+    When counting for uniqueness (``limit`` > 1) the edges at chain ends are
+    then probed: a value that propagates to a contradiction is ruled out.
+    Only after that does the search branch on an edge at the most
+    constrained chain end. ``stats['depth']`` is the deepest branching
+    level reached: 0 means the board was solved and proved unique by
+    deduction alone, so it works as a difficulty score.
+    """
+
+    def __init__(self, board: Board, colours: Dict[int, int], alternate: bool = True,
+                 straight: Iterable[int] = (), multi_loop: bool = False):
+        self.board = board
+        self.colours = colours
+        self.alternate = alternate
+        self.multi_loop = multi_loop
+        self.totals = {colour: sum(1 for c in colours.values() if c == colour) for colour in set(colours.values())}
+        size = board.size
+        self.cell_count = board.cell_count
+        self.edge_cells: List[Tuple[int, int]] = []
+        self.cell_edges: List[List[int]] = [[] for _ in range(self.cell_count)]
+        self.edge_of: Dict[Tuple[int, int], int] = {}
+        for cell in range(self.cell_count):
+            for other in (cell + 1 if cell % size != size - 1 else None,
+                          cell + size if cell + size < self.cell_count else None):
+                if other is None:
+                    continue
+                edge = len(self.edge_cells)
+                self.edge_cells.append((cell, other))
+                self.cell_edges[cell].append(edge)
+                self.cell_edges[other].append(edge)
+                self.edge_of[(cell, other)] = self.edge_of[(other, cell)] = edge
+        # opposite[клетка] — {ребро: ребро напротив или None у края} для клеток «насквозь»
+        self.opposite: Dict[int, Dict[int, Optional[int]]] = {}
+        for cell in straight:
+            x, y = cell % size, cell // size
+            sides = [(x - 1, y, x + 1, y), (x + 1, y, x - 1, y), (x, y - 1, x, y + 1), (x, y + 1, x, y - 1)]
+            self.opposite[cell] = {
+                self.edge_of[(cell, board.cell(ax, ay))]:
+                    self.edge_of[(cell, board.cell(bx, by))] if board.in_bounds(bx, by) else None
+                for ax, ay, bx, by in sides if board.in_bounds(ax, ay)
+            }
+
+    def count(self, limit: int, solutions: List[List[int]], stats: Dict,
+              forced_edge: Optional[Tuple[int, int]] = None,
+              budget: Optional[SearchBudget] = None):
+        """Append up to ``limit`` loops to ``solutions``; raises BudgetExceeded when ``budget`` runs out"""
+        stats['depth'] = 0
+        stats.setdefault('probes', 0)
+        if not parity_balanced(self.board, range(self.cell_count)):
+            stats['pruned'] += 1  # Цикл чередует цвета шахматной раскраски
+            return
+        state = _State()
+        state.edges = bytearray(len(self.edge_cells))
+        state.degree = bytearray(self.cell_count)
+        state.partner = list(range(self.cell_count))
+        state.near = bytearray(self.cell_count)
+        state.circles = bytearray(self.cell_count)
+        state.on_edges = 0
+        state.closed = False
+        for cell, colour in (self.colours.items() if self.alternate or self.multi_loop else ()):
+            state.near[cell] = colour
+            state.circles[cell] = 1
+        for edge, (a, b) in enumerate(self.edge_cells):
+            if not self.board.can_move(a, b):
+                state.edges[edge] = OFF
+
+        queue = list(range(self.cell_count))
+        if forced_edge is not None:
+            edge = self.edge_of.get(forced_edge)
+            if edge is None or not self._set(state, edge, ON, queue):
+                return
+        charge = budget.charge if budget is not None else None
+        # Пробы дороги: только для доказательства единственности, и лишь до ветвления
+        if not self._propagate(state, queue) or limit > 1 and not self._probe(state, stats, charge):
+            stats['pruned'] += 1
+            return
+        self._search(state, 0, limit, solutions, stats, forced_edge, charge)
+
+    def _search(self, state: _State, depth: int, limit: int, solutions: List[List[int]],
+                stats: Dict, forced_edge, charge):
+        stats['nodes'] += 1
+        if depth > stats['depth']:
+            stats['depth'] = depth
+        if charge is not None:
+            charge(PROPAGATION_NODE_COST)
+        if state.closed:
+            solutions.append(self._loop(state, forced_edge))
+            return
+        edge = self._branch_edge(state)
+        for value in (ON, OFF):
+            child = state.copy()
+            queue = []
+            if self._set(child, edge, value, queue) and self._propagate(child, queue):
+                self._search(child, depth + 1, limit, solutions, stats, forced_edge, charge)
+                if len(solutions) >= limit:
+                    return
+            else:
+                stats['pruned'] += 1
+
+    def _probe(self, state: _State, stats: Dict, charge) -> bool:
+        """Failed-edge probing: if one value of an edge propagates to a contradiction, it takes the other.
+
+        Repeats over the unknown edges at chain ends until nothing changes;
+        False if both values of some edge fail.
+        """
+        changed = True
+        while changed and not state.closed:
+            changed = False
+            for edge in range(len(self.edge_cells)):
+                a, b = self.edge_cells[edge]
+                if state.edges[edge] != UNKNOWN or (state.degree[a] != 1 and state.degree[b] != 1):
+                    continue
+                for value, other in ((ON, OFF), (OFF, ON)):
+                    stats['probes'] += 1
+                    if charge is not None:
+                        charge(PROPAGATION_NODE_COST)
+                    trial = state.copy()
+                    queue = []
+                    if self._set(trial, edge, value, queue) and self._propagate(trial, queue):
+                        continue
+                    queue = []
+                    if not (self._set(state, edge, other, queue) and self._propagate(state, queue)):
+                        return False
+                    changed = True
+                    break
+        return True
+
+    def _branch_edge(self, state: _State) -> int:
+        """Unknown edge at the chain end (or, without chains, the cell) with fewest options"""
+        edges = state.edges
+        degree = state.degree
+        best = None
+        best_key = None
+        for cell in range(self.cell_count):
+            if degree[cell] == 2:
+                continue
+            options = [edge for edge in self.cell_edges[cell] if edges[edge] == UNKNOWN]
+            key = (degree[cell] != 1, len(options))
+            if options and (best_key is None or key < best_key):
+                best, best_key = options[0], key
+        return best
+
+    def _set(self, state: _State, edge: int, value: int, queue: List[int]) -> bool:
+        """Assign an edge; False on a contradiction"""
+        current = state.edges[edge]
+        if current != UNKNOWN:
+            return current == value
+        state.edges[edge] = value
+        a, b = self.edge_cells[edge]
+        if value == ON:
+            if state.degree[a] == 2 or state.degree[b] == 2 or not self._join(state, a, b, queue):
+                return False
+            state.degree[a] += 1
+            state.degree[b] += 1
+            state.on_edges += 1
+        queue.append(a)
+        queue.append(b)
+        return True
+
+    def _join(self, state: _State, a: int, b: int, queue: List[int]) -> bool:
+        """Merge the chains ending at a and b, or close the loop"""
+        if self._forbidden(state, a, b):
+            return False
+        partner, near, circles = state.partner, state.near, state.circles
+        end_a, end_b = partner[a], partner[b]
+        if end_a == b:
+            # Несколько циклов: задача решена, когда замкнутые циклы заняли все клетки
+            state.closed = not self.multi_loop or state.on_edges + 1 == self.cell_count
+            return True
+        near_a = near[end_a] or near[b]
+        near_b = near[end_b] or near[a]
+        total = circles[a] + circles[b]
+        partner[end_a], partner[end_b] = end_b, end_a
+        near[end_a], near[end_b] = near_a, near_b
+        circles[end_a] = circles[end_b] = total
+        queue.append(end_a)
+        queue.append(end_b)
+        return True
+
+    def _forbidden(self, state: _State, a: int, b: int) -> bool:
+        """True if an ON edge between chain ends a and b breaks a rule"""
+        near = state.near
+        if self.multi_loop:
+            if state.partner[a] == b:
+                # Замкнуть можно только цикл со всеми кружками своего цвета
+                return near[a] == 0 or state.circles[a] != self.totals[near[a]]
+            return near[a] != 0 and near[b] != 0 and near[a] != near[b]
+        if state.partner[a] == b:
+            # Замыкание допустимо только для цикла через все клетки
+            return state.on_edges + 1 != self.cell_count or (state.circles[a] > 1 and near[a] == near[b])
+        return near[a] != 0 and near[a] == near[b]
+
+    def _propagate(self, state: _State, queue: List[int]) -> bool:
+        edges = state.edges
+        degree = state.degree
+        opposite = self.opposite
+        while queue:
+            cell = queue.pop()
+            if cell in opposite and not self._straighten(state, opposite[cell], queue):
+                return False
+            options = [edge for edge in self.cell_edges[cell] if edges[edge] == UNKNOWN]
+            if not options:
+                if degree[cell] != 2:
+                    return False
+                continue
+            if degree[cell] == 2:
+                for edge in options:
+                    self._set(state, edge, OFF, queue)
+                continue
+            need = 2 - degree[cell]
+            if len(options) < need:
+                return False
+            if len(options) == need:
+                for edge in options:
+                    if not self._set(state, edge, ON, queue):
+                        return False
+                continue
+            for edge in options:
+                a, b = self.edge_cells[edge]
+                other = b if a == cell else a
+                if degree[other] == 2 or self._forbidden(state, cell, other):
+                    self._set(state, edge, OFF, queue)
+        return True
+
+    def _straighten(self, state: _State, opposite: Dict[int, Optional[int]], queue: List[int]) -> bool:
+        """Make the edges of a straight cell equal to the ones opposite them; False on a contradiction"""
+        edges = state.edges
+        for edge, other in opposite.items():
+            value = edges[edge]
+            if other is None:
+                if value == ON or value == UNKNOWN and not self._set(state, edge, OFF, queue):
+                    return False
+            elif value != UNKNOWN and not self._set(state, other, value, queue):
+                return False
+        return True
+
+    def _loop(self, state: _State, forced_edge) -> List[int]:
+        """The closed loop as [start, ..., start], first along ``forced_edge`` or to the lower neighbour"""
+        links = [[] for _ in range(self.cell_count)]
+        for edge, (a, b) in enumerate(self.edge_cells):
+            if state.edges[edge] == ON:
+                links[a].append(b)
+                links[b].append(a)
+        if self.multi_loop:
+            return loops_route(links)
+        if forced_edge is not None:
+            start, step = forced_edge
+        else:
+            neighbors = self.board.neighbors
+            start = min(self.colours or range(self.cell_count), key=lambda cell: (len(neighbors(cell)), cell))
+            step = min(links[start])
+        loop = [start, step]
+        while loop[-1] != start:
+            prev, cell = loop[-2], loop[-1]
+            first, second = links[cell]
+            loop.append(second if first == prev else first)
+        return loop
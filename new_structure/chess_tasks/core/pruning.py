@@ -0,0 +1,175 @@
+"""Pruning tests for depth-first searches over simple routes on the grid"""
+from typing import Iterable, Optional
+
+from .board import Board
+
+# На меньших полях перебор без этих проверок быстрее, чем сами проверки
+MIN_REGION_CELLS = 64
+
+
+def parity_balanced(board: Board, cells: Iterable[int]) -> bool:
+    """True if ``cells`` hold as many black as white squares of the checkerboard.
+
+    A loop on a grid alternates colours, so a loop through exactly these
+    cells (e.g. all cells of a cover-all theme) needs this balance. While
+    the loop is built the balance of the unvisited cells plus both route
+    ends stays the same, so checking it once before the search is enough.
+    """
+    size = board.size
+    balance = 0
+    for cell in cells:
+        balance += 1 if (cell % size + cell // size) % 2 else -1
+    return balance == 0
+
+
+class RouteRegion:
+    """Necessary conditions for finishing a simple route from ``head`` to ``target``.
+
+    The region is every unvisited cell plus ``head`` and ``target``; the rest
+    of the route has to run inside it. Cell sets are Python ints used as
+    bitsets (bit i is cell i), so one test costs a few dozen word
+    operations instead of a walk over the board. A partial route is
+    rejected when
+
+    * a required cell has fewer than two region neighbours (a dead end);
+    * two required cells can only be entered from the head, or only left
+      towards the target (forced neighbours);
+    * a required cell or the target is not reachable from the head
+      without passing the target (flood fill by whole runs of cells: each
+      direction is filled with doubling shifts, so the number of rounds
+      depends on how often the region turns, not on its length).
+
+    The search reports every step with ``visit`` and ``leave``. Each step
+    removes one cell, ``prev``, from the region, so connectivity can only
+    break if ``prev`` was an articulation cell. When the caller passes
+    ``prev`` (the head of a state that has already passed) the flood fill
+    runs only if that cannot be ruled out locally, i.e. some other free
+    neighbour of ``prev`` is not joined to the new head through free
+    corner cells.
+    """
+
+    def __init__(self, board: Board, required: Iterable[int]):
+        size = board.size
+        self.size = size
+        self.open_right = 0  # Бит клетки, из которой можно шагнуть вправо
+        self.open_down = 0  # ... и вниз
+        self.adjacent = []  # Маска соседей каждой клетки
+        for cell in range(board.cell_count):
+            mask = 0
+            for other in board.neighbors(cell):
+                mask |= 1 << other
+                if other == cell + 1:
+                    self.open_right |= 1 << cell
+                elif other == cell + size:
+                    self.open_down |= 1 << cell
+            self.adjacent.append(mask)
+        self.shifts = []  # 1, 2, 4, ... < size — сдвиги заливки по линии
+        shift = 1
+        while shift < size:
+            self.shifts.append(shift)
+            shift *= 2
+        self.free = (1 << board.cell_count) - 1  # Непосещённые клетки
+        self.required = 0
+        for cell in required:
+            self.required |= 1 << cell
+
+    def visit(self, cell: int):
+        self.free &= ~(1 << cell)
+
+    def leave(self, cell: int):
+        self.free |= 1 << cell
+
+    def blocked(self, head: int, target: int, prev: Optional[int] = None) -> bool:
+        """True if no simple route from ``head`` to ``target`` can visit every required free cell.
+
+        ``prev`` is the previous head; pass it only if the state with that
+        head passed this check (a route that starts at ``target`` never
+        checks its first state, so ``prev == target`` is ignored).
+        """
+        size = self.size
+        open_right = self.open_right
+        open_down = self.open_down
+        head_bit = 1 << head
+        target_bit = 1 << target
+        region = self.free | head_bit | target_bit
+        todo = self.required & self.free & ~head_bit & ~target_bit
+        if not todo and head_bit & self.adjacent[target]:
+            return False
+
+        # Соседи в области по четырём направлениям; две и три стороны — через попарные И
+        right = open_right & (region >> 1)
+        left = (region & open_right) << 1
+        down = open_down & (region >> size)
+        up = (region & open_down) << size
+        two = (right & (left | down | up)) | (left & (down | up)) | (down & up)
+        if todo & ~two:
+            return True
+        three = (right & left & (down | up)) | (down & up & (right | left))
+        exactly_two = todo & two & ~three
+        forced = exactly_two & self.adjacent[head]
+        if forced & (forced - 1):
+            return True
+        forced = exactly_two & self.adjacent[target]
+        if forced & (forced - 1):
+            return True
+
+        if prev is not None and prev != target and self._bypassed(prev, head, region, target_bit):
+            return False
+
+        # Заливка от головы; через цель маршрут не проходит
+        passable = region & ~target_bit
+        east = passable & (open_right << 1)  # Клетки, в которые можно войти слева
+        west = passable & open_right
+        south = passable & (open_down << size)
+        north = passable & open_down
+        target_side = self.adjacent[target]
+        shifts = self.shifts
+        reach = head_bit
+        while True:
+            before = reach
+            e, w, s, n = east, west, south, north
+            for shift in shifts:
+                reach |= e & (reach << shift)  # Вправо
+                e &= e << shift
+            for shift in shifts:
+                reach |= w & (reach >> shift)  # Влево
+                w &= w >> shift
+            for shift in shifts:
+                step = shift * size
+                reach |= s & (reach << step)  # Вниз
+                s &= s << step
+            for shift in shifts:
+                step = shift * size
+                reach |= n & (reach >> step)  # Вверх
+                n &= n >> step
+            if reach & target_side and not todo & ~reach:
+                return False
+            if reach == before:
+                return True
+
+    def _bypassed(self, prev: int, head: int, region: int, target_bit: int) -> bool:
+        """True if every region neighbour of ``prev`` is joined to ``head`` around free corners"""
+        adjacent = self.adjacent
+        passable = region & ~target_bit
+        others = adjacent[prev] & region & ~(1 << head)
+        joined = 1 << head
+        while others:
+            progress = False
+            rest = others
+            while rest:
+                bit = rest & -rest
+                rest ^= bit
+                # Общий сосед двух соседей prev, кроме самой prev, — угловая клетка
+                corners = adjacent[bit.bit_length() - 1] & passable
+                while corners:
+                    corner = corners & -corners
+                    corners ^= corner
+                    if adjacent[corner.bit_length() - 1] & joined:
+                        others ^= bit
+                        if bit != target_bit:  # Через цель маршрут дальше не идёт
+                            joined |= bit
+                        progress = True
+                        break
+            if not progress:
+                return False
+        return True
@@ -0,0 +1,363 @@
+import heapq
+from array import array
+from typing import List, Optional, Tuple
+
+from .board import Board
+from .budget import WAYPOINT_NODE_COST, BudgetExceeded, SearchBudget
+from .pruning import MIN_REGION_CELLS, RouteRegion
+from .stats import record
+
+
+def reconstruct_path(parent: array, goal: int) -> List[int]:
+    """Rebuild the cell path from parent pointers (start has parent -1)"""
+    path = [goal]
+    cell = parent[goal]
+    while cell != -1:
+        path.append(cell)
+        cell = parent[cell]
+    path.reverse()
+    return path
+
+
+def find_path(board: Board, start: int, goal: int) -> Optional[List[int]]:
+    """Shortest path between two cells with A*.
+
+    The search runs from ``goal`` back to ``start`` with the exact wall-aware
+    distance to ``start`` from the board's distance oracle as the heuristic
+    (the same row the shortest-route counter reads, so validation of an open
+    task does one BFS). An unreachable goal is rejected at once and, with
+    ties broken towards the target, only cells of one shortest path are
+    expanded. g-scores and parent pointers live in flat arrays indexed by
+    cell and the path is rebuilt once the target is reached.
+    """
+    cell_count = board.cell_count
+    neighbors = board.neighbors
+    to_start = board.distances_from(start)
+    if to_start[goal] < 0:
+        record(astar_expanded=0, astar_pushes=0)
+        return None
+
+    g_score = array('i', [-1]) * cell_count
+    parent = array('i', [-1]) * cell_count
+    closed = bytearray(cell_count)
+
+    g_score[goal] = 0
+    count = 0  # Для стабильной сортировки; заодно число вставок в кучу
+    expanded = 0
+    queue = [(to_start[goal], to_start[goal], count, goal)]
+
+    while queue:
+        _, _, _, cell = heapq.heappop(queue)
+        if closed[cell]:
+            continue
+        if cell == start:
+            record(astar_expanded=expanded, astar_pushes=count)
+            path = reconstruct_path(parent, start)
+            path.reverse()
+            return path
+        closed[cell] = 1
+        expanded += 1
+
+        next_g = g_score[cell] + 1
+        for next_cell in neighbors(cell):
+            if closed[next_cell]:
+                continue
+            old_g = g_score[next_cell]
+            if old_g != -1 and old_g <= next_g:
+                continue
+            g_score[next_cell] = next_g
+            parent[next_cell] = cell
+            h_score = to_start[next_cell]
+            count += 1
+            heapq.heappush(queue, (next_g + h_score, h_score, count, next_cell))
+
+    record(astar_expanded=expanded, astar_pushes=count)
+    return None
+
+
+def rook_move_tree(board: Board, start: int, goal: Optional[int] = None) -> Tuple[array, array]:
+    """BFS over sliding rook moves: (moves from ``start``, parent stop) per cell, -1 if unreached.
+
+    Each expansion reads the four stops from the board's slide planes
+    (Board.rook_moves), so no ray is walked. With ``goal`` the search
+    stops as soon as the goal is reached. Sliding moves are not symmetric,
+    so unlike distances_from the table only holds moves away from ``start``.
+    """
+    cell_count = board.cell_count
+    rook_moves = board.rook_moves
+    moves = array('h', [-1]) * cell_count
+    parent = array('h', [-1]) * cell_count
+    moves[start] = 0
+    frontier = [start]
+    depth = 0
+    expanded = 0
+    while frontier:
+        if goal is not None and moves[goal] >= 0:
+            break
+        depth += 1
+        next_frontier = []
+        for cell in frontier:
+            expanded += 1
+            for stop in rook_moves(cell):
+                if moves[stop] == -1:
+                    moves[stop] = depth
+                    parent[stop] = cell
+                    next_frontier.append(stop)
+        frontier = next_frontier
+    record(rook_bfs_expanded=expanded)
+    return moves, parent
+
+
+def find_rook_path(board: Board, start: int, goal: int) -> Optional[List[int]]:
+    """Fewest sliding rook moves from ``start`` to stop on ``goal``, as the list of stops"""
+    moves, parent = rook_move_tree(board, start, goal)
+    if moves[goal] < 0:
+        return None
+    return reconstruct_path(parent, goal)
+
+
+def expand_slides(stops: List[int], size: int) -> List[int]:
+    """Cell-by-cell route of consecutive sliding moves between ``stops``"""
+    route = stops[:1]
+    for a, b in zip(stops, stops[1:]):
+        step = (1 if b > a else -1) if a // size == b // size else (size if b > a else -size)
+        route.extend(range(a + step, b + step, step))
+    return route
+
+
+UNREACHABLE = 1 << 30
+
+
+class WaypointHeuristic:
+    """Admissible bound for "visit the remaining waypoints, then reach target".
+
+    Built from the board's distance rows of the waypoints and the target:
+    distance to the nearest remaining waypoint plus the minimum spanning tree
+    over the remaining waypoints and the target. MST values are memoised per
+    remaining-waypoint mask.
+    """
+
+    def __init__(self, board: Board, waypoints: List[int], target: int):
+        self.waypoints = list(waypoints)
+        self.full_mask = (1 << len(self.waypoints)) - 1
+        self.distances = [board.distances_from(cell) for cell in self.waypoints]
+        self.target_distances = board.distances_from(target)
+        self._mst_cache = {}
+
+    def _distance(self, i: int, j: int) -> int:
+        """Distance between waypoints i and j; index -1 stands for the target"""
+        if i == -1:
+            i, j = j, i
+        cell = self.waypoints[j] if j != -1 else None
+        d = self.distances[i][cell] if cell is not None else self.target_distances[self.waypoints[i]]
+        return d if d >= 0 else UNREACHABLE
+
+    def mst(self, remaining: int) -> int:
+        if remaining in self._mst_cache:
+            return self._mst_cache[remaining]
+        nodes = [i for i in range(len(self.waypoints)) if remaining >> i & 1]
+        nodes.append(-1)
+        # Алгоритм Прима на полном графе расстояний
+        best = {node: UNREACHABLE for node in nodes[1:]}
+        current = nodes[0]
+        total = 0
+        while best:
+            for node in best:
+                d = self._distance(current, node)
+                if d < best[node]:
+                    best[node] = d
+            current = min(best, key=best.get)
+            total += best.pop(current)
+            if total >= UNREACHABLE:
+                total = UNREACHABLE
+                break
+        self._mst_cache[remaining] = total
+        return total
+
+    def __call__(self, cell: int, mask: int) -> int:
+        remaining = self.full_mask & ~mask
+        if not remaining:
+            d = self.target_distances[cell]
+            return d if d >= 0 else UNREACHABLE
+        nearest = UNREACHABLE
+        for i, distances in enumerate(self.distances):
+            if remaining >> i & 1:
+                d = distances[cell]
+                if 0 <= d < nearest:
+                    nearest = d
+        if nearest == UNREACHABLE:
+            return UNREACHABLE
+        return nearest + self.mst(remaining)
+
+
+def find_waypoint_walk(board: Board, start: int, waypoints: List[int],
+                       end: Optional[int] = None,
+                       budget: Optional[SearchBudget] = None) -> Optional[List[int]]:
+    """Shortest walk from start through all waypoints to end (start if None).
+
+    A* over (cell, visited-waypoint bitmask) states. The walk may pass a cell
+    more than once, so its length is a lower bound for any simple route.
+    Raises BudgetExceeded when ``budget`` runs out.
+    """
+    closed_route = end is None
+    target = start if closed_route else end
+    waypoints = [cell for cell in dict.fromkeys(waypoints) if cell != start and cell != target]
+    heuristic = WaypointHeuristic(board, waypoints, target)
+    full_mask = heuristic.full_mask
+    bit_of = {cell: 1 << i for i, cell in enumerate(waypoints)}
+    cell_count = board.cell_count
+    neighbors = board.neighbors
+    charge = budget.charge if budget is not None else None
+
+    initial = start
+    h_score = heuristic(start, 0)
+    if h_score >= UNREACHABLE:
+        return None
+    g_score = {initial: 0}
+    parent = {initial: -1}
+    closed = set()
+    count = 0
+    queue = [(h_score, count, initial)]
+
+    try:
+        while queue:
+            _, _, state = heapq.heappop(queue)
+            if state in closed:
+                continue
+            if charge is not None:
+                charge(WAYPOINT_NODE_COST)
+            mask, cell = divmod(state, cell_count)
+            g = g_score[state]
+            # Маска full_mask + 1 — замкнутый маршрут без промежуточных точек вернулся в старт
+            if cell == target and (mask == full_mask or mask == full_mask + 1) and (g > 0 or not closed_route):
+                path = []
+                while state != -1:
+                    path.append(state % cell_count)
+                    state = parent[state]
+                path.reverse()
+                return path
+            closed.add(state)
+
+            for next_cell in neighbors(cell):
+                next_mask = mask | bit_of.get(next_cell, 0)
+                next_state = next_mask * cell_count + next_cell
+                if next_state == initial:
+                    # Возврат в старт замыкает маршрут: отдельное состояние цели
+                    if next_mask != full_mask:
+                        continue
+                    next_state = (full_mask + 1) * cell_count + next_cell
+                if next_state in closed:
+                    continue
+                old_g = g_score.get(next_state)
+                if old_g is not None and old_g <= g + 1:
+                    continue
+                h_score = heuristic(next_cell, next_mask)
+                if h_score >= UNREACHABLE:
+                    continue
+                g_score[next_state] = g + 1
+                parent[next_state] = state
+                count += 1
+                heapq.heappush(queue, (g + 1 + h_score, count, next_state))
+        return None
+    finally:
+        record(walk_expanded=len(closed), walk_pushes=count)
+
+
+class SearchLimitExceeded(Exception):
+    """Raised inside a search when its node limit is used up"""
+
+
+def find_waypoint_tour(board: Board, start: int, waypoints: List[int],
+                       end: Optional[int] = None, max_nodes: int = 200000,
+                       budget: Optional[SearchBudget] = None) -> Optional[List[int]]:
+    """Shortest simple route from start through all waypoints to end.
+
+    With ``end=None`` the route is a closed loop returned as
+    [start, ..., start]. The relaxed (cell, mask) walk gives the first depth
+    bound, then an IDA* depth-first search over simple paths deepens it in
+    steps of two (grid routes between fixed cells have fixed parity). On
+    boards of MIN_REGION_CELLS cells and more, RouteRegion drops partial
+    routes that can no longer reach every remaining waypoint and the end.
+    Returns None if no route exists or ``max_nodes`` or ``budget`` is
+    exceeded (``budget.exhausted`` tells the two cases apart).
+    """
+    closed_route = end is None
+    target = start if closed_route else end
+    waypoints = [cell for cell in dict.fromkeys(waypoints) if cell != start and cell != target]
+    # Промежуточная клетка простого маршрута требует двух открытых соседей
+    through_cells = waypoints + [start] if closed_route else waypoints
+    if any(len(board.neighbors(cell)) < 2 for cell in through_cells):
+        return None
+    try:
+        walk = find_waypoint_walk(board, start, waypoints, end, budget)
+    except BudgetExceeded:
+        return None
+    if walk is None:
+        return None
+    heuristic = WaypointHeuristic(board, waypoints, target)
+    full_mask = heuristic.full_mask
+    bit_of = {cell: 1 << i for i, cell in enumerate(waypoints)}
+    neighbors = board.neighbors
+    min_length = 4 if closed_route else 1
+
+    visited = bytearray(board.cell_count)
+    visited[start] = 1
+    region = RouteRegion(board, waypoints) if board.cell_count >= MIN_REGION_CELLS else None
+    if region is not None:
+        region.visit(start)
+    path = [start]
+    nodes = 0
+    pruned = 0
+    charge = budget.charge if budget is not None else None
+
+    def dfs(cell: int, g: int, mask: int, bound: int) -> bool:
+        nonlocal nodes, pruned
+        nodes += 1
+        if nodes > max_nodes:
+            raise SearchLimitExceeded()
+        if charge is not None:
+            charge(WAYPOINT_NODE_COST)
+        candidates = []
+        for next_cell in neighbors(cell):
+            next_mask = mask | bit_of.get(next_cell, 0)
+            if next_cell == target:
+                if next_mask == full_mask and g + 1 >= min_length and g + 1 <= bound:
+                    path.append(next_cell)
+                    return True
+                continue
+            if visited[next_cell]:
+                continue
+            h_score = heuristic(next_cell, next_mask)
+            if g + 1 + h_score > bound:
+                continue
+            candidates.append((h_score, next_cell, next_mask))
+        candidates.sort()
+        for _, next_cell, next_mask in candidates:
+            visited[next_cell] = 1
+            path.append(next_cell)
+            if region is not None:
+                region.visit(next_cell)
+            if region is not None and region.blocked(next_cell, target, cell if g else None):
+                pruned += 1
+            elif dfs(next_cell, g + 1, next_mask, bound):
+                return True
+            path.pop()
+            if region is not None:
+                region.leave(next_cell)
+            visited[next_cell] = 0
+        return False
+
+    bound = max(len(walk) - 1, min_length)
+    if closed_route:
+        bound += bound % 2  # Цикл на клетчатом поле всегда чётной длины
+    limit = board.cell_count if closed_route else board.cell_count - 1
+    try:
+        while bound <= limit:
+            if dfs(start, 0, 0, bound):
+                return path
+            bound += 2
+    except (SearchLimitExceeded, BudgetExceeded):
+        return None
+    finally:
+        record(tour_nodes=nodes, tour_pruned=pruned)
+    return None
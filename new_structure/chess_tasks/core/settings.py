@@ -0,0 +1,125 @@
+"""Task rules and generation settings shared by the GUI and headless tools"""
+
+# Task types and themes with their available figures
+TASK_THEME_FIGURES = {
+    'Цикл с пустыми и закрашенными точками': [1, 2],  # 1 - filled point, 2 - empty point
+    'Цикл с закрашенными точками': [1],  # 1 - filled point
+    'Замкнутый путь с перегородками': [1, 3],  # 1 - point, 3 - wall
+    'Путь ладьи 1-2-3 с перегородками': [6, 7],  # 6 - number, 7 - cross
+    'Несколько замкнутых циклов': [1, 2],  # 1 - filled point, 2 - empty point
+    'Выход для ладьи': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
+    'Маршрут к базе для 2 ладей': [4, 6, 7],  # 4 - start, 6 - rook, 7 - base
+    'Проведи ладью в правильном порядке': [4, 5, 6],  # 4 - start, 5 - end, 6 - number
+    'Путь ладьи по коридорам': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
+    'Маршрут через клетки': [4, 5, 6],  # 4 - start, 5 - end, 6 - cell to pass through
+    'Простой математический лабиринт': [4, 5, 6],  # 4 - start, 5 - end, 6 - number
+    'Кольцевой маршрут максимальной длины': [4]  # 4 - start of the ring
+}
+
+# Solution rules for each theme:
+#   closed - the route is a loop, otherwise a path from start (4) to end (5)
+#   cover_all - the route passes through every cell exactly once
+#   alternate_colors - filled (1) and empty (2) circles alternate along the route
+#   straight_through - the route goes straight through filled circles (1)
+#   multi_loop - the route is several disjoint loops, one per circle colour:
+#                each loop holds all circles of its colour and no others
+#   two_rooks - two rooks (6) take turns moving to the two bases (7) and never
+#               share a cell; a solution is the pair of rook routes
+#   sliding - the rook slides until a wall, so routes are measured in moves, not cells
+#   waypoints - the route passes through every marked cell (6) and visits no cell twice
+#   ordered - the route visits the numbered cells (6) in increasing order, each leg a
+#             shortest path around the cells of the earlier legs; crosses (7) are never entered
+#   longest - the route is a loop from the start (4) back to it; only loops of the
+#             greatest length count as solutions
+#   sum - the numbers (6) on the route add up to the number written on the end (5)
+#   corridors - routes are searched on the board contracted to junctions and corridors
+#               (dead ends dropped, chains of two-way cells merged into weighted edges)
+#   shortest - only shortest routes count as solutions
+THEME_RULES = {
+    'Цикл с пустыми и закрашенными точками': {'closed': True, 'cover_all': True, 'alternate_colors': True},
+    'Цикл с закрашенными точками': {'closed': True, 'cover_all': True, 'straight_through': True},
+    'Замкнутый путь с перегородками': {'closed': True, 'cover_all': True},
+    'Путь ладьи 1-2-3 с перегородками': {'closed': True, 'ordered': True},
+    'Несколько замкнутых циклов': {'closed': True, 'cover_all': True, 'multi_loop': True},
+    'Выход для ладьи': {'closed': False, 'shortest': True, 'sliding': True},
+    'Маршрут к базе для 2 ладей': {'closed': False, 'shortest': True, 'two_rooks': True},
+    'Проведи ладью в правильном порядке': {'closed': False, 'shortest': True, 'ordered': True},
+    'Путь ладьи по коридорам': {'closed': False, 'shortest': True, 'corridors': True},
+    'Маршрут через клетки': {'closed': False, 'shortest': True, 'waypoints': True},
+    'Простой математический лабиринт': {'closed': False, 'shortest': True, 'sum': True},
+    'Кольцевой маршрут максимальной длины': {'closed': True, 'longest': True}
+}
+
+# Task types and themes
+TASK_TYPES = {
+    'Замкнутые': [
+        'Цикл с пустыми и закрашенными точками',
+        'Цикл с закрашенными точками',
+        'Замкнутый путь с перегородками',
+        'Путь ладьи 1-2-3 с перегородками',
+        'Несколько замкнутых циклов'
+    ],
+    'Незамкнутые': [
+        'Выход для ладьи',
+        'Маршрут к базе для 2 ладей',
+        'Проведи ладью в правильном порядке',
+        'Путь ладьи по коридорам',
+        'Маршрут через клетки',
+        'Простой математический лабиринт',
+        'Кольцевой маршрут максимальной длины'
+    ]
+}
+
+# Grid settings
+DEFAULT_GRID_SIZE = 8  # Default grid size for new tasks
+GRID_SIZE_SETTINGS = {
+    'Легко': 6,
+    'Средне': 8,
+    'Сложно': 10,
+    'Невозможно': 16
+}
+
+# Largest board the generator offers for a theme. On 16x16 the loop themes do not prove a
+# unique solution within the per-attempt search budget; unlisted themes take every size
+GENERATION_MAX_GRID_SIZE = {
+    'Цикл с пустыми и закрашенными точками': 10,
+    'Цикл с закрашенными точками': 10,
+    'Замкнутый путь с перегородками': 10,
+    'Несколько замкнутых циклов': 10,
+    # Каждое доказательство единственности на 10x10 стоит около секунды, а стен против
+    # соперников нужно несколько: попытка не укладывается в бюджет поиска
+    'Кольцевой маршрут максимальной длины': 8
+}
+
+# Task validation settings
+VALIDATION_SETTINGS = {
+    'max_attempts': 100,  # Maximum attempts to generate a valid task
+    'solution_timeout': 5.0,  # Maximum time (seconds) to find a solution; validation outside generation only
+    'max_search_nodes': 5_000_000,  # Search work per attempt, in node-cost units of about 1 µs (the time limit of generation)
+    'max_search_memory_mb': 512,  # Maximum growth of peak memory per search, also in generation (not checked on Windows)
+    'min_unique_paths': 1,  # Minimum number of unique paths required
+    'max_unique_paths': 1,  # Maximum number of unique paths allowed
+    'min_wall_density': 0.1,  # Minimum wall density (walls / total cells)
+    'max_wall_density': 0.3   # Maximum wall density (walls / total cells)
+}
+
+# Task generation settings
+GENERATION_SETTINGS = {
+    'minimize_clues': True,  # Remove walls and figures that are not needed for a unique solution
+    'minimize_search_nodes': 300_000  # Search work for clue minimisation, in the units of max_search_nodes
+}
+
+# Pool of pre-generated tasks per (type, theme, complexity)
+POOL_SETTINGS = {
+    'depth': 5,  # Validated tasks kept ready in every bucket
+    'max_size': 500,  # Maximum tasks in the whole pool, the oldest are evicted first
+    'max_age_days': 30  # Tasks older than this are evicted (generator may have changed)
+}
+
+# Number of clue figures per complexity level
+FIGURE_COUNTS = {
+    'Легко': 3,
+    'Средне': 4,
+    'Сложно': 5,
+    'Невозможно': 6
+}
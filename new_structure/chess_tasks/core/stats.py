@@ -0,0 +1,85 @@
+"""Opt-in solver statistics: counters and per-stage wall time.
+
+Collection is enabled for the current thread (context) only inside
+``with collect_stats() as stats:``. Searches keep their counters in local
+variables and report them once per call through ``record``, so with
+collection disabled the cost is one context-variable lookup per search or
+stage.
+"""
+import functools
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+_active: ContextVar[Optional['SolverStats']] = ContextVar('solver_stats', default=None)
+
+
+class SolverStats:
+    """Counters (node expansions, heap pushes, prunes, cache hits) and stage timings"""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = {}
+        self.stages: Dict[str, Dict[str, float]] = {}  # имя -> {'calls', 'seconds'}
+
+    def add(self, counts: Dict[str, int]):
+        for name, value in counts.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_stage(self, name: str, seconds: float):
+        stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'counters': dict(sorted(self.counters.items())),
+            'stages': {name: {'calls': stage['calls'], 'seconds': round(stage['seconds'], 6)}
+                       for name, stage in sorted(self.stages.items())},
+        }
+
+    def to_json(self, **extra) -> str:
+        """One JSON line; ``extra`` fields (seed, theme, ...) go first"""
+        return json.dumps({**extra, **self.as_dict()}, ensure_ascii=False)
+
+    def log(self, stream: TextIO, **extra):
+        stream.write(self.to_json(**extra) + '\n')
+
+    def __repr__(self):
+        return f"SolverStats({self.as_dict()})"
+
+
+@contextmanager
+def collect_stats() -> Iterator[SolverStats]:
+    """Collect statistics of everything run inside the block"""
+    stats = SolverStats()
+    token = _active.set(stats)
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+def record(**counts: int):
+    """Add counters to the active statistics, if any"""
+    stats = _active.get()
+    if stats is not None:
+        stats.add(counts)
+
+
+def timed_stage(name: str):
+    """Decorator adding the wall time of every call to stage ``name``"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stats = _active.get()
+            if stats is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add_stage(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+"""Shortest routes whose numbered cells add up to a target, counted over (cell, running total)"""
+from typing import Dict, List, Optional
+
+from .board import Board
+from .budget import SUM_ROUTE_NODE_COST, SearchBudget
+from .stats import record
+
+
+class SumRoute:
+    """Shortest routes from ``start`` to ``end`` whose numbers add up to ``target``.
+
+    A cell with a number (6) adds it to the running total when the route
+    passes it; other cells add nothing. Routes are shortest, so every step
+    lowers the BFS distance to the end by one and a route never comes back
+    to a cell: the state (cell, total so far) fixes everything that
+    matters for the rest of the route. ``ways`` counts the completions of
+    a state (capped at ``limit``) and memoises them, so routes that meet
+    in one state with one total are counted together instead of one by
+    one.
+
+    Before a state is expanded its total is checked against ``low`` and
+    ``high``: the least and the greatest sum still to collect on a
+    shortest path from the cell to the end. A total that misses
+    ``target`` even then has no completion and is dropped at once.
+    """
+
+    def __init__(self, board: Board, start: int, end: int, values: Dict[int, int], target: int):
+        self.board = board
+        self.start = start
+        self.end = end
+        self.target = target
+        self.value = [0] * board.cell_count
+        for cell, value in values.items():
+            if cell != start and cell != end:
+                self.value[cell] = value
+        self.to_end = board.distances_from(end)
+        self.low, self.high = self._bounds()
+
+    def _bounds(self):
+        """Least and greatest sum still to collect from each cell to the end on shortest paths"""
+        neighbors = self.board.neighbors
+        to_end, value = self.to_end, self.value
+        low = [0] * self.board.cell_count
+        high = [0] * self.board.cell_count
+        # Клетки по возрастанию расстояния до конца: следующие за ними уже посчитаны
+        for cell in sorted((cell for cell, d in enumerate(to_end) if d > 0), key=to_end.__getitem__):
+            steps = [next_cell for next_cell in neighbors(cell) if to_end[next_cell] == to_end[cell] - 1]
+            low[cell] = min(value[next_cell] + low[next_cell] for next_cell in steps)
+            high[cell] = max(value[next_cell] + high[next_cell] for next_cell in steps)
+        return low, high
+
+    def count(self, limit: int, solutions: List[List[int]], stats: Dict,
+              budget: Optional[SearchBudget] = None):
+        """Append up to ``limit`` routes to ``solutions``; raises BudgetExceeded when ``budget`` runs out"""
+        start, end, target = self.start, self.end, self.target
+        to_end, value, low, high = self.to_end, self.value, self.low, self.high
+        if to_end[start] < 0 or not low[start] <= target <= high[start]:
+            stats['pruned'] += 1
+            return
+        neighbors = self.board.neighbors
+        charge = budget.charge if budget is not None else None
+        memo = {}  # (клетка, сумма) -> число продолжений, не больше limit
+        counters = {'states': 0, 'pruned': 0}
+
+        def ways(cell: int, total: int) -> int:
+            if cell == end:
+                return 1 if total == target else 0
+            key = (cell, total)
+            found = memo.get(key)
+            if found is not None:
+                return found
+            counters['states'] += 1
+            if charge is not None:
+                charge(SUM_ROUTE_NODE_COST)
+            found = 0
+            d = to_end[cell] - 1
+            for next_cell in neighbors(cell):
+                if to_end[next_cell] != d:
+                    continue
+                next_total = total + value[next_cell]
+                if next_total + low[next_cell] > target or next_total + high[next_cell] < target:
+                    counters['pruned'] += 1
+                    continue
+                found += ways(next_cell, next_total)
+                if found >= limit:
+                    found = limit
+                    break
+            memo[key] = found
+            return found
+
+        def read_back(cell: int, total: int, route: List[int]) -> bool:
+            """Append the routes counted from (cell, total); True once ``limit`` routes are found"""
+            if cell == end:
+                solutions.append(route[:])
+                return len(solutions) >= limit
+            for next_cell in neighbors(cell):
+                if to_end[next_cell] != to_end[cell] - 1:
+                    continue
+                next_total = total + value[next_cell]
+                if next_cell == end and next_total != target or \
+                        next_cell != end and not memo.get((next_cell, next_total)):
+                    continue
+                route.append(next_cell)
+                done = read_back(next_cell, next_total, route)
+                route.pop()
+                if done:
+                    return True
+            return False
+
+        try:
+            if ways(start, 0):
+                read_back(start, 0, [start])
+        finally:
+            stats['nodes'] += counters['states']
+            stats['pruned'] += counters['pruned']
+            record(sum_route_states=counters['states'], sum_route_pruned=counters['pruned'])
@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from .board import Board
+from .settings import GRID_SIZE_SETTINGS, THEME_RULES
+
+
+class Task:
+    """A generated task without any GUI: walls, figures keyed by (x, y) and the solution"""
+
+    def __init__(self, task_type: str, task_theme: str, complexity: str,
+                 grid_size: Optional[int] = None):
+        self.task_type = task_type
+        self.task_theme = task_theme
+        self.complexity = complexity
+        self.grid_size = grid_size or GRID_SIZE_SETTINGS[complexity]
+        self.walls: List[Tuple[int, int, str]] = []
+        self.figures: Dict[Tuple[int, int], int] = {}
+        self.numbers: Dict[Tuple[int, int], int] = {}  # Числа на клетках-номерах (6); у конца (5) — сумма математического лабиринта
+        self.solution: Optional[List[Tuple[int, int]]] = None
+        self.solution_count = None  # Результат подсчёта решений (SolutionCount)
+        self.board = Board(self.grid_size)
+        # Воспроизведение: generate_task(..., seed=seed, attempt=attempt) той же версии генератора
+        self.seed: Optional[int] = None
+        self.attempt: Optional[int] = None
+        self.generator_version: Optional[int] = None
+
+    @property
+    def rules(self) -> Dict:
+        """Solution rules of the theme (see THEME_RULES)"""
+        return THEME_RULES.get(self.task_theme, {'closed': self.task_type == "Замкнутые"})
+
+    def cell_figures(self) -> Dict[int, int]:
+        """Figures keyed by cell index of the board"""
+        return {self.board.cell(x, y): fig_type for (x, y), fig_type in self.figures.items()}
+
+    def cell_numbers(self) -> Dict[int, int]:
+        """Numbers keyed by cell index of the board"""
+        return {self.board.cell(x, y): number for (x, y), number in self.numbers.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable form; figures are keyed by "x,y" as in the tasks table"""
+        return {
+            'task_type': self.task_type,
+            'task_theme': self.task_theme,
+            'complexity': self.complexity,
+            'grid_size': self.grid_size,
+            'walls': [list(wall) for wall in self.walls],
+            'figures': {f"{x},{y}": fig_type for (x, y), fig_type in self.figures.items()},
+            'numbers': {f"{x},{y}": number for (x, y), number in self.numbers.items()},
+            'solution': [list(pos) for pos in self.solution] if self.solution else None,
+            'seed': self.seed,
+            'attempt': self.attempt,
+            'generator_version': self.generator_version,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Task':
+        """Rebuild a task saved with to_dict"""
+        task = cls(data['task_type'], data['task_theme'], data['complexity'], data['grid_size'])
+        task.walls = [tuple(wall) for wall in data['walls']]
+        task.figures = {tuple(int(v) for v in pos.split(',')): fig_type
+                        for pos, fig_type in data['figures'].items()}
+        task.numbers = {tuple(int(v) for v in pos.split(',')): number
+                        for pos, number in data.get('numbers', {}).items()}
+        task.solution = [tuple(pos) for pos in data['solution']] if data['solution'] else None
+        task.board = Board(task.grid_size, task.walls)
+        task.seed = data.get('seed')
+        task.attempt = data.get('attempt')
+        task.generator_version = data.get('generator_version')
+        return task
@@ -0,0 +1,361 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .board import Board
+from .budget import BudgetExceeded, SearchBudget
+from .corridors import CorridorGraph
+from .cycle_cover import split_loops
+from .held_karp import WaypointRouter
+from .longest_cycle import LongestLoop
+from .multi_agent import BASE_FIGURE, ROOK_FIGURE, TwoRookSearch
+from .ordered import CROSS_FIGURE, OrderedRoute, ordered_stops
+from .propagation import LoopPropagator
+from .search import expand_slides, reconstruct_path, rook_move_tree
+from .stats import record
+from .sum_route import SumRoute
+
+CIRCLE_FIGURES = (1, 2)
+WAYPOINT_FIGURE = 6
+
+
+class SolutionCount:
+    """Result of a solution count: 0, 1, "2+" or unknown plus search statistics"""
+
+    def __init__(self, count: int, limit: int, solutions: List[List[int]], stats: Dict,
+                 unknown: Optional[str] = None):
+        self.count = count
+        self.limit = limit
+        self.solutions = solutions  # Найденные решения (не больше limit)
+        self.stats = stats
+        # Причина остановки по бюджету; count тогда — лишь найденные до остановки
+        self.unknown = unknown
+
+    @property
+    def label(self) -> str:
+        if self.count >= self.limit:
+            return f"{self.limit}+"
+        return f"{self.count}+?" if self.unknown else str(self.count)
+
+    @property
+    def is_unknown(self) -> bool:
+        return self.unknown is not None and self.count < self.limit
+
+    @property
+    def is_unique(self) -> bool:
+        return self.count == 1 and not self.is_unknown
+
+    def __repr__(self):
+        return f"SolutionCount({self.label}, {self.stats})"
+
+
+def count_solutions(board: Board, figures: Dict[int, int], rules: Dict,
+                    limit: int = 2, forced_edge: Optional[Tuple[int, int]] = None,
+                    budget: Optional[SearchBudget] = None,
+                    numbers: Optional[Dict[int, int]] = None) -> SolutionCount:
+    """Count solutions of a task, stopping as soon as ``limit`` are found.
+
+    ``figures`` maps cell index to figure type, ``rules`` is an entry of
+    THEME_RULES. Open themes count shortest routes from start (4) to end (5), in sliding moves for
+    sliding themes; waypoint themes count the shortest simple routes
+    through every marked cell (6) with WaypointRouter. Ordered themes
+    count routes through the cells of ``numbers`` (cell -> number) in
+    increasing order with OrderedRoute, closed back to the first number
+    for closed themes. Longest-loop themes count the longest loops through
+    the start (4) with LongestLoop. Sum themes count the shortest routes
+    whose numbers (``numbers`` without the end) add up to the number of
+    the end (5) with SumRoute. Corridor themes count the shortest routes
+    on the CorridorGraph of the board. With ``forced_edge`` (closed themes
+    only) only loops through that edge are counted. Multi-loop themes
+    count loop covers with LoopPropagator in multi-loop mode; a solution
+    is then its loops one after another (see split_loops); two-rook themes
+    count pairs of rook routes with TwoRookSearch, likewise written one
+    after another (see split_routes). Cover-all themes are solved by
+    LoopPropagator with the theme's circle rules, whose ``stats['depth']``
+    (branching depth, 0 = pure deduction) rates the difficulty; closed
+    rules that match none of these raise ValueError. When
+    ``budget`` runs out the result is unknown (``is_unknown``) and keeps
+    the solutions found so far.
+    """
+    stats = {'nodes': 0, 'pruned': 0, 'elapsed': 0.0}
+    started = time.perf_counter()
+    solutions = []
+    unknown = None
+    if rules.get('ordered'):
+        start = end = None
+        if not rules.get('closed'):
+            start = next((cell for cell, fig in figures.items() if fig == 4), None)
+            end = next((cell for cell, fig in figures.items() if fig == 5), None)
+        stops = ordered_stops(numbers or {}, start, end, closed=rules.get('closed', False))
+        if stops and (rules.get('closed') or start is not None and end is not None):
+            crosses = [cell for cell, fig in figures.items() if fig == CROSS_FIGURE]
+            try:
+                OrderedRoute(board, stops, crosses).count(limit, solutions, stats, budget)
+            except BudgetExceeded as e:
+                unknown = e.reason
+        count = len(solutions)
+    elif rules.get('longest'):
+        start = next((cell for cell, fig in figures.items() if fig == 4), None)
+        if start is not None:
+            try:
+                LongestLoop(board, start).count(limit, solutions, stats, budget)
+            except BudgetExceeded as e:
+                unknown = e.reason
+        count = len(solutions)
+    elif rules.get('closed'):
+        try:
+            if rules.get('multi_loop'):
+                colours = {cell: fig for cell, fig in figures.items() if fig in CIRCLE_FIGURES}
+                LoopPropagator(board, colours, False, multi_loop=True).count(
+                    limit, solutions, stats, forced_edge, budget)
+            elif rules.get('cover_all'):
+                colours = {cell: fig for cell, fig in figures.items() if fig in CIRCLE_FIGURES}
+                straight = [cell for cell, fig in figures.items() if fig == 1] \
+                    if rules.get('straight_through') else ()
+                LoopPropagator(board, colours, rules.get('alternate_colors', False), straight).count(
+                    limit, solutions, stats, forced_edge, budget)
+            else:
+                raise ValueError(f"Нет решателя для замкнутой темы с правилами {rules}")
+        except BudgetExceeded as e:
+            unknown = e.reason
+        count = len(solutions)
+    elif rules.get('two_rooks'):
+        rooks = [cell for cell, fig in figures.items() if fig == ROOK_FIGURE]
+        bases = [cell for cell, fig in figures.items() if fig == BASE_FIGURE]
+        try:
+            TwoRookSearch(board, rooks, bases).count(limit, solutions, stats, budget)
+        except BudgetExceeded as e:
+            unknown = e.reason
+        count = len(solutions)
+    elif rules.get('waypoints'):
+        start = next((cell for cell, fig in figures.items() if fig == 4), None)
+        end = next((cell for cell, fig in figures.items() if fig == 5), None)
+        if start is not None and end is not None:
+            waypoints = [cell for cell, fig in figures.items() if fig == WAYPOINT_FIGURE]
+            try:
+                WaypointRouter(board, start, waypoints, end).count(limit, solutions, stats, budget)
+            except BudgetExceeded as e:
+                unknown = e.reason
+        count = len(solutions)
+    elif rules.get('sum'):
+        start = next((cell for cell, fig in figures.items() if fig == 4), None)
+        end = next((cell for cell, fig in figures.items() if fig == 5), None)
+        numbers = numbers or {}
+        if start is not None and end is not None and end in numbers:
+            try:
+                SumRoute(board, start, end, numbers, numbers[end]).count(limit, solutions, stats, budget)
+            except BudgetExceeded as e:
+                unknown = e.reason
+        count = len(solutions)
+    elif rules.get('corridors'):
+        start = next((cell for cell, fig in figures.items() if fig == 4), None)
+        end = next((cell for cell, fig in figures.items() if fig == 5), None)
+        count = 0
+        if start is not None and end is not None:
+            count = CorridorGraph(board, (start, end)).count_shortest(start, end, limit, stats, solutions)
+    elif rules.get('sliding'):
+        count = _count_rook_routes(board, figures, limit, stats, solutions)
+    else:
+        count = _count_shortest_routes(board, figures, limit, stats, solutions)
+    stats['elapsed'] = time.perf_counter() - started
+    record(uniqueness_searches=1, uniqueness_nodes=stats['nodes'], uniqueness_pruned=stats['pruned'],
+           uniqueness_unknown=int(unknown is not None))
+    return SolutionCount(min(count, limit), limit, solutions, stats, unknown)
+
+
+def _count_shortest_routes(board: Board, figures: Dict[int, int], limit: int, stats: Dict,
+                           solutions: List[List[int]]) -> int:
+    """Number of shortest start-end routes (capped at ``limit``) via BFS path counting.
+
+    One of the routes is appended to ``solutions``.
+    """
+    start = next((cell for cell, fig in figures.items() if fig == 4), None)
+    end = next((cell for cell, fig in figures.items() if fig == 5), None)
+    if start is None or end is None:
+        return 0
+
+    distances = board.distances_from(start)
+    stats['nodes'] = sum(1 for d in distances if d >= 0)
+    if distances[end] < 0:
+        return 0
+
+    # Считаем пути по слоям BFS, обрезая значения на limit
+    ways = [0] * board.cell_count
+    ways[start] = 1
+    order = sorted((d, cell) for cell, d in enumerate(distances) if 0 <= d <= distances[end])
+    for d, cell in order:
+        if not ways[cell]:
+            continue
+        for next_cell in board.neighbors(cell):
+            if distances[next_cell] == d + 1:
+                ways[next_cell] = min(ways[next_cell] + ways[cell], limit)
+
+    path = [end]
+    while path[-1] != start:
+        cell = path[-1]
+        path.append(next(prev for prev in board.neighbors(cell)
+                         if distances[prev] == distances[cell] - 1 and ways[prev]))
+    path.reverse()
+    solutions.append(path)
+    return ways[end]
+
+
+def _count_rook_routes(board: Board, figures: Dict[int, int], limit: int, stats: Dict,
+                       solutions: List[List[int]]) -> int:
+    """Number of routes from start (4) to end (5) in the fewest sliding moves, capped at ``limit``.
+
+    Counts along the BFS layers of rook_move_tree; one of the routes is
+    appended to ``solutions`` cell by cell.
+    """
+    start = next((cell for cell, fig in figures.items() if fig == 4), None)
+    end = next((cell for cell, fig in figures.items() if fig == 5), None)
+    if start is None or end is None:
+        return 0
+
+    moves, parent = rook_move_tree(board, start)
+    stats['nodes'] = sum(1 for d in moves if d >= 0)
+    if moves[end] < 0:
+        return 0
+
+    ways = [0] * board.cell_count
+    ways[start] = 1
+    order = sorted((d, cell) for cell, d in enumerate(moves) if 0 <= d < moves[end])
+    for d, cell in order:
+        for stop in board.rook_moves(cell):
+            if moves[stop] == d + 1:
+                ways[stop] = min(ways[stop] + ways[cell], limit)
+
+    solutions.append(expand_slides(reconstruct_path(parent, end), board.size))
+    return ways[end]
+
+
+def check_loop(board: Board, figures: Dict[int, int], rules: Dict, loop: List[int]) -> bool:
+    """Check that a loop [c0, ..., c0] satisfies the board walls and the theme rules"""
+    if rules.get('multi_loop'):
+        return _check_loop_cover(board, figures, loop)
+    cells = loop[:-1]
+    if len(cells) < 4 or loop[0] != loop[-1] or len(set(cells)) != len(cells):
+        return False
+    if not all(board.can_move(a, b) for a, b in zip(loop, loop[1:])):
+        return False
+    if rules.get('cover_all') and len(cells) != board.cell_count:
+        return False
+    colours = [figures[cell] for cell in cells if figures.get(cell) in CIRCLE_FIGURES]
+    if not rules.get('cover_all') and len(colours) != sum(1 for fig in figures.values() if fig in CIRCLE_FIGURES):
+        return False
+    if rules.get('alternate_colors') and len(colours) > 1 and \
+            any(colours[i] == colours[i - 1] for i in range(len(colours))):
+        return False
+    if rules.get('straight_through'):
+        for i, cell in enumerate(cells):
+            if figures.get(cell) == 1 and cell - cells[i - 1] != cells[(i + 1) % len(cells)] - cell:
+                return False
+    return True
+
+
+def _check_loop_cover(board: Board, figures: Dict[int, int], route: List[int]) -> bool:
+    """Check loops written one after another: every cell once, one circle colour per loop"""
+    loops = split_loops(route)
+    cells = [cell for loop in loops for cell in loop[:-1]]
+    if len(cells) != board.cell_count or len(set(cells)) != len(cells):
+        return False
+    used_colours = set()
+    for loop in loops:
+        if len(loop) < 5 or loop[0] != loop[-1]:
+            return False
+        if not all(board.can_move(a, b) for a, b in zip(loop, loop[1:])):
+            return False
+        colours = {figures[cell] for cell in loop[:-1] if figures.get(cell) in CIRCLE_FIGURES}
+        if len(colours) != 1 or colours & used_colours:
+            return False
+        used_colours |= colours
+    return True
+
+
+def _edge_set(route: List[int]) -> set:
+    """Undirected edges of a route (or of loops one after another), independent of start and direction"""
+    return {(a, b) if a < b else (b, a) for loop in split_loops(route) for a, b in zip(loop, loop[1:])}
+
+
+class IncrementalSolver:
+    """Uniqueness checks for a clue set that shrinks around a known solution.
+
+    Removing a clue only relaxes the task, so the known solution stays valid
+    and any new solution must break the removed clue. Two things are reused
+    between removals:
+
+    * rival solutions found earlier (learned nogoods): if one of them
+      satisfies the relaxed clues, the removal fails without any search;
+    * for loop themes, a removed wall can only be crossed by a rival, so the
+      search is restricted to loops through that edge.
+
+    A search stopped by ``budget`` counts as a failed removal: the clue stays.
+    """
+
+    def __init__(self, board: Board, figures: Dict[int, int], rules: Dict, solution: List[int],
+                 budget: Optional[SearchBudget] = None):
+        self.board = board
+        self.figures = dict(figures)
+        self.rules = rules
+        self.solution = solution
+        self.budget = budget
+        self.rivals: List[List[int]] = []
+        self.stats = {'searches': 0, 'cache_hits': 0, 'nodes': 0}
+
+    def _rival_known(self) -> bool:
+        if not self.rules.get('closed'):
+            return False
+        for rival in self.rivals:
+            if check_loop(self.board, self.figures, self.rules, rival):
+                self.stats['cache_hits'] += 1
+                record(rival_cache_hits=1)
+                return True
+        record(rival_cache_misses=1)
+        return False
+
+    def _search(self, forced_edge=None) -> bool:
+        """Return True if the current clues still have only the known solution"""
+        self.stats['searches'] += 1
+        if forced_edge is not None:
+            result = count_solutions(self.board, self.figures, self.rules, limit=1,
+                                     forced_edge=forced_edge, budget=self.budget)
+            rivals = result.solutions
+        else:
+            result = count_solutions(self.board, self.figures, self.rules, limit=2, budget=self.budget)
+            known = _edge_set(self.solution)
+            rivals = [route for route in result.solutions if _edge_set(route) != known]
+            if result.count == 1 and rivals:
+                rivals.append(rivals[0])  # Единственное решение сменилось — тоже отказ
+        self.stats['nodes'] += result.stats['nodes']
+        if rivals:
+            self.rivals.append(rivals[0])
+            return False
+        return not result.is_unknown
+
+    def try_remove_wall(self, wall) -> bool:
+        """Remove a wall if the solution stays unique; returns whether it was removed"""
+        opened = self.board.remove_wall(*wall)
+        if not opened:
+            return True  # Ребро всё ещё закрыто другой стеной
+        a, b = self._wall_cells(wall)
+        if self._rival_known():
+            unique = False
+        elif self.rules.get('closed'):
+            unique = self._search(forced_edge=(a, b))
+        else:
+            unique = self._search()
+        if not unique:
+            self.board.add_wall(*wall)
+        return unique
+
+    def try_remove_figures(self, cells: List[int]) -> bool:
+        """Remove figures (together) if the solution stays unique"""
+        removed = {cell: self.figures.pop(cell) for cell in cells}
+        unique = not self._rival_known() and self._search()
+        if not unique:
+            self.figures.update(removed)
+        return unique
+
+    def _wall_cells(self, wall) -> Tuple[int, int]:
+        x, y, orientation = wall
+        dx, dy = {'top': (0, -1), 'right': (1, 0), 'bottom': (0, 1), 'left': (-1, 0)}[orientation]
+        return self.board.cell(x, y), self.board.cell(x + dx, y + dy)
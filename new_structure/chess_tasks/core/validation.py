@@ -0,0 +1,173 @@
+"""Solvers and validators for generated tasks"""
+from typing import Optional
+
+from .board import Board
+from .budget import BudgetExceeded, SearchBudget
+from .held_karp import find_waypoint_route
+from .multi_agent import BASE_FIGURE, ROOK_FIGURE, TwoRookSearch
+from .search import expand_slides, find_path, find_rook_path, find_waypoint_tour
+from .settings import TASK_THEME_FIGURES, VALIDATION_SETTINGS
+from .stats import timed_stage
+from .task import Task
+from .uniqueness import WAYPOINT_FIGURE, count_solutions
+
+
+@timed_stage('validate_task')
+def validate_task(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Validate the generated task.
+
+    Searches share ``budget`` (by default one from VALIDATION_SETTINGS); a
+    task whose check runs out of budget is not valid.
+    """
+    if not task.walls or not task.figures:
+        return False
+    if budget is None:
+        budget = SearchBudget.from_settings()
+
+    # Проверяем наличие решения
+    if not find_solution(task, budget):
+        return False
+
+    # Проверяем соответствие фигур теме
+    allowed_figures = TASK_THEME_FIGURES.get(task.task_theme, [])
+    if not all(fig_type in allowed_figures for fig_type in task.figures.values()):
+        return False
+
+    # Проверяем плотность стен
+    total_cells = task.grid_size * task.grid_size
+    wall_density = len(task.walls) / total_cells
+    if not (VALIDATION_SETTINGS['min_wall_density'] <= wall_density <= VALIDATION_SETTINGS['max_wall_density']):
+        return False
+
+    # Самая дорогая проверка — последней: подсчёт решений с отсечкой
+    if not check_solution_uniqueness(task, budget):
+        return False
+
+    return True
+
+
+@timed_stage('find_solution')
+def find_solution(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Find a valid solution for the task"""
+    task.board = Board(task.grid_size, task.walls)
+    if any(task.rules.get(rule) for rule in ('ordered', 'longest', 'sum', 'corridors')):
+        return find_counted_solution(task, budget)
+    elif task.task_type == "Замкнутые":
+        return find_closed_path_solution(task, budget)
+    elif task.rules.get('two_rooks'):
+        return find_two_rook_solution(task, budget)
+    else:
+        return find_open_path_solution(task, budget)
+
+
+def find_closed_path_solution(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Find a solution for closed path tasks"""
+    if not task.figures:
+        return False
+
+    points = [(x, y) for (x, y), fig_type in task.figures.items()
+                 if fig_type in [1, 2]]
+
+    if not points:
+        return False
+
+    board = task.board
+    rules = task.rules
+    if rules.get('multi_loop') or rules.get('alternate_colors') and rules.get('cover_all'):
+        # Несколько циклов и чередование с обходом всех клеток учитывают только
+        # решатели count_solutions; их подсчёт заодно служит проверкой единственности
+        return find_counted_solution(task, budget)
+
+    # Начинаем с первой точки и ищем замкнутый маршрут через все остальные
+    tour = find_waypoint_tour(
+        board, board.cell(*points[0]), [board.cell(x, y) for x, y in points[1:]], budget=budget
+    )
+    if tour:
+        task.solution = [board.coords(cell) for cell in tour]
+        return True
+    return False
+
+
+def find_open_path_solution(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Find a solution for open path tasks"""
+    start = None
+    end = None
+    for (x, y), fig_type in task.figures.items():
+        if fig_type == 4:  # Start
+            start = (x, y)
+        elif fig_type == 5:  # End
+            end = (x, y)
+
+    if not start or not end:
+        return False
+
+    board = task.board
+    if task.rules.get('waypoints'):
+        waypoints = [board.cell(x, y) for (x, y), fig_type in task.figures.items() if fig_type == WAYPOINT_FIGURE]
+        path = find_waypoint_route(board, board.cell(*start), waypoints, board.cell(*end), budget)
+    elif task.rules.get('sliding'):
+        stops = find_rook_path(board, board.cell(*start), board.cell(*end))
+        path = expand_slides(stops, board.size) if stops else None
+    else:
+        path = find_path(board, board.cell(*start), board.cell(*end))
+    if path:
+        task.solution = [board.coords(cell) for cell in path]
+        return True
+    return False
+
+
+def find_counted_solution(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Take the first solution from count_solutions, whose count also serves the uniqueness check.
+
+    For themes only count_solutions solves (ordered, longest loop, sums,
+    corridors, multi-loop and alternate-colour covers).
+    """
+    if task.solution_count is None or task.solution_count.is_unknown:
+        task.solution_count = count_solutions(
+            task.board, task.cell_figures(), task.rules, limit=VALIDATION_SETTINGS['max_unique_paths'] + 1,
+            budget=budget, numbers=task.cell_numbers()
+        )
+    if not task.solution_count.solutions:
+        return False
+    task.solution = [task.board.coords(cell) for cell in task.solution_count.solutions[0]]
+    return True
+
+
+def find_two_rook_solution(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Find the shortest joint routes of two rooks to their bases"""
+    board = task.board
+    cells = task.cell_figures()
+    rooks = [cell for cell, fig_type in cells.items() if fig_type == ROOK_FIGURE]
+    bases = [cell for cell, fig_type in cells.items() if fig_type == BASE_FIGURE]
+    try:
+        best = TwoRookSearch(board, rooks, bases).shortest(budget)
+    except BudgetExceeded:
+        return False
+    if best is None:
+        return False
+    _, first, second = best
+    task.solution = [board.coords(cell) for cell in first + second]
+    return True
+
+
+@timed_stage('check_solution_uniqueness')
+def check_solution_uniqueness(task: Task, budget: Optional[SearchBudget] = None) -> bool:
+    """Check that the number of solutions is within VALIDATION_SETTINGS"""
+    if not task.solution:
+        return False
+
+    board = task.board
+    if task.solution_count is None or task.solution_count.is_unknown:
+        # Перебор с отсечениями останавливается, как только решений больше допустимого
+        task.solution_count = count_solutions(
+            board, task.cell_figures(), task.rules, limit=VALIDATION_SETTINGS['max_unique_paths'] + 1,
+            budget=budget, numbers=task.cell_numbers()
+        )
+    if task.solution_count.is_unknown:
+        return False  # Бюджет исчерпан: единственность не доказана
+    if task.solution_count.solutions:
+        # Сохраняем решение, удовлетворяющее всем правилам темы
+        task.solution = [board.coords(cell) for cell in task.solution_count.solutions[0]]
+
+    count = task.solution_count.count
+    return VALIDATION_SETTINGS['min_unique_paths'] <= count <= VALIDATION_SETTINGS['max_unique_paths']
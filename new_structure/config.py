@@ -3,9 +3,15 @@ import os
 from contextlib import contextmanager
 from typing import Generator, Tuple
 
+from chess_tasks.core.settings import (  # noqa: F401 - re-exported for the GUI modules
+    TASK_THEME_FIGURES, THEME_RULES, TASK_TYPES, DEFAULT_GRID_SIZE, GRID_SIZE_SETTINGS,
+    VALIDATION_SETTINGS, GENERATION_SETTINGS
+)
+
 # Application paths
 BASE_DIR = os.path.dirname(__file__)
 DB_PATH = os.path.join(BASE_DIR, 'chess_tasks.db')
+POOL_DB_PATH = os.path.join(BASE_DIR, 'task_pool.db')  # Кэш готовых задач, можно удалять
 EXPORT_DIR = os.path.join(BASE_DIR, 'exports')
 ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
 
@@ -13,51 +19,6 @@ ASSETS_DIR = os.path.join(BASE_DIR, 'assets')
 os.makedirs(EXPORT_DIR, exist_ok=True)
 os.makedirs(ASSETS_DIR, exist_ok=True)
 
-# Task types and themes with their available figures
-TASK_THEME_FIGURES = {
-    'Цикл с пустыми и закрашенными точками': [1, 2],  # 1 - filled point, 2 - empty point
-    'Цикл с закрашенными точками': [1],  # 1 - filled point
-    'Замкнутый путь с перегородками': [1, 3],  # 1 - point, 3 - wall
-    'Путь ладьи 1-2-3 с перегородками': [6, 7],  # 6 - number, 7 - cross
-    'Несколько замкнутых циклов': [1, 2],  # 1 - filled point, 2 - empty point
-    'Выход для ладьи': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
-    'Маршрут к базе для 2 ладей': [4, 6, 7],  # 4 - start, 6 - rook, 7 - base
-    'Проведи ладью в правильном порядке': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
-    'Путь ладьи по коридорам': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
-    'Маршрут через клетки': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
-    'Простой математический лабиринт': [4, 5, 6],  # 4 - start, 5 - end, 6 - rook
-    'Кольцевой маршрут максимальной длины': [4, 5, 6]  # 4 - start, 5 - end, 6 - rook
-}
-
-# Task types and themes
-TASK_TYPES = {
-    'Замкнутые': [
-        'Цикл с пустыми и закрашенными точками',
-        'Цикл с закрашенными точками',
-        'Замкнутый путь с перегородками',
-        'Путь ладьи 1-2-3 с перегородками',
-        'Несколько замкнутых циклов'
-    ],
-    'Незамкнутые': [
-        'Выход для ладьи',
-        'Маршрут к базе для 2 ладей',
-        'Проведи ладью в правильном порядке',
-        'Путь ладьи по коридорам',
-        'Маршрут через клетки',
-        'Простой математический лабиринт',
-        'Кольцевой маршрут максимальной длины'
-    ]
-}
-
-# Grid settings
-DEFAULT_GRID_SIZE = 8  # Default grid size for new tasks
-GRID_SIZE_SETTINGS = {
-    'Легко': 6,
-    'Средне': 8,
-    'Сложно': 10,
-    'Невозможно': 16
-}
-
 # Complexity settings
 COMPLEXITY_SETTINGS = {
     'Легко': {'cell_size': 100, 'margin': 50, 'grid_size': GRID_SIZE_SETTINGS['Легко']},
@@ -66,16 +27,6 @@ COMPLEXITY_SETTINGS = {
     'Невозможно': {'cell_size': 40, 'margin': 50, 'grid_size': GRID_SIZE_SETTINGS['Невозможно']}
 }
 
-# Task validation settings
-VALIDATION_SETTINGS = {
-    'max_attempts': 100,  # Maximum attempts to generate a valid task
-    'solution_timeout': 5.0,  # Maximum time (seconds) to find a solution
-    'min_unique_paths': 1,  # Minimum number of unique paths required
-    'max_unique_paths': 1,  # Maximum number of unique paths allowed
-    'min_wall_density': 0.1,  # Minimum wall density (walls / total cells)
-    'max_wall_density': 0.3   # Maximum wall density (walls / total cells)
-}
-
 # UI Theme colors
 UI_COLORS = {
     'primary': '#2C3E50',      # Dark blue-gray
@@ -169,6 +120,27 @@ def db_connection() -> Generator[Tuple[sqlite3.Connection, sqlite3.Cursor], None
             except sqlite3.Error:
                 pass
 
+# Columns added to the tasks table after it was created: name -> SQL type
+TASK_COLUMN_MIGRATIONS = {
+    'seed': 'INTEGER',                # Seed генерации (generate_task(..., seed=...))
+    'generation_attempt': 'INTEGER',  # Номер удачной попытки для этого seed
+    'generator_version': 'INTEGER',   # GENERATOR_VERSION на момент генерации
+    'numbers': 'TEXT',                # JSON {"x,y": число} клеток-номеров и суммы лабиринта
+}
+
+
+def migrate_db(db_path: str = DB_PATH):
+    """Add the columns of TASK_COLUMN_MIGRATIONS missing from the tasks table"""
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}
+            for column, sql_type in TASK_COLUMN_MIGRATIONS.items():
+                if existing and column not in existing:
+                    conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {sql_type}")
+    finally:
+        conn.close()
+
 def init_db():
     """Initialize the database with required tables"""
     conn = sqlite3.connect(DB_PATH)
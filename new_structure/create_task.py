@@ -549,13 +549,14 @@ class CreateTaskForm(QDialog):
             # Преобразуем кортежи в строки для JSON
             figures_json = {f"{x},{y}": fig_id for (x, y), fig_id in self.canvas.figures.items()}
             walls_json = [f"{x},{y},{orientation}" for x, y, orientation in self.canvas.walls]
+            numbers_json = {f"{x},{y}": number for (x, y), number in self.canvas.number_positions.items()}
             
             with db_connection() as (conn, cursor):
                 cursor.execute("""
                     INSERT INTO tasks (
                         task_type, task_theme, name, complexity,
-                        grid_size, walls, figures
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                        grid_size, walls, figures, numbers
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
                     self.type_combo.currentText(),
                     self.theme_combo.currentText(),
@@ -563,7 +564,8 @@ class CreateTaskForm(QDialog):
                     complexity,
                     self.size_spin.value(),
                     json.dumps(walls_json),
-                    json.dumps(figures_json)
+                    json.dumps(figures_json),
+                    json.dumps(numbers_json) if numbers_json else None
                 ))
                 
                 QMessageBox.information(self, "Успех", "Задача успешно сохранена")
@@ -1,8 +1,10 @@
 from PyQt5 import QtWidgets
 from main_window import MainWindow
+from config import migrate_db
 import sys
 
 if __name__ == "__main__":
+    migrate_db()
     app = QtWidgets.QApplication(sys.argv)
     window = MainWindow()
     window.show()
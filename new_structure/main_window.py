@@ -11,6 +11,7 @@ from config import (
     UI_COLORS, TASK_TYPES, COMPLEXITY_SETTINGS,
     db_connection
 )
+from chess_tasks.core import supported_complexities
 from task_generator import TaskGenerator
 from create_task import CreateTaskForm
 from task_browser import TaskBrowser
@@ -242,6 +243,10 @@ class Ui_MainWindow(object):
         task_type = self.comboBox_task_type.currentText()
         task_theme = self.comboBox_task_theme.currentText()
         complexity = self.comboBox_complexity.currentText()
+        if complexity not in supported_complexities(task_theme):
+            self.show_error(f"Для темы «{task_theme}» доступны сложности: "
+                            f"{', '.join(supported_complexities(task_theme))}")
+            return
 
         # Закрываем предыдущее окно генератора, если оно есть
         if self.task_generator:
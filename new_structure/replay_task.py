@@ -0,0 +1,110 @@
+"""Regenerate a stored task from its seed and check that it is identical.
+
+Usage (from new_structure/):
+    python replay_task.py TASK_ID [--db PATH] [--profile] [--stats]
+    python replay_task.py --seed S --attempt A --theme THEME --complexity LEVEL [--profile] [--stats]
+
+With --profile the generation runs under cProfile, so slow seeds can be
+profiled exactly as they were generated; --stats prints the solver
+statistics as a JSON line. An attempt that yields no valid task is
+reported in one line on stderr (exit status 1).
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import sqlite3
+import sys
+import time
+
+from chess_tasks.core import collect_stats, generate_task
+from chess_tasks.core.generators import GENERATOR_VERSION
+from chess_tasks.core.settings import GRID_SIZE_SETTINGS, TASK_TYPES
+from config import DB_PATH, migrate_db
+
+
+def load_task_row(db_path: str, task_id: int) -> dict:
+    """Generation parameters and the stored board of a task"""
+    migrate_db(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("""
+            SELECT task_type, task_theme, complexity, walls, figures, numbers, solution,
+                   seed, generation_attempt, generator_version
+            FROM tasks WHERE id = ?
+        """, (task_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise SystemExit(f"Задача {task_id} не найдена")
+    keys = ('task_type', 'task_theme', 'complexity', 'walls', 'figures', 'numbers', 'solution',
+            'seed', 'attempt', 'generator_version')
+    data = dict(zip(keys, row))
+    if data['seed'] is None:
+        raise SystemExit(f"Задача {task_id} сохранена без seed и не может быть воспроизведена")
+    for key in ('walls', 'figures', 'solution'):
+        data[key] = json.loads(data[key]) if data[key] else None
+    data['numbers'] = json.loads(data['numbers']) if data['numbers'] else {}
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('task_id', type=int, nargs='?')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--attempt', type=int, default=0)
+    parser.add_argument('--theme')
+    parser.add_argument('--complexity', choices=list(GRID_SIZE_SETTINGS))
+    parser.add_argument('--profile', action='store_true', help='профилировать генерацию (cProfile)')
+    parser.add_argument('--stats', action='store_true', help='вывести статистику решателя (JSON)')
+    args = parser.parse_args()
+
+    if args.task_id is not None:
+        stored = load_task_row(args.db, args.task_id)
+        if stored['generator_version'] != GENERATOR_VERSION:
+            print(f"Внимание: задача создана генератором версии {stored['generator_version']}, "
+                  f"текущая версия {GENERATOR_VERSION}", file=sys.stderr)
+    elif args.seed is not None and args.theme and args.complexity:
+        task_type = next((t for t, themes in TASK_TYPES.items() if args.theme in themes), None)
+        if task_type is None:
+            parser.error(f"Неизвестная тема: {args.theme}")
+        stored = {'task_type': task_type, 'task_theme': args.theme, 'complexity': args.complexity,
+                  'seed': args.seed, 'attempt': args.attempt, 'walls': None}
+    else:
+        parser.error("нужен TASK_ID или --seed, --theme и --complexity")
+
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    # Как при генерации: решение сохранённой задачи — то, что нашла валидация
+    error = None
+    with collect_stats() as stats:
+        try:
+            task = generate_task(stored['task_type'], stored['task_theme'], stored['complexity'],
+                                 seed=stored['seed'], attempt=stored['attempt'])
+        except ValueError as e:
+            error = e
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    if error is not None:
+        print(f"seed {stored['seed']}, attempt {stored['attempt']}: {error} ({elapsed:.3f}s)", file=sys.stderr)
+    else:
+        print(f"seed {task.seed}, attempt {task.attempt}: {len(task.walls)} walls, "
+              f"{len(task.figures)} figures, valid, {elapsed:.3f}s")
+        if stored['walls'] is not None:
+            replayed = task.to_dict()
+            same = all(replayed[key] == stored[key] for key in ('walls', 'figures', 'numbers', 'solution'))
+            print("identical to the stored task" if same else "DIFFERS from the stored task")
+    if args.stats:
+        print(stats.to_json(seed=stored['seed'], attempt=stored['attempt']))
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    if error is not None:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
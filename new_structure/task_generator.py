@@ -5,15 +5,15 @@ from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QPushButton, QFrame, QProgressBar, QMessageBox
 )
-import random
 import json
 import sqlite3
-import heapq
-from typing import Dict, List, Optional, Tuple, Set
+from typing import Dict, List, Optional, Tuple
 from config import (
-    COMPLEXITY_SETTINGS, TASK_TYPES, UI_COLORS, DB_PATH,
-    VALIDATION_SETTINGS, FIGURE_TYPES, TASK_THEME_FIGURES, db_connection
+    COMPLEXITY_SETTINGS, TASK_TYPES, UI_COLORS, DB_PATH, POOL_DB_PATH,
+    FIGURE_TYPES, db_connection
 )
+from chess_tasks.core import GenerationCancelled, TaskPool, generate_task
+from chess_tasks.core.settings import VALIDATION_SETTINGS
 
 class LoadingOverlay(QWidget):
     def __init__(self, parent=None):
@@ -21,10 +21,15 @@ class LoadingOverlay(QWidget):
         self.setAttribute(Qt.WA_TransparentForMouseEvents)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.angle = 0
+        self.progress_text = ""
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.rotate)
         self.timer.start(50)  # Обновление каждые 50мс
         
+    def set_progress(self, text: str):
+        self.progress_text = text
+        self.update()
+
     def rotate(self):
         self.angle = (self.angle + 10) % 360
         self.update()
@@ -47,6 +52,11 @@ class LoadingOverlay(QWidget):
         text_rect.moveCenter(center)
         text_rect.moveTop(center.y() + 30)
         painter.drawText(text_rect, Qt.AlignCenter, text)
+        if self.progress_text:
+            progress_rect = painter.fontMetrics().boundingRect(self.progress_text)
+            progress_rect.moveCenter(center)
+            progress_rect.moveTop(text_rect.bottom() + 10)
+            painter.drawText(progress_rect, Qt.AlignCenter, self.progress_text)
         
         # Крутящийся индикатор
         painter.translate(center)
@@ -64,6 +74,70 @@ class LoadingOverlay(QWidget):
         self.timer.stop()
         super().hideEvent(event)
 
+class GenerationWorker(QtCore.QThread):
+    """Generates and validates a task off the GUI thread"""
+    progress = QtCore.pyqtSignal(int, int)   # попытка, всего попыток
+    generated = QtCore.pyqtSignal(object)    # chess_tasks.core.Task
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, task_type: str, task_theme: str, complexity: str):
+        super().__init__()
+        self.task_type = task_type
+        self.task_theme = task_theme
+        self.complexity = complexity
+        self._cancelled = False
+
+    def cancel(self):
+        """Ask the worker to stop; running searches stop at their next budget check"""
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def _on_attempt(self, attempt: int):
+        if self._cancelled:
+            raise GenerationCancelled()
+        self.progress.emit(attempt + 1, VALIDATION_SETTINGS['max_attempts'])
+
+    def run(self):
+        try:
+            # Попытки перебирает generate_task; он же проверяет задачу
+            task = generate_task(self.task_type, self.task_theme, self.complexity,
+                                 progress=self._on_attempt, cancelled=self.is_cancelled)
+            self.generated.emit(task)
+        except ValueError:
+            # Отмена во время последней попытки обрывает её поиск и выглядит как неудача
+            if not self._cancelled:
+                self.failed.emit("Не удалось сгенерировать задачу, прошедшую валидацию. Попробуйте еще раз.")
+        except GenerationCancelled:
+            pass
+        except Exception as e:
+            if not self._cancelled:
+                self.failed.emit(f"Ошибка при генерации задачи: {str(e)}")
+
+
+class PoolRefillWorker(QtCore.QThread):
+    """Keeps one bucket of the task pool filled in the background"""
+
+    def __init__(self, pool: TaskPool, task_type: str, task_theme: str, complexity: str):
+        super().__init__()
+        self.pool = pool
+        self.key = (task_type, task_theme, complexity)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled
+
+    def run(self):
+        try:
+            self.pool.refill(*self.key, cancelled=self.is_cancelled)
+        except sqlite3.Error:
+            pass  # Пул — только ускорение: без него задачи генерируются напрямую
+
+
 class TaskGenerator(QMainWindow):
     finished = QtCore.pyqtSignal()
 
@@ -86,8 +160,13 @@ class TaskGenerator(QMainWindow):
         # Initialize task data
         self.walls = []
         self.figures = {}
+        self.numbers = {}  # {(x, y): число} для клеток-номеров (6)
         self.solution = None
-        self.wall_cache = {}  # Кэш для проверки стен
+        self.task = None  # Задача из chess_tasks.core
+        self.worker = None  # Текущий GenerationWorker
+        self.refill_worker = None  # PoolRefillWorker текущей темы
+        self._workers = set()  # Потоки, которые ещё не завершились (в том числе отменённые)
+        self.pool = TaskPool(POOL_DB_PATH)  # Готовые задачи для мгновенной перегенерации
         
         # Создаем оверлей загрузки до setup_ui
         self.loading_overlay = LoadingOverlay(self)
@@ -238,47 +317,94 @@ class TaskGenerator(QMainWindow):
                 background-color: {UI_COLORS['secondary']};
             }}
         """)
-        cancel_btn.clicked.connect(self.close)
+        cancel_btn.clicked.connect(self.cancel)
         button_layout.addWidget(cancel_btn)
         
         main_layout.addWidget(button_block)
 
     def generate_task(self):
-        """Generate a new task"""
+        """Show a task from the pool, or start generating one in a background thread"""
+        # Предыдущая генерация больше не нужна: её результат будет проигнорирован
+        self.cancel_generation()
+
         try:
-            self.loading_overlay.show()
-            QtWidgets.QApplication.processEvents()  # Обновляем UI
-            
-            # Clear previous task
-            self.walls = []
-            self.figures = {}
-            self.solution = None
-            self.wall_cache.clear()
-            
-            # Generate task based on type and theme
-            if self.task_type == "Замкнутые":
-                self.generate_closed_task()
-            else:
-                self.generate_open_task()
-            
-            # Validate the generated task
-            if not self.validate_task():
-                QtWidgets.QMessageBox.warning(
-                    self, "Предупреждение",
-                    "Сгенерированная задача не прошла валидацию. Попробуйте еще раз."
-                )
-                return
-            
-            # Update canvas
-            self.canvas.update()
-            
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(
-                self, "Ошибка",
-                f"Ошибка при генерации задачи: {str(e)}"
-            )
-        finally:
-            self.loading_overlay.hide()
+            task = self.pool.pop(self.task_type, self.task_theme, self.complexity)
+        except sqlite3.Error:
+            task = None
+        if task is not None:
+            self.show_task(task)
+            self.refill_pool()
+            return
+
+        worker = GenerationWorker(self.task_type, self.task_theme, self.complexity)
+        # Слоты — методы окна, поэтому сигналы из потока доставляются в GUI-поток очередью
+        worker.progress.connect(self.on_generation_progress)
+        worker.generated.connect(self.on_task_generated)
+        worker.failed.connect(self.on_generation_failed)
+        worker.finished.connect(self.on_worker_finished)
+        self._workers.add(worker)
+        self.worker = worker
+
+        self.loading_overlay.set_progress("")
+        self.loading_overlay.show()
+        worker.start()
+
+    def cancel_generation(self) -> bool:
+        """Cancel the running generation; returns True if there was one"""
+        worker, self.worker = self.worker, None
+        self.loading_overlay.hide()
+        if worker is None or worker.isFinished():
+            return False
+        worker.cancel()
+        return True
+
+    def cancel(self):
+        """Отмена: stop the generation, or close the window if nothing is running"""
+        if not self.cancel_generation():
+            self.close()
+
+    def refill_pool(self):
+        """Top up the pool bucket of the current theme in the background"""
+        if self.refill_worker is not None and not self.refill_worker.isFinished():
+            return
+        worker = PoolRefillWorker(self.pool, self.task_type, self.task_theme, self.complexity)
+        worker.finished.connect(self.on_worker_finished)
+        self._workers.add(worker)
+        self.refill_worker = worker
+        worker.start(QtCore.QThread.LowPriority)
+
+    def show_task(self, task):
+        """Display a generated task"""
+        self.task = task
+        self.walls = task.walls
+        self.figures = task.figures
+        self.numbers = task.numbers
+        self.solution = task.solution
+
+        # Update canvas
+        self.canvas.update()
+
+    def on_worker_finished(self):
+        self._workers.discard(self.sender())
+
+    def on_generation_progress(self, attempt: int, total: int):
+        if self.sender() is self.worker:
+            self.loading_overlay.set_progress(f"Попытка {attempt} из {total}")
+
+    def on_task_generated(self, task):
+        if self.sender() is not self.worker:
+            return
+        self.worker = None
+        self.loading_overlay.hide()
+        self.show_task(task)
+        self.refill_pool()
+
+    def on_generation_failed(self, message: str):
+        if self.sender() is not self.worker:
+            return
+        self.worker = None
+        self.loading_overlay.hide()
+        QtWidgets.QMessageBox.warning(self, "Предупреждение", message)
 
     def save_task(self):
         """Save the generated task to the database"""
@@ -302,25 +428,31 @@ class TaskGenerator(QMainWindow):
             for (x, y), fig_type in self.figures.items():
                 serialized_figures[f"{x},{y}"] = fig_type
             
-            # Save to database
-            with db_connection() as conn:
-                cursor = conn.cursor()
+            serialized_numbers = {f"{x},{y}": number for (x, y), number in self.numbers.items()}
+
+            # Save to database together with the seed needed to replay the generation
+            task = self.task
+            with db_connection() as (conn, cursor):
                 cursor.execute("""
                     INSERT INTO tasks (
-                        name, type, theme, complexity, grid_size,
-                        walls, figures, solution
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        task_type, task_theme, name, complexity, grid_size,
+                        walls, figures, numbers, solution,
+                        seed, generation_attempt, generator_version
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """, (
-                    task_name,
                     self.task_type,
                     self.task_theme,
+                    task_name,
                     self.complexity,
                     self.GRID_SIZE,
                     json.dumps(self.walls),
                     json.dumps(serialized_figures),
-                    json.dumps(self.solution) if self.solution else None
+                    json.dumps(serialized_numbers) if serialized_numbers else None,
+                    json.dumps(self.solution) if self.solution else None,
+                    task.seed if task else None,
+                    task.attempt if task else None,
+                    task.generator_version if task else None
                 ))
-                conn.commit()
                 
             QtWidgets.QMessageBox.information(
                 self, "Успех",
@@ -334,258 +466,6 @@ class TaskGenerator(QMainWindow):
                 f"Ошибка при сохранении задачи: {str(e)}"
             )
 
-    def validate_task(self) -> bool:
-        """Validate the generated task"""
-        if not self.walls or not self.figures:
-            return False
-
-        # Проверяем наличие решения
-        if not self.find_solution():
-            return False
-
-        # Проверяем уникальность решения
-        if not self.check_solution_uniqueness():
-            return False
-
-        # Проверяем соответствие фигур теме
-        allowed_figures = TASK_THEME_FIGURES.get(self.task_theme, [])
-        if not all(fig_type in allowed_figures for fig_type in self.figures.values()):
-            return False
-
-        # Проверяем плотность стен
-        total_cells = self.GRID_SIZE * self.GRID_SIZE
-        wall_density = len(self.walls) / total_cells
-        if not (VALIDATION_SETTINGS['min_wall_density'] <= wall_density <= VALIDATION_SETTINGS['max_wall_density']):
-            return False
-
-        return True
-
-    def find_solution(self) -> bool:
-        """Find a valid solution for the task"""
-        if self.task_type == "Замкнутые":
-            return self.find_closed_path_solution()
-        else:
-            return self.find_open_path_solution()
-
-    def find_closed_path_solution(self) -> bool:
-        """Find a solution for closed path tasks"""
-        if not self.figures:
-            return False
-
-        points = [(x, y) for (x, y), fig_type in self.figures.items() 
-                 if fig_type in [1, 2]]
-        
-        if not points:
-            return False
-
-        # Начинаем с первой точки
-        start = points[0]
-        remaining_points = set(points[1:])
-        
-        # Ищем путь через все точки
-        path = self.find_path_a_star(start, start, remaining_points)
-        if path:
-            self.solution = path
-            return True
-        return False
-
-    def find_open_path_solution(self) -> bool:
-        """Find a solution for open path tasks"""
-        start = None
-        end = None
-        for (x, y), fig_type in self.figures.items():
-            if fig_type == 4:  # Start
-                start = (x, y)
-            elif fig_type == 5:  # End
-                end = (x, y)
-                
-        if not start or not end:
-            return False
-
-        path = self.find_path_a_star(start, end)
-        if path:
-            self.solution = path
-            return True
-        return False
-
-    def check_solution_uniqueness(self) -> bool:
-        """Check if the task has a unique solution"""
-        if not self.solution:
-            return False
-
-        # Сохраняем текущее решение
-        original_solution = self.solution.copy()
-        
-        # Пробуем найти альтернативное решение, исключая первый ход из оригинального решения
-        if len(original_solution) > 1:
-            first_move = original_solution[1]
-            # Временно блокируем первый ход
-            self.walls.append((first_move[0], first_move[1], 'top'))
-            self.wall_cache.clear()  # Очищаем кэш
-            
-            # Пробуем найти альтернативное решение
-            self.solution = None
-            found_alternative = self.find_solution()
-            
-            # Восстанавливаем состояние
-            self.walls.pop()
-            self.wall_cache.clear()
-            self.solution = original_solution
-            
-            return not found_alternative
-            
-        return True
-
-    def generate_closed_task(self):
-        """Generate a closed path task"""
-        self.walls = []
-        self.figures = {}
-        
-        # Получаем допустимые фигуры для темы
-        allowed_figures = TASK_THEME_FIGURES.get(self.task_theme, [])
-        if not allowed_figures:
-            raise ValueError(f"Нет допустимых фигур для темы {self.task_theme}")
-        
-        # Определяем количество фигур в зависимости от сложности
-        num_figures = {
-            'Легко': 3,
-            'Средне': 4,
-            'Сложно': 5,
-            'Невозможно': 6
-        }[self.complexity]
-        
-        # Размещаем фигуры в соответствии с темой
-        if self.task_theme == "Цикл с пустыми и закрашенными точками":
-            # Чередуем пустые и закрашенные точки
-            for i in range(num_figures):
-                x = random.randint(0, self.GRID_SIZE - 1)
-                y = random.randint(0, self.GRID_SIZE - 1)
-                while (x, y) in self.figures:
-                    x = random.randint(0, self.GRID_SIZE - 1)
-                    y = random.randint(0, self.GRID_SIZE - 1)
-                self.figures[(x, y)] = 1 if i % 2 == 0 else 2
-                
-        elif self.task_theme == "Цикл с закрашенными точками":
-            # Только закрашенные точки
-            for i in range(num_figures):
-                x = random.randint(0, self.GRID_SIZE - 1)
-                y = random.randint(0, self.GRID_SIZE - 1)
-                while (x, y) in self.figures:
-                    x = random.randint(0, self.GRID_SIZE - 1)
-                    y = random.randint(0, self.GRID_SIZE - 1)
-                self.figures[(x, y)] = 1
-                
-        elif self.task_theme == "Замкнутый путь с перегородками":
-            # Точки и стены
-            for i in range(num_figures // 2):
-                # Точка
-                x = random.randint(0, self.GRID_SIZE - 1)
-                y = random.randint(0, self.GRID_SIZE - 1)
-                while (x, y) in self.figures:
-                    x = random.randint(0, self.GRID_SIZE - 1)
-                    y = random.randint(0, self.GRID_SIZE - 1)
-                self.figures[(x, y)] = 1
-                
-                # Стена
-                wx = random.randint(0, self.GRID_SIZE - 1)
-                wy = random.randint(0, self.GRID_SIZE - 1)
-                while (wx, wy) in self.figures or (wx, wy) in self.walls:
-                    wx = random.randint(0, self.GRID_SIZE - 1)
-                    wy = random.randint(0, self.GRID_SIZE - 1)
-                orientation = random.choice(['left', 'top', 'right', 'bottom'])
-                self.walls.append((wx, wy, orientation))
-                
-        elif self.task_theme == "Путь ладьи 1-2-3 с перегородками":
-            # Числа и кресты
-            numbers = list(range(1, num_figures + 1))
-            random.shuffle(numbers)
-            for i, num in enumerate(numbers):
-                x = random.randint(0, self.GRID_SIZE - 1)
-                y = random.randint(0, self.GRID_SIZE - 1)
-                while (x, y) in self.figures:
-                    x = random.randint(0, self.GRID_SIZE - 1)
-                    y = random.randint(0, self.GRID_SIZE - 1)
-                self.figures[(x, y)] = 6  # Число
-                
-                # Добавляем крест рядом с числом
-                if i < len(numbers) - 1:  # Не добавляем крест после последнего числа
-                    cx = x + random.choice([-1, 0, 1])
-                    cy = y + random.choice([-1, 0, 1])
-                    if 0 <= cx < self.GRID_SIZE and 0 <= cy < self.GRID_SIZE and (cx, cy) not in self.figures:
-                        self.figures[(cx, cy)] = 7  # Крест
-                        
-        elif self.task_theme == "Несколько замкнутых циклов":
-            # Чередуем пустые и закрашенные точки для разных циклов
-            cycle_size = num_figures // 2
-            for cycle in range(2):
-                for i in range(cycle_size):
-                    x = random.randint(0, self.GRID_SIZE - 1)
-                    y = random.randint(0, self.GRID_SIZE - 1)
-                    while (x, y) in self.figures:
-                        x = random.randint(0, self.GRID_SIZE - 1)
-                        y = random.randint(0, self.GRID_SIZE - 1)
-                    self.figures[(x, y)] = 1 if cycle == 0 else 2
-        
-        # Добавляем дополнительные стены для усложнения
-        wall_count = int(self.GRID_SIZE * self.GRID_SIZE * random.uniform(
-            VALIDATION_SETTINGS['min_wall_density'],
-            VALIDATION_SETTINGS['max_wall_density']
-        ))
-        
-        walls_placed = 0
-        attempts = 0
-        while walls_placed < wall_count and attempts < 100:
-            x = random.randint(0, self.GRID_SIZE - 1)
-            y = random.randint(0, self.GRID_SIZE - 1)
-            pos = (x, y)
-            
-            if pos not in self.walls and pos not in self.figures:
-                orientation = random.choice(['left', 'top', 'right', 'bottom'])
-                self.walls.append((x, y, orientation))
-                walls_placed += 1
-            attempts += 1
-            
-        # Проверяем и находим решение
-        if not self.find_solution():
-            # Если решение не найдено, пробуем сгенерировать заново
-            self.generate_closed_task()
-
-    def generate_open_task(self):
-        """Generate an open path task"""
-        self.walls = []
-        self.figures = {}
-        
-        # Place start point
-        x1 = random.randint(0, self.GRID_SIZE - 1)
-        y1 = random.randint(0, self.GRID_SIZE - 1)
-        self.figures[f"{x1},{y1}"] = 4  # Start
-        
-        # Place end point
-        while True:
-            x2 = random.randint(0, self.GRID_SIZE - 1)
-            y2 = random.randint(0, self.GRID_SIZE - 1)
-            if (x2, y2) != (x1, y1):
-                self.figures[f"{x2},{y2}"] = 5  # End
-                break
-        
-        # Add walls
-        wall_count = int(self.GRID_SIZE * self.GRID_SIZE * random.uniform(
-            VALIDATION_SETTINGS['min_wall_density'],
-            VALIDATION_SETTINGS['max_wall_density']
-        ))
-        
-        walls_placed = 0
-        attempts = 0
-        while walls_placed < wall_count and attempts < 100:
-            x = random.randint(0, self.GRID_SIZE - 1)
-            y = random.randint(0, self.GRID_SIZE - 1)
-            pos = f"{x},{y}"
-            
-            if pos not in self.walls and pos not in self.figures:
-                self.walls.append(pos)
-                walls_placed += 1
-            attempts += 1
-
     def update_ui(self):
         """Update UI with current values"""
         # Update grid settings based on new complexity
@@ -608,6 +488,7 @@ class TaskGenerator(QMainWindow):
         # Reset task data
         self.walls = []
         self.figures = {}
+        self.numbers = {}  # {(x, y): число} для клеток-номеров (6)
         self.solution = None
         
         # Force canvas redraw
@@ -616,87 +497,13 @@ class TaskGenerator(QMainWindow):
 
     def closeEvent(self, event):
         """Обработка закрытия окна"""
+        self.cancel_generation()
+        for worker in list(self._workers):
+            worker.cancel()
+            worker.wait()
         self.finished.emit()  # Эмитим сигнал при закрытии
         super().closeEvent(event)
 
-    def is_valid_move(self, x1: int, y1: int, x2: int, y2: int) -> bool:
-        """Оптимизированная проверка хода с кэшированием"""
-        key = (x1, y1, x2, y2)
-        if key in self.wall_cache:
-            return self.wall_cache[key]
-            
-        for wx, wy, orientation in self.walls:
-            if orientation == 'left' and x1 == x2 and y1 == y2 - 1 and wx == x1 and wy == y1:
-                self.wall_cache[key] = False
-                return False
-            if orientation == 'right' and x1 == x2 and y1 == y2 + 1 and wx == x1 and wy == y1:
-                self.wall_cache[key] = False
-                return False
-            if orientation == 'top' and x1 == x2 - 1 and y1 == y2 and wx == x1 and wy == y1:
-                self.wall_cache[key] = False
-                return False
-            if orientation == 'bottom' and x1 == x2 + 1 and y1 == y2 and wx == x1 and wy == y1:
-                self.wall_cache[key] = False
-                return False
-                
-        self.wall_cache[key] = True
-        return True
-
-    def find_path_a_star(self, start: Tuple[int, int], end: Tuple[int, int], 
-                        must_visit: Set[Tuple[int, int]] = None) -> Optional[List[Tuple[int, int]]]:
-        """Поиск пути с использованием алгоритма A*"""
-        if must_visit is None:
-            must_visit = set()
-            
-        def heuristic(a: Tuple[int, int], b: Tuple[int, int]) -> float:
-            return abs(a[0] - b[0]) + abs(a[1] - b[1])
-            
-        def get_neighbors(pos: Tuple[int, int]) -> List[Tuple[int, int]]:
-            x, y = pos
-            neighbors = []
-            for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < self.GRID_SIZE and 0 <= ny < self.GRID_SIZE and 
-                    self.is_valid_move(x, y, nx, ny)):
-                    neighbors.append((nx, ny))
-            return neighbors
-            
-        # Очередь с приоритетом: (f_score, count, pos, path, visited)
-        count = 0  # Для стабильной сортировки
-        queue = [(0, count, start, [start], {start})]
-        heapq.heapify(queue)
-        
-        # Множество посещенных позиций
-        closed_set = set()
-        
-        while queue:
-            _, _, pos, path, visited = heapq.heappop(queue)
-            
-            if pos == end and not (must_visit - visited):
-                return path
-                
-            if pos in closed_set:
-                continue
-                
-            closed_set.add(pos)
-            
-            for next_pos in get_neighbors(pos):
-                if next_pos in closed_set:
-                    continue
-                    
-                new_path = path + [next_pos]
-                new_visited = visited | {next_pos}
-                
-                # Вычисляем f_score (g_score + h_score)
-                g_score = len(new_path)
-                h_score = heuristic(next_pos, end)
-                f_score = g_score + h_score
-                
-                count += 1
-                heapq.heappush(queue, (f_score, count, next_pos, new_path, new_visited))
-                
-        return None
-
 class TaskCanvas(QtWidgets.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -791,7 +598,22 @@ class TaskCanvas(QtWidgets.QWidget):
                 painter.setBrush(Qt.NoBrush)
                 painter.drawEllipse(center_x - radius, center_y - radius, 
                                   radius * 2, radius * 2)
-            elif fig_type == 6:  # Cross
+                # Сумма, которую надо набрать (математический лабиринт)
+                if (x, y) in self.parent.numbers:
+                    painter.setFont(QFont('Arial', radius * 2 // 3))
+                    painter.drawText(QRect(center_x - radius, center_y - radius,
+                                         radius * 2, radius * 2),
+                                   Qt.AlignCenter, str(self.parent.numbers[(x, y)]))
+            elif fig_type == 6:  # Number
+                painter.setPen(QPen(QColor(UI_COLORS['grid']), 2))
+                painter.setBrush(Qt.NoBrush)
+                # Draw number (1-9)
+                number = self.parent.numbers.get((x, y), 1)  # Default to 1 if not specified
+                painter.setFont(QFont('Arial', radius))
+                painter.drawText(QRect(center_x - radius, center_y - radius, 
+                                     radius * 2, radius * 2),
+                               Qt.AlignCenter, str(number))
+            elif fig_type == 7:  # Cross
                 painter.setPen(QPen(QColor(UI_COLORS['grid']), 2))
                 painter.setBrush(Qt.NoBrush)
                 # Draw cross
@@ -800,15 +622,6 @@ class TaskCanvas(QtWidgets.QWidget):
                                center_x + cross_size, center_y)
                 painter.drawLine(center_x, center_y - cross_size, 
                                center_x, center_y + cross_size)
-            elif fig_type == 7:  # Number
-                painter.setPen(QPen(QColor(UI_COLORS['grid']), 2))
-                painter.setBrush(Qt.NoBrush)
-                # Draw number (1-9)
-                number = self.parent.figures.get((x, y), 1)  # Default to 1 if not specified
-                painter.setFont(QFont('Arial', radius))
-                painter.drawText(QRect(center_x - radius, center_y - radius, 
-                                     radius * 2, radius * 2),
-                               Qt.AlignCenter, str(number))
 
     def draw_solution(self, painter: QPainter):
         """Draw solution path if exists"""
@@ -822,7 +635,9 @@ class TaskCanvas(QtWidgets.QWidget):
         for i in range(len(self.parent.solution) - 1):
             x1, y1 = self.parent.solution[i]
             x2, y2 = self.parent.solution[i + 1]
-            
+            if abs(x2 - x1) + abs(y2 - y1) != 1:
+                continue  # Переход к следующему циклу, а не ход ладьи
+
             start_x = x1 * self.parent.CELL_SIZE + self.parent.MARGIN + self.parent.CELL_SIZE // 2
             start_y = y1 * self.parent.CELL_SIZE + self.parent.MARGIN + self.parent.CELL_SIZE // 2
             end_x = x2 * self.parent.CELL_SIZE + self.parent.MARGIN + self.parent.CELL_SIZE // 2